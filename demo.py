@@ -10,6 +10,9 @@ from src.helper import prepare_data_for_simple_search
 
 from src.helper import run_bloom_filter
 from src.helper import run_cuckoo_filter
+from src.helper import run_sorted_file_index
+from src.helper import run_merge_join
+from src.helper import run_binary_fuse_filter
 
 from src.simple_algorithms import run_linear_search
 from src.simple_algorithms import run_binary_search
@@ -30,6 +33,9 @@ def main():
             \n5. Cuckoo Filter\
             \n6. 2 and 3\
             \n7. 4 and 5\
+            \n8. Binary Search on the sorted file (no loading)\
+            \n9. Sorted Merge Join (bulk check in one pass)\
+            \n0. Binary Fuse Filter (static, built once)\
             \n999. exit"
     )
 
@@ -145,6 +151,24 @@ def main():
                     )
                 run_bloom_filter(datasets[cmds[1]])
                 run_cuckoo_filter(datasets[cmds[1]])
+            case "8":
+                print("Clearing cache...")
+                name_list = None
+                check_list = None
+
+                run_sorted_file_index(datasets[cmds[1]])
+            case "9":
+                print("Clearing cache...")
+                name_list = None
+                check_list = None
+
+                run_merge_join(datasets[cmds[1]])
+            case "0":
+                print("Clearing cache...")
+                name_list = None
+                check_list = None
+
+                run_binary_fuse_filter(datasets[cmds[1]])
             case _:
                 if option == "999":
                     print("Byebye!")
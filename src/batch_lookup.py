@@ -0,0 +1,237 @@
+#
+#  batch_lookup.py
+#  Login Checker Program
+#
+
+import numpy as np
+import mmh3
+
+from src.binary_fuse_filter import BinaryFuseFilter
+from src.blocked_bloom_filter import BlockedBloomFilter, BLOCK_MASK, BLOCK_BITS
+from src.bloom_filter import BloomFilter, bit_endian
+from src.cuckoo_filter import CuckooFilter
+from src.cuckoo_filter_ai import CuckooFilter as CuckooFilterAI
+from src.growable_cuckoo_filter import GrowableCuckooFilter
+from src.scalable_bloom_filter import ScalableBloomFilter
+from src.sharded_cuckoo_filter import ShardedCuckooFilter
+from src.vector_hash import to_byte_matrix, murmur3_32, murmur3_x64_128
+
+# Number of usernames hashed together, bounds the size of the padded byte matrix
+CHUNK_SIZE = 1 << 16
+
+_U64 = np.uint64
+
+
+"""
+Batch query engine
+
+Takes a whole array of usernames and answers them with array operations: hashing, modulo/masking
+and the bit/bucket gathers all run over the batch, only the chunk loop is in Python.
+    engine = BatchLookup(filter)
+    mask = engine.exist(names)  # numpy bool array, same order as names
+
+Both filter families are read in place: Bloom filters through a zero-copy view of the bitarray
+buffer, cuckoo filters through their packed bucket table (fingerprints are never 0, the empty
+marker, so empty slots never match). Inserts made after the engine is created are visible to it.
+"""
+
+
+class BatchLookup:
+    def __init__(self, filter):
+        self.filter = filter
+        if isinstance(filter, (BloomFilter, BlockedBloomFilter)):
+            self._exist_chunk = self._bloom_exist
+        elif isinstance(filter, CuckooFilter):
+            self._alt_source = None
+            self._exist_chunk = self._cuckoo_exist
+        elif isinstance(filter, ShardedCuckooFilter):
+            self._shard_engines = [BatchLookup(shard) for shard in filter.shards]
+            self._exist_chunk = self._sharded_exist
+        elif isinstance(filter, (ScalableBloomFilter, GrowableCuckooFilter)):
+            self._chain_engines = []
+            self._exist_chunk = (
+                self._scalable_exist
+                if isinstance(filter, ScalableBloomFilter)
+                else self._growable_exist
+            )
+        elif isinstance(filter, BinaryFuseFilter):
+            # Already vectorized: hash, 3 gathers and a comparison over the whole chunk
+            self._exist_chunk = filter.exist_many
+        elif isinstance(filter, CuckooFilterAI):
+            self._alt_table = np.array(
+                [mmh3.hash(str(f)) for f in range(1 << filter.fingerprint_size)],
+                dtype=np.int64,
+            )
+            self._exist_chunk = self._cuckoo_ai_exist
+        else:
+            raise TypeError(f"Batch lookup is not supported for {type(filter)}")
+
+    @staticmethod
+    def supports(filter):
+        return isinstance(
+            filter,
+            (
+                BloomFilter,
+                BlockedBloomFilter,
+                CuckooFilter,
+                CuckooFilterAI,
+                ShardedCuckooFilter,
+                ScalableBloomFilter,
+                GrowableCuckooFilter,
+                BinaryFuseFilter,
+            ),
+        )
+
+    def exist(self, names):
+        names = list(names) if not isinstance(names, (list, np.ndarray)) else names
+        result = np.zeros(len(names), dtype=bool)
+        for start in range(0, len(names), CHUNK_SIZE):
+            chunk = names[start : start + CHUNK_SIZE]
+            result[start : start + len(chunk)] = self._exist_chunk(chunk)
+        instrument = getattr(self.filter, "instrument", None)
+        if instrument is not None:
+            instrument.count("lookups", len(result))
+            instrument.count("positives", int(result.sum()))
+        return result
+
+    def _bloom_exist(self, names):
+        bf = self.filter
+        matrix, lengths = to_byte_matrix(names)
+        size = np.uint64(bf.size)
+        bits = np.frombuffer(bf.filter, dtype=np.uint8)
+        big_endian = bit_endian(bf.filter) == "big"
+
+        # Probe positions, one column per hash function, only for rows still alive
+        if isinstance(bf, BlockedBloomFilter):
+            h1, h2 = murmur3_x64_128(matrix, lengths, seed=bf.hash_seed)
+            base = (h1 % _U64(bf.num_blocks)) * _U64(BLOCK_BITS)
+            pos = h2 & _U64(BLOCK_MASK)
+            step = ((h2 >> _U64(9)) & _U64(BLOCK_MASK)) | _U64(1)
+
+            def probes(i, rows):
+                offset = (pos[rows] + _U64(i) * step[rows]) & _U64(BLOCK_MASK)
+                return base[rows] + offset
+
+        elif bf.hash_scheme == "seeded":
+
+            def probes(i, rows):
+                h = murmur3_32(matrix[rows], lengths[rows], seed=i)
+                return (h.view(np.int32).astype(np.int64) % bf.size).astype(_U64)
+
+        else:
+            h1, h2 = murmur3_x64_128(matrix, lengths, seed=bf.hash_seed)
+            pos = h1 % size
+            step = h2 % size
+            step[step == 0] = 1
+
+            def probes(i, rows):
+                return (pos[rows] + _U64(i) * step[rows]) % size
+
+        alive = np.arange(len(names))
+        for i in range(bf.num_hash):
+            if not len(alive):
+                break
+            p = probes(i, alive)
+            byte = bits[(p >> _U64(3)).astype(np.int64)]
+            shift = (p & _U64(7)).astype(np.uint8)
+            if big_endian:
+                shift = np.uint8(7) - shift
+            alive = alive[((byte >> shift) & 1).astype(bool)]
+
+        found = np.zeros(len(names), dtype=bool)
+        found[alive] = True
+        return found
+
+    def _bucket_match(self, idx, finger):
+        return (self.filter.bucket_rows(idx) == finger[:, None]).any(axis=1)
+
+    # The filter's own alternate bucket offsets, converted again only after reset() replaced them
+    def _alt_offsets(self):
+        if self._alt_source is not self.filter.alt_offsets:
+            self._alt_source = self.filter.alt_offsets
+            self._alt_table = np.array(self._alt_source, dtype=np.int64)
+        return self._alt_table
+
+    # Mirrors CuckooFilter.index_and_fingerprint for both hash schemes
+    def _cuckoo_exist(self, names):
+        cf = self.filter
+        matrix, lengths = to_byte_matrix(names)
+        if cf.hash_scheme == "legacy":
+            h = murmur3_32(matrix, lengths, seed=cf.hash_seed).view(np.int32)
+            h1x = h.astype(np.int64) % cf.bucket_num
+            finger = h1x & ((1 << cf.finger_bits) - 1)
+            finger[finger == 0] = 1
+            return self._cuckoo_match(h1x, finger)
+        h_idx, h_finger = murmur3_x64_128(matrix, lengths, seed=cf.hash_seed)
+        return self._cuckoo_match(*self._locate(h_idx, h_finger))
+
+    # Mirrors CuckooFilter.locate
+    def _locate(self, h_idx, h_finger):
+        cf = self.filter
+        h1x = (h_idx & _U64(cf.bucket_num - 1)).astype(np.int64)
+        finger = (h_finger & _U64((1 << cf.finger_bits) - 1)).astype(np.int64)
+        finger[finger == 0] = 1
+        return h1x, finger
+
+    # Mirrors CuckooFilter.exist_at
+    def _cuckoo_match(self, h1x, finger):
+        cf = self.filter
+        h2x = h1x ^ self._alt_offsets()[finger]
+        found = self._bucket_match(h1x, finger) | self._bucket_match(h2x, finger)
+        if cf.stash:
+            stash_idx, stash_finger = np.array(cf.stash, dtype=np.int64).T
+            in_stash = (h1x[:, None] == stash_idx) | (h2x[:, None] == stash_idx)
+            found |= (in_stash & (finger[:, None] == stash_finger)).any(axis=1)
+        return found
+
+    # Hash the chunk once, then let every shard's engine match the rows routed to it
+    def _sharded_exist(self, names):
+        sf = self.filter
+        matrix, lengths = to_byte_matrix(names)
+        h_idx, h_finger = murmur3_x64_128(matrix, lengths, seed=sf.hash_seed)
+        if sf.shard_bits:
+            shard_ids = h_idx >> _U64(64 - sf.shard_bits)
+        else:
+            shard_ids = np.zeros(len(names), dtype=_U64)
+        found = np.zeros(len(names), dtype=bool)
+        for shard_id, engine in enumerate(self._shard_engines):
+            rows = np.nonzero(shard_ids == shard_id)[0]
+            if len(rows):
+                found[rows] = engine._cuckoo_match(
+                    *engine._locate(h_idx[rows], h_finger[rows])
+                )
+        return found
+
+    # One engine per sub-filter of a growing chain, sub-filters added since the last call included
+    def _chain(self, filters):
+        for sub_filter in filters[len(self._chain_engines) :]:
+            self._chain_engines.append(BatchLookup(sub_filter))
+        return self._chain_engines
+
+    def _scalable_exist(self, names):
+        found = np.zeros(len(names), dtype=bool)
+        for engine in self._chain(self.filter.filters):
+            rows = np.nonzero(~found)[0]
+            if not len(rows):
+                break
+            found[rows] = engine._bloom_exist([names[i] for i in rows])
+        return found
+
+    # Hash the chunk once, every table takes its own index and fingerprint from the same hash
+    def _growable_exist(self, names):
+        matrix, lengths = to_byte_matrix(names)
+        h_idx, h_finger = murmur3_x64_128(matrix, lengths, seed=self.filter.hash_seed)
+        found = np.zeros(len(names), dtype=bool)
+        for engine in self._chain(self.filter.tables):
+            found |= engine._cuckoo_match(*engine._locate(h_idx, h_finger))
+        return found
+
+    def _cuckoo_ai_exist(self, names):
+        cf = self.filter
+        matrix, lengths = to_byte_matrix(names)
+        h = murmur3_32(matrix, lengths).view(np.int32).astype(np.int64)
+        idx = h % cf.num_buckets
+        finger = h & cf.fingerprint_mask
+        finger[finger == 0] = 1
+        alt = (idx ^ self._alt_table[finger]) % cf.num_buckets
+        return self._bucket_match(idx, finger) | self._bucket_match(alt, finger)
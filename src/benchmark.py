@@ -0,0 +1,215 @@
+#
+#  benchmark.py
+#  Login Checker Program
+#
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from src.binary_fuse_filter import BinaryFuseFilter
+from src.bloom_filter import BloomFilter
+from src.cuckoo_filter import CuckooFilter
+from src.semi_sorted_cuckoo_filter import SemiSortedCuckooFilter
+from src.dataset_reader import read_lines
+from src.simple_algorithms import binary_search, build_hash_table
+from src.synthetic_data import write_dataset, write_check_list
+
+METHODS = (
+    "linear",
+    "binary",
+    "hash",
+    "bloom",
+    "cuckoo",
+    "semi_sorted",
+    "binary_fuse",
+)
+# Linear search scans the whole list per name, it only gets this many checks
+LINEAR_CHECKS = 200
+
+"""
+Reproducible benchmark suite over synthetic datasets (see synthetic_data.py).
+
+For every scale, a sorted dataset and a check list with a known hit ratio are generated locally,
+then every method is built from the dataset file and queried with the check list:
+ - build_s: building the structure from the file
+ - lookup_s, lookup_ns: all checks one by one, and per check
+ - hits: positive answers (exact methods must match the generated hit count, filters may exceed it)
+ - memory_bytes: size of the structure's own storage
+ - bits_per_item: memory_bytes per dataset name in bits, times 125 MB per bit at the 1b scale
+
+cuckoo and semi_sorted build the same filter, once with the plain table and once with the
+semi-sorted bucket encoding: together they show its memory versus lookup time tradeoff.
+
+    python -m src.benchmark --scales 100000 1000000 --out results.json
+
+The JSON output also records the parameters and the environment, so runs of two commits compare.
+"""
+
+
+def _build(method, filename, n):
+    if method in ("linear", "binary"):
+        return [name.decode("utf-8") for name in read_lines(filename)]
+    if method == "hash":
+        return build_hash_table(list(read_lines(filename)))
+    if method == "bloom":
+        bf = BloomFilter(num_users=max(n, 1), prob=0.01)
+        bf.insert_many(read_lines(filename))
+        return bf
+    if method == "binary_fuse":
+        return BinaryFuseFilter.from_iterable(read_lines(filename))
+    filter_cls = SemiSortedCuckooFilter if method == "semi_sorted" else CuckooFilter
+    cf = filter_cls(
+        capacity=max(n, 1),
+        bucket_size=4,
+        fingerprint_size=12,
+        load_factor=0.9,
+        round_up=True,
+    )
+    for name in read_lines(filename):
+        if not cf.insert(name):
+            raise RuntimeError("Cuckoo filter is full")
+    return cf
+
+
+def _lookup(method, structure, names):
+    if method == "linear":
+        return sum(name in structure for name in names)
+    if method == "binary":
+        last = len(structure) - 1
+        return sum(binary_search(name, structure, 0, last) for name in names)
+    if method == "hash":
+        return sum(name in structure for name in names)
+    return sum(bool(structure.exist(name)) for name in names)
+
+
+def _memory_bytes(method, structure):
+    if method in ("linear", "binary"):
+        return sys.getsizeof(structure) + sum(map(sys.getsizeof, structure))
+    if method == "hash":
+        return structure.slots.nbytes + structure.tags.nbytes + len(structure.arena)
+    if method == "bloom":
+        return len(structure.filter) // 8
+    if method == "semi_sorted":
+        return structure.packed.nbytes
+    if method == "binary_fuse":
+        return structure.fingerprints.nbytes
+    return structure.buckets.nbytes
+
+
+def benchmark_method(method, filename, n, checks, expected_hits):
+    t_start = time.perf_counter()
+    structure = _build(method, filename, n)
+    build_s = time.perf_counter() - t_start
+
+    if method == "linear":
+        checks = checks[:LINEAR_CHECKS]
+        expected_hits = None
+    t_start = time.perf_counter()
+    hits = _lookup(method, structure, checks)
+    lookup_s = time.perf_counter() - t_start
+    memory_bytes = _memory_bytes(method, structure)
+    return {
+        "method": method,
+        "scale": n,
+        "build_s": build_s,
+        "lookup_s": lookup_s,
+        "lookup_ns": lookup_s / max(len(checks), 1) * 1e9,
+        "checks": len(checks),
+        "hits": hits,
+        "expected_hits": expected_hits,
+        "memory_bytes": memory_bytes,
+        "bits_per_item": memory_bytes * 8 / max(n, 1),
+    }
+
+
+def _environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "commit": commit,
+    }
+
+
+"""
+Run every method at every scale
+ - scales: dataset sizes
+ - methods: subset of METHODS
+ - num_checks, hit_ratio, seed: the generated check list
+ - workdir: where the datasets are written, a temporary directory by default
+
+Return a JSON serializable dict with the parameters, the environment and one result per run.
+"""
+
+
+def run_benchmarks(
+    scales=(10_000, 100_000),
+    methods=METHODS,
+    num_checks=10_000,
+    hit_ratio=0.5,
+    seed=0,
+    workdir=None,
+):
+    results = []
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        for n in scales:
+            dataset = os.path.join(tmp, f"sorted_usernames_{n}.txt")
+            check_file = os.path.join(tmp, f"usernames_check_{n}.txt")
+            write_dataset(dataset, n, seed)
+            expected_hits = write_check_list(check_file, n, num_checks, hit_ratio, seed)
+            checks = [name.decode("utf-8") for name in read_lines(check_file)]
+            for method in methods:
+                results.append(
+                    benchmark_method(method, dataset, n, checks, expected_hits)
+                )
+    return {
+        "params": {
+            "scales": list(scales),
+            "methods": list(methods),
+            "num_checks": num_checks,
+            "hit_ratio": hit_ratio,
+            "seed": seed,
+        },
+        "environment": _environment(),
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Login checker benchmark suite")
+    parser.add_argument("--scales", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--methods", nargs="+", choices=METHODS, default=METHODS)
+    parser.add_argument("--checks", type=int, default=10_000)
+    parser.add_argument("--hit-ratio", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", help="directory for the generated datasets")
+    parser.add_argument("--out", help="JSON output file, stdout by default")
+    args = parser.parse_args()
+
+    report = run_benchmarks(
+        args.scales, args.methods, args.checks, args.hit_ratio, args.seed, args.workdir
+    )
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
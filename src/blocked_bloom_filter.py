@@ -0,0 +1,224 @@
+#
+#  blocked_bloom_filter.py
+#  Login Checker Program
+#
+
+from bitarray import bitarray
+
+import numpy as np
+import mmh3
+import math
+
+from src.bloom_filter import BloomFilter
+from src.instrumentation import FilterStats
+
+# One block is one 64-byte cache line
+BLOCK_BITS = 512
+BLOCK_MASK = BLOCK_BITS - 1
+CACHE_LINE = BLOCK_BITS // 8
+# Set bits of every byte value
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint16)
+
+
+"""
+Zero-filled bitarray whose buffer starts on a 64-byte boundary, so block b is exactly cache line b
+of the buffer. bitarray's own allocation gives no alignment guarantee, so the bits live in an
+over-allocated NumPy buffer sliced at the first aligned address.
+"""
+
+
+def aligned_bitarray(num_bits, data=None):
+    nbytes = num_bits // 8
+    raw = np.zeros(nbytes + CACHE_LINE, dtype=np.uint8)
+    offset = -raw.ctypes.data % CACHE_LINE
+    buf = raw[offset : offset + nbytes]
+    if data is not None:
+        buf[:] = np.frombuffer(data, dtype=np.uint8)
+    return bitarray(buffer=buf, endian="big")
+
+
+# h1 selects the block, h2 gives the in-block start and an odd step
+def block_probes(h1, h2, num_blocks, num_hash):
+    base = (h1 % num_blocks) * BLOCK_BITS
+    pos = h2 & BLOCK_MASK
+    step = ((h2 >> 9) & BLOCK_MASK) | 1
+    for _ in range(num_hash):
+        yield base + pos
+        pos = (pos + step) & BLOCK_MASK
+
+
+class BlockedBloomFilter:
+    """
+    Cache-line blocked Bloom filter.
+
+    Same total number of bits and hash functions as BloomFilter, but every key picks one 512-bit
+    block and sets all of its k bits inside that block. Blocks are aligned to 64 bytes, so a
+    lookup touches a single cache line instead of k random ones. The price is a slightly higher
+    false positive rate, because blocks do not fill up evenly (see fpr_penalty).
+
+    One 128-bit murmur3 hash per key, see block_probes. An odd step is coprime with 512 so the k
+    positions are always distinct.
+    """
+
+    # FilterStats once enable_stats() is called, see instrumentation.py
+    instrument = None
+
+    def __init__(self, num_users=1e9, prob=0.1):
+        self.num_users = num_users
+        self.probability_fp = prob
+        bits = int(-1 * num_users * math.log(self.probability_fp) / (math.log(2)) ** 2)
+        self.num_hash = max(1, int(bits / num_users * math.log(2)))
+        self.num_blocks = max(1, -(-bits // BLOCK_BITS))
+        self.size = self.num_blocks * BLOCK_BITS
+        self.hash_seed = 0
+        self.filter = aligned_bitarray(self.size)
+
+    def probes(self, item):
+        if self.instrument is not None:
+            self.instrument.count("hash_calls")
+        h1, h2 = mmh3.hash64(item, seed=self.hash_seed, signed=False)
+        return block_probes(h1, h2, self.num_blocks, self.num_hash)
+
+    def positions(self, item):
+        return list(self.probes(item))
+
+    def insert(self, item):
+        if self.instrument is not None:
+            self.instrument.count("inserts")
+        for digit in self.probes(item):
+            self.filter[digit] = 1
+
+    def exist(self, item):
+        bits = self.filter
+        found = all(bits[digit] for digit in self.probes(item))
+        if self.instrument is not None:
+            self.instrument.count("lookups")
+            self.instrument.count("positives", found)
+        return found
+
+    # Bulk insert, binds the hot attributes once instead of once per item
+    def insert_many(self, items):
+        if self.instrument is not None:
+            items = self.instrument.counted(items, "inserts", "hash_calls")
+        hash64 = mmh3.hash64
+        seed, num_blocks, num_hash = self.hash_seed, self.num_blocks, self.num_hash
+        bits = self.filter
+        for item in items:
+            h1, h2 = hash64(item, seed=seed, signed=False)
+            for digit in block_probes(h1, h2, num_blocks, num_hash):
+                bits[digit] = 1
+
+    # Bulk lookup, returns a list of booleans in input order
+    def exist_many(self, items):
+        hash64 = mmh3.hash64
+        seed, num_blocks, num_hash = self.hash_seed, self.num_blocks, self.num_hash
+        bits = self.filter
+        result = []
+        for item in items:
+            h1, h2 = hash64(item, seed=seed, signed=False)
+            result.append(
+                all(bits[d] for d in block_probes(h1, h2, num_blocks, num_hash))
+            )
+        if self.instrument is not None:
+            self.instrument.count("lookups", len(result))
+            self.instrument.count("hash_calls", len(result))
+            self.instrument.count("positives", sum(result))
+        return result
+
+    def enable_stats(self):
+        self.instrument = FilterStats()
+
+    # Same snapshot as BloomFilter.stats, plus how unevenly the blocks fill up
+    def stats(self, scan=True):
+        snapshot = {
+            "size": self.size,
+            "num_hash": self.num_hash,
+            "num_blocks": self.num_blocks,
+        }
+        if scan:
+            data = np.frombuffer(self.filter, dtype=np.uint8)[: self.size // 8]
+            block_fill = (
+                _POPCOUNT[data].reshape(self.num_blocks, CACHE_LINE).sum(axis=1)
+                / BLOCK_BITS
+            )
+            snapshot["fill_ratio"] = float(block_fill.mean())
+            # A lookup lands in one block, so the rate is averaged over the blocks
+            snapshot["estimated_fpr"] = float((block_fill**self.num_hash).mean())
+            snapshot["block_fill_max"] = float(block_fill.max())
+        if self.instrument is not None:
+            snapshot.update(self.instrument.snapshot())
+        return snapshot
+
+    # On-disk format support (see filter_store.py)
+
+    def header(self):
+        return {
+            "num_users": self.num_users,
+            "probability_fp": self.probability_fp,
+            "num_hash": self.num_hash,
+            "num_blocks": self.num_blocks,
+            "hash_seed": self.hash_seed,
+        }
+
+    def payload(self):
+        return memoryview(self.filter)
+
+    # The store hands out 64-byte aligned buffers, so blocks stay on cache lines
+    @classmethod
+    def from_payload(cls, header, buffer):
+        bf = cls.__new__(cls)
+        bf.__dict__.update(header)
+        bf.size = bf.num_blocks * BLOCK_BITS
+        bf.filter = bitarray(buffer=buffer, endian="big")
+        return bf
+
+    # Pickle the bits as plain bytes and re-align them on load
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["filter"] = self.filter.tobytes()
+        return state
+
+    def __setstate__(self, state):
+        state["filter"] = aligned_bitarray(state["size"], state["filter"])
+        self.__dict__.update(state)
+
+    def __str__(self):
+        return f"{self.filter}"
+
+
+# Share of a filter's lookups that come back positive for keys that were never inserted
+def measure_fpr(filter, num_queries=100000, prefix="absent_"):
+    false_positives = 0
+    for i in range(num_queries):
+        if filter.exist(f"{prefix}{i}"):
+            false_positives += 1
+    return false_positives / num_queries
+
+
+"""
+Measure the FPR cost of blocking: build a classic and a blocked filter with the same parameters
+from the same synthetic keys, and query both with keys that were never inserted.
+
+Returns the two measured rates and the ratio blocked / classic.
+"""
+
+
+def fpr_penalty(num_users=100000, prob=0.05, num_queries=100000):
+    classic = BloomFilter(num_users=num_users, prob=prob)
+    blocked = BlockedBloomFilter(num_users=num_users, prob=prob)
+    keys = [f"user_{i}" for i in range(int(num_users))]
+    classic.insert_many(keys)
+    blocked.insert_many(keys)
+
+    classic_fpr = measure_fpr(classic, num_queries)
+    blocked_fpr = measure_fpr(blocked, num_queries)
+    return {
+        "target_fpr": prob,
+        "classic_fpr": classic_fpr,
+        "blocked_fpr": blocked_fpr,
+        "penalty": blocked_fpr / classic_fpr if classic_fpr else float("inf"),
+    }
+
+
+if __name__ == "__main__":
+    print(fpr_penalty())
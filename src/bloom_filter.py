@@ -11,32 +11,198 @@ from bitarray import bitarray
 import mmh3
 import math
 
+from src.instrumentation import FilterStats
+
+HASH_SCHEMES = ("double", "seeded")
+
+
+# Bit order of a bitarray, bitarray 3 turned endian() into a property
+def bit_endian(bits):
+    endian = bits.endian
+    return endian() if callable(endian) else endian
+
+
+# g_i = (h1 + i * h2) mod size, h1 and h2 are reduced modulo size first so the running sum stays below 2 * size
+def double_hash_probes(h1, h2, size, num_hash):
+    pos = h1 % size
+    step = h2 % size or 1
+    for _ in range(num_hash):
+        yield pos
+        pos = (pos + step) % size
+
 
 class BloomFilter:
-    def __init__(self, num_users=1e9, prob=0.1):
+    # Filters pickled before hash_scheme existed probe with one seeded hash per bit
+    hash_scheme = "seeded"
+    hash_seed = 0
+    # FilterStats once enable_stats() is called, see instrumentation.py
+    instrument = None
+
+    def __init__(self, num_users=1e9, prob=0.1, hash_scheme="double"):
+        if hash_scheme not in HASH_SCHEMES:
+            raise ValueError(f"Unknown hash scheme: {hash_scheme}")
+        self.num_users = num_users
         self.probability_fp = prob
         self.size = int(
             -1 * num_users * math.log(self.probability_fp) / (math.log(2)) ** 2
         )
         self.num_hash = int(self.size / num_users * math.log(2))
+        self.hash_scheme = hash_scheme
+        self.hash_seed = 0
         self.filter = bitarray(self.size)
         # not neccessary. bitarray() returns all zeros by itself
         self.filter.setall(0)
 
+    """
+    Bit positions probed for an item, lazily so lookups can stop at the first zero bit.
+
+    "seeded" runs one murmur3 hash per probe (seed 0..k-1).
+    "double" runs a single 128-bit murmur3 hash and derives all k probes from its two halves
+        (Kirsch-Mitzenmacher), see double_hash_probes.
+    """
+
+    def probes(self, item):
+        if self.instrument is not None:
+            return self._counted_probes(item)
+        if self.hash_scheme == "seeded":
+            return (mmh3.hash(item, seed=i) % self.size for i in range(self.num_hash))
+        h1, h2 = mmh3.hash64(item, seed=self.hash_seed, signed=False)
+        return double_hash_probes(h1, h2, self.size, self.num_hash)
+
+    # Same probes, counting every hash computed (seeded lookups stop hashing at the first zero bit)
+    def _counted_probes(self, item):
+        count = self.instrument.count
+        if self.hash_scheme == "seeded":
+            for i in range(self.num_hash):
+                count("hash_calls")
+                yield mmh3.hash(item, seed=i) % self.size
+            return
+        count("hash_calls")
+        h1, h2 = mmh3.hash64(item, seed=self.hash_seed, signed=False)
+        yield from double_hash_probes(h1, h2, self.size, self.num_hash)
+
+    def positions(self, item):
+        return list(self.probes(item))
+
     def insert(self, item):
-        for i in range(self.num_hash):
-            digit = mmh3.hash(item, seed=i) % self.size
+        if self.instrument is not None:
+            self.instrument.count("inserts")
+        for digit in self.probes(item):
             self.filter[digit] = 1
 
+    # Stop probing at the first zero bit, most lookups of new usernames end after one or two probes.
+    # The probe loop is inlined here and in exist_many, they are the hot paths; see probes()
     def exist(self, item):
-        sum = 0
-        for i in range(self.num_hash):
-            digit = mmh3.hash(item, seed=i) % self.size
-            if self.filter[digit] == 1:
-                sum += 1
-        if sum == self.num_hash:
+        if self.instrument is not None:
+            return self._counted_exist(item)
+        bits = self.filter
+        size = self.size
+        if self.hash_scheme == "seeded":
+            for i in range(self.num_hash):
+                if not bits[mmh3.hash(item, seed=i) % size]:
+                    return False
             return True
-        return False
+        h1, h2 = mmh3.hash64(item, seed=self.hash_seed, signed=False)
+        pos = h1 % size
+        step = h2 % size or 1
+        for _ in range(self.num_hash):
+            if not bits[pos]:
+                return False
+            pos = (pos + step) % size
+        return True
+
+    def _counted_exist(self, item):
+        bits = self.filter
+        found = all(bits[digit] for digit in self.probes(item))
+        self.instrument.count("lookups")
+        self.instrument.count("positives", found)
+        return found
+
+    # Bulk insert, binds the hot attributes once instead of once per item
+    def insert_many(self, items):
+        if self.instrument is not None:
+            items = self.instrument.counted(items, "inserts")
+        probes = self.probes
+        bits = self.filter
+        for item in items:
+            for digit in probes(item):
+                bits[digit] = 1
+
+    # Bulk lookup, returns a list of booleans in input order
+    def exist_many(self, items):
+        if self.instrument is not None or self.hash_scheme == "seeded":
+            return [self.exist(item) for item in items]
+        hash64 = mmh3.hash64
+        seed = self.hash_seed
+        size = self.size
+        num_hash = self.num_hash
+        bits = self.filter
+        result = []
+        for item in items:
+            h1, h2 = hash64(item, seed=seed, signed=False)
+            pos = h1 % size
+            step = h2 % size or 1
+            found = True
+            for _ in range(num_hash):
+                if not bits[pos]:
+                    found = False
+                    break
+                pos = (pos + step) % size
+            result.append(found)
+        return result
+
+    def enable_stats(self):
+        self.instrument = FilterStats()
+
+    """
+    Snapshot of the filter's state: size, fill ratio (share of bits set) and the false positive rate
+    it implies, fill_ratio ** num_hash. With enable_stats(), also the event counters.
+
+    The fill ratio counts every bit, which reads the whole array (all of the file of a mapped
+    filter); scan=False leaves it out.
+    """
+
+    def stats(self, scan=True):
+        snapshot = {"size": self.size, "num_hash": self.num_hash}
+        if scan:
+            fill_ratio = self.filter.count(1) / self.size
+            snapshot["fill_ratio"] = fill_ratio
+            snapshot["estimated_fpr"] = fill_ratio**self.num_hash
+        if self.instrument is not None:
+            snapshot.update(self.instrument.snapshot())
+        return snapshot
+
+    """
+    On-disk format support (see filter_store.py)
+     - header: the parameters needed to rebuild the filter, JSON serializable
+     - payload: the raw bit buffer
+     - from_payload: rebuild a filter around a buffer without copying it (e.g. a mmap)
+    """
+
+    def header(self):
+        return {
+            "num_users": self.num_users,
+            "probability_fp": self.probability_fp,
+            "size": self.size,
+            "num_hash": self.num_hash,
+            "hash_scheme": self.hash_scheme,
+            "hash_seed": self.hash_seed,
+            "endian": bit_endian(self.filter),
+        }
+
+    def payload(self):
+        return memoryview(self.filter)
+
+    @classmethod
+    def from_payload(cls, header, buffer):
+        bf = cls.__new__(cls)
+        for key in ("num_users", "probability_fp", "size", "num_hash"):
+            setattr(bf, key, header[key])
+        bf.hash_scheme = header["hash_scheme"]
+        bf.hash_seed = header["hash_seed"]
+        # The buffer is padded to whole bytes, bits past size are never probed
+        bf.filter = bitarray(buffer=buffer, endian=header["endian"])
+        return bf
 
     def __str__(self):
         return f"{self.filter}"
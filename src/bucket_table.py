@@ -0,0 +1,47 @@
+#
+#  bucket_table.py
+#  Login Checker Program
+#
+
+import numpy as np
+
+"""
+Packed bucket storage shared by the cuckoo filters.
+
+All fingerprints live in one contiguous NumPy buffer of shape (bucket_num, bucket_size), using the
+smallest unsigned type that holds a fingerprint (8-bit fingerprints in uint8, 12 or 16-bit ones in
+uint16). Fingerprint value 0 is reserved to mark an empty slot, like the reference cuckoo filter
+does: a computed fingerprint of 0 is stored as 1 (see nonzero_fingerprint).
+
+Occupied slots are always packed to the left of a bucket, so a bucket is full exactly when its
+last slot is occupied.
+"""
+
+EMPTY = 0
+
+
+def fingerprint_dtype(fingerprint_bits):
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        if fingerprint_bits <= np.iinfo(dtype).bits:
+            return dtype
+    raise ValueError(f"Fingerprints of {fingerprint_bits} bits are not supported")
+
+
+def new_bucket_table(bucket_num, bucket_size, fingerprint_bits):
+    return np.zeros(
+        (bucket_num, bucket_size), dtype=fingerprint_dtype(fingerprint_bits)
+    )
+
+
+# Map a computed fingerprint of 0 onto 1, 0 means empty slot
+def nonzero_fingerprint(finger):
+    return finger or 1
+
+
+# Convert the list-of-lists buckets of filters pickled by older versions
+def table_from_lists(buckets, bucket_size, fingerprint_bits):
+    table = new_bucket_table(len(buckets), bucket_size, fingerprint_bits)
+    for idx, bucket in enumerate(buckets):
+        if bucket:
+            table[idx, : len(bucket)] = [nonzero_fingerprint(f) for f in bucket]
+    return table
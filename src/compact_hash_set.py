@@ -0,0 +1,211 @@
+#
+#  compact_hash_set.py
+#  Login Checker Program
+#
+
+import mmh3
+import numpy as np
+
+from src.dataset_reader import read_line_batches, count_lines
+from src.vector_hash import to_byte_matrix, murmur3_x64_128
+
+_U64 = np.uint64
+
+# Longest name a one-byte length prefix can describe
+MAX_NAME_BYTES = 255
+
+
+class CompactHashSet:
+    """
+    Exact set of usernames without one Python object per name.
+
+    All names live back to back in one byte arena, each behind a one-byte length prefix. An
+    open-addressing table (linear probing, power-of-2 size, at most max_load full) maps the low
+    bits of the name's murmur3 hash to the arena offset of the name (stored + 1, 0 is an empty
+    slot). A parallel array of one-byte tags keeps the top 8 hash bits, so a probe only compares
+    the bytes of names whose tag matches.
+
+    About len + 1 bytes per name in the arena plus 9 bytes per slot, against ~100 bytes per entry
+    for a dict of str. Lookups take str or bytes; bulk builds hash and place whole batches with
+    NumPy (see add_many). Saved and memory-mapped through filter_store.py like the filters.
+
+    :param capacity: number of names expected, the table doubles when it runs past max_load.
+    :param max_load: highest share of occupied slots.
+    """
+
+    def __init__(self, capacity=1024, max_load=0.7):
+        self.max_load = max_load
+        self.hash_seed = 0
+        self.count = 0
+        self.arena = bytearray()
+        self._new_table(_table_size(capacity, max_load))
+
+    def _new_table(self, size):
+        self.mask = size - 1
+        self.slots = np.zeros(size, dtype=_U64)
+        self.tags = np.zeros(size, dtype=np.uint8)
+
+    def __len__(self):
+        return self.count
+
+    # Build from a file of one name per line, e.g. sorted_usernames_*.txt
+    @classmethod
+    def from_file(cls, filename, max_load=0.7):
+        hash_set = cls(capacity=count_lines(filename), max_load=max_load)
+        for batch in read_line_batches(filename, progress=True):
+            hash_set.add_many(batch)
+        return hash_set
+
+    def _locate(self, name):
+        h = mmh3.hash64(name, seed=self.hash_seed, signed=False)[0]
+        return h & self.mask, h >> 56
+
+    # Return the slot holding name, or the empty slot ending its probe sequence
+    def _find(self, name, slot, tag):
+        slots, tags, arena, mask = self.slots, self.tags, self.arena, self.mask
+        length = len(name)
+        while True:
+            offset = int(slots[slot])
+            if not offset:
+                return slot, False
+            if tags[slot] == tag and arena[offset - 1] == length:
+                if arena[offset : offset + length] == name:
+                    return slot, True
+            slot = (slot + 1) & mask
+
+    def contains(self, name):
+        if isinstance(name, str):
+            name = name.encode("utf-8")
+        return self._find(name, *self._locate(name))[1]
+
+    # Same interface as the filters, but the answer is exact
+    def exist(self, name):
+        return self.contains(name)
+
+    def __contains__(self, name):
+        return self.contains(name)
+
+    def add(self, name):
+        if isinstance(name, str):
+            name = name.encode("utf-8")
+        if len(name) > MAX_NAME_BYTES:
+            raise ValueError(f"Names are limited to {MAX_NAME_BYTES} bytes")
+        slot, tag = self._locate(name)
+        slot, found = self._find(name, slot, tag)
+        if found:
+            return False
+        self.slots[slot] = len(self.arena) + 1
+        self.tags[slot] = tag
+        self.arena.append(len(name))
+        self.arena += name
+        self.count += 1
+        if self.count > self.max_load * len(self.slots):
+            self._grow(len(self.slots) * 2)
+        return True
+
+    def insert(self, name):
+        return self.add(name)
+
+    """
+    Bulk insert of names that are not in the set yet (e.g. the lines of a sorted dataset).
+
+    The whole batch is appended to the arena at once and placed with vectorized linear probing:
+    every round, the pending names whose current slot is empty claim it (one winner per slot),
+    and all others move on to the next slot. A name already in the set is not detected and ends
+    up stored twice, which costs space but never changes an answer.
+    """
+
+    def add_many(self, names):
+        names = [n if isinstance(n, bytes) else str(n).encode("utf-8") for n in names]
+        if not names:
+            return
+        lengths = np.fromiter(map(len, names), dtype=np.int64, count=len(names))
+        if lengths.max() > MAX_NAME_BYTES:
+            raise ValueError(f"Names are limited to {MAX_NAME_BYTES} bytes")
+        needed = self.count + len(names)
+        if needed > self.max_load * len(self.slots):
+            self._grow(_table_size(needed, self.max_load))
+
+        # Length prefixed records, offsets point right behind each prefix
+        starts = np.cumsum(lengths + 1) - (lengths + 1)
+        records = np.empty(int((lengths + 1).sum()), dtype=np.uint8)
+        is_prefix = np.zeros(len(records), dtype=bool)
+        is_prefix[starts] = True
+        records[starts] = lengths
+        records[~is_prefix] = np.frombuffer(b"".join(names), dtype=np.uint8)
+        offsets = starts.astype(_U64) + _U64(len(self.arena) + 1)
+        self.arena += records.tobytes()
+
+        h = murmur3_x64_128(*to_byte_matrix(names), seed=self.hash_seed)[0]
+        self._place(h, offsets)
+        self.count += len(names)
+
+    def _place(self, h, offsets):
+        slot = h & _U64(self.mask)
+        tag = (h >> _U64(56)).astype(np.uint8)
+        pending = np.arange(len(h))
+        while len(pending):
+            free = np.flatnonzero(self.slots[slot[pending]] == 0)
+            _, first = np.unique(slot[pending[free]], return_index=True)
+            won = free[first]
+            winners = pending[won]
+            self.slots[slot[winners]] = offsets[winners]
+            self.tags[slot[winners]] = tag[winners]
+            left = np.ones(len(pending), dtype=bool)
+            left[won] = False
+            pending = pending[left]
+            slot[pending] = (slot[pending] + _U64(1)) & _U64(self.mask)
+
+    # Re-place every stored name into a larger table, the arena stays as it is
+    def _grow(self, size):
+        offsets = self.slots[self.slots != 0]
+        self._new_table(size)
+        if not len(offsets):
+            return
+        arena = self.arena
+        names = [
+            bytes(arena[o : o + arena[o - 1]])
+            for o in offsets.astype(np.int64).tolist()
+        ]
+        h = murmur3_x64_128(*to_byte_matrix(names), seed=self.hash_seed)[0]
+        self._place(h, offsets)
+
+    """
+    On-disk format support (see filter_store.py)
+     - payload: the slots, the tags and the arena, back to back
+     - from_payload: the three arrays are views of the buffer, so a mmap is searched in place;
+       a set opened this way is read-only
+    """
+
+    def header(self):
+        return {
+            "max_load": self.max_load,
+            "hash_seed": self.hash_seed,
+            "count": self.count,
+            "table_size": len(self.slots),
+            "arena_bytes": len(self.arena),
+        }
+
+    def payload(self):
+        return self.slots, self.tags, self.arena
+
+    @classmethod
+    def from_payload(cls, header, buffer):
+        hash_set = cls.__new__(cls)
+        size = header["table_size"]
+        hash_set.max_load = header["max_load"]
+        hash_set.hash_seed = header["hash_seed"]
+        hash_set.count = header["count"]
+        hash_set.mask = size - 1
+        buffer = memoryview(buffer).cast("B")
+        hash_set.slots = np.frombuffer(buffer[: size * 8], dtype=_U64)
+        hash_set.tags = np.frombuffer(buffer[size * 8 : size * 9], dtype=np.uint8)
+        hash_set.arena = buffer[size * 9 : size * 9 + header["arena_bytes"]]
+        return hash_set
+
+
+def _table_size(capacity, max_load):
+    size = 8
+    while size * max_load < capacity:
+        size *= 2
+    return size
@@ -6,13 +6,36 @@
 #  Copyright © 2025 Pinjing (Alex) Xu. All rights reserved.
 #
 
+import numpy as np
 import mmh3
 import math
 import logging
+import random
+
+from src.instrumentation import FilterStats
+from src.bucket_table import (
+    EMPTY,
+    new_bucket_table,
+    nonzero_fingerprint,
+    table_from_lists,
+)
 
 
 class CuckooFilter(object):
-    def __init__(self, capacity=int(1e9), bucket_size=4, fingerprint_size=12):
+    # Filters pickled before hash_scheme existed derived everything from one 32-bit hash
+    hash_scheme = "legacy"
+    # FilterStats once enable_stats() is called, see instrumentation.py
+    instrument = None
+
+    def __init__(
+        self,
+        capacity=int(1e9),
+        bucket_size=4,
+        fingerprint_size=12,
+        stash_size=4,
+        load_factor=0.25,
+        round_up=False,
+    ):
         # The num of slots in each bucket
         self.bucket_size = bucket_size
 
@@ -26,24 +49,38 @@ class CuckooFilter(object):
         bucket size 4 and load factor of 95% is a ideal option to use.
 
         In addition, to make sure the hash calculation results in a valid index number in the range [0, bucket_num],
-        we'll use a power of 2 as the bucket_num
+        we'll use a power of 2 as the bucket_num, rounded down: the load at capacity can then reach up
+        to twice the load factor, which the default 25% leaves room for.
+        With round_up the power of 2 is rounded up instead, so the load never exceeds the load factor
+        (up to twice the memory). filter_planner.py sizes its filters this way, with load factors
+        close to what a bucket size can hold.
         """
-        self.load_factor = 0.25
-        self.bucket_num_bit_length = int(
-            math.log2(capacity / (self.load_factor * self.bucket_size))
+        self.load_factor = load_factor
+        bit_length = math.log2(capacity / (self.load_factor * self.bucket_size))
+        self.bucket_num_bit_length = max(
+            0, math.ceil(bit_length) if round_up else int(bit_length)
         )
         self.bucket_num = 2**self.bucket_num_bit_length
 
-        self.buckets = [[] for _ in range(self.bucket_num)]
         self.finger_bits = fingerprint_size
+        self.allocate()
         self.max_kick = 800
         self.hash_seed = 42
+        self.hash_scheme = "split"
+        self.alt_offsets = self.build_alt_offsets()
+        # (bucket index, fingerprint) pairs of victims that found no slot within max_kick kicks
+        self.stash = []
+        self.stash_size = stash_size
+        # Victim selection, seeded so builds are reproducible
+        self.rng = random.Random(self.hash_seed)
 
     # Insert an username into filter
     def insert(self, username):
-        h1x = self.h1(username)
-        finger = self.fingerprint(username)
+        h1x, finger = self.index_and_fingerprint(username)
         res = self.insert_into(finger, h1x)
+        if self.instrument is not None:
+            self.instrument.count("inserts")
+            self.instrument.count("refused", res is not None)
         if res is not None:
             logging.error(res + f"\nFailed with username: {username}")
             return False
@@ -52,100 +89,271 @@ class CuckooFilter(object):
     """
     Insert fingerprint into buckets
      - finger: fingerprint of element
-     - idx: target index
-     - counter: Use a counter to keep tracking the number of times a saved record is kicked out and moved to backup bucket.
-                if the counter goes large, stop the recurrsion process and the entire filter needs to be reshuffled
+     - idx: one of the two candidate buckets of the fingerprint
+
+    Iterative random walk: if neither candidate bucket has a free slot, evict a random slot of one of
+    them, move the victim to its alternate bucket and repeat, up to max_kick times. A victim that is
+    still homeless after max_kick kicks is parked in the stash, a small overflow list that lookups
+    also check, so one unlucky insert does not force a rebuild of the whole filter.
+
+    The stash never holds the same fingerprint for the same bucket pair twice, so inserting an
+    existing name again cannot use it up.
+
+    Return None on success. Only when the stash is already full the insert is refused (and nothing
+    is evicted), the filter is then genuinely over capacity.
     """
 
-    def insert_into(self, finger: int, idx: int, counter=0):
-        try:
-            kicked_finger = None
-            if not self.full(idx):
-                self.buckets[idx].append(finger)
+    def insert_into(self, finger: int, idx: int):
+        if self.stash and self.in_stash(idx, finger):
+            return None
+        if self.place(idx, finger) or self.place(self.h2(idx, finger), finger):
+            if self.instrument is not None:
+                self.instrument.record("kick_chain", 0)
+            return None
+        if len(self.stash) >= self.stash_size:
+            return f"kicked too many times, stash is full, failed to insert, reshuffle needed! fingerprint: {finger}; index: {idx}"
+
+        if self.rng.random() < 0.5:
+            idx = self.h2(idx, finger)
+        for kicks in range(1, self.max_kick + 1):
+            finger = self.kick_out_random(idx, finger)
+            idx = self.h2(idx, finger)
+            if self.place(idx, finger):
+                if self.instrument is not None:
+                    self.instrument.record("kick_chain", kicks)
                 return None
-            else:
-                kicked_finger = self.kick_out_move_in(idx, finger)
-                h2x = self.h2(idx, kicked_finger)
-                counter += 1
-                if counter > self.max_kick:
-                    return f"kicked too many times, failed to insert, reshuffle needed! fingerprint: {finger}; index: {idx}"
-                return self.insert_into(kicked_finger, h2x, counter)
-        except IndexError:
-            logging.error(
-                f"IndexError: length: {self.bucket_num};\
-                inserting finger:{finger} into idx:{idx}, \
-                possible h2x:{self.h2(idx, self.buckets[idx][0])}"
-            )
+
+        if self.instrument is not None:
+            self.instrument.record("kick_chain", self.max_kick)
+            self.instrument.count("stashed")
+        # The victim is a duplicate of a fingerprint that is already stashed
+        if self.in_stash(idx, finger):
+            return None
+        self.stash.append((idx, finger))
+        logging.warning(
+            f"kicked too many times, moved fingerprint {finger} of bucket {idx} to stash ({len(self.stash)}/{self.stash_size})"
+        )
+        return None
 
     """
     Lookup for a username in the filter
      - username: the target string
 
-    Return True if the username is found in the filter, either in the first bucket or the backup bucket. Otherwise, return False.
+    Return True if the username is found in the filter, either in the first bucket, the backup bucket or the stash. Otherwise, return False.
     """
 
     def exist(self, username: str):
-        h1x = self.h1(username)
-        finger = self.fingerprint(username)
+        found = self.exist_at(*self.index_and_fingerprint(username))
+        if self.instrument is not None:
+            self.instrument.count("lookups")
+            self.instrument.count("positives", found)
+        return found
+
+    # Lookup by an already computed bucket index and fingerprint
+    def exist_at(self, h1x, finger):
+        if self.contains(h1x, finger):
+            return True
         h2x = self.h2(h1x, finger)
-        try:
-            if finger in self.buckets[h1x]:
-                return True
-            if finger in self.buckets[h2x]:
-                return True
-            return False
-        except IndexError:
-            logging.error(
-                f"Failed to look for user: {username}. h1x:{h1x}, finger:{finger}, h2x:{h2x}, bucket_num:{self.bucket_num}"
-            )
+        if self.contains(h2x, finger):
+            return True
+        if self.stash:
+            return self.in_stash(h1x, finger)
+        return False
+
+    # Stash entries keep one of the two buckets of the fingerprint, check both
+    def in_stash(self, idx, finger) -> bool:
+        alt = self.h2(idx, finger)
+        return (idx, finger) in self.stash or (alt, finger) in self.stash
+
+    # Bucket level operations, occupied slots are packed to the left of a bucket
+
+    def contains(self, idx, finger) -> bool:
+        # tolist() on a single row is cheaper than NumPy's element-wise __contains__
+        return finger in self.buckets[idx].tolist()
+
+    # Packed bucket_num x bucket_size fingerprint table, see bucket_table.py
+    def allocate(self):
+        self.buckets = new_bucket_table(
+            self.bucket_num, self.bucket_size, self.finger_bits
+        )
+
+    # Fingerprints of an array of buckets, one row per bucket (see BatchLookup)
+    def bucket_rows(self, idx):
+        return self.buckets[idx]
+
+    def clear(self):
+        self.buckets.fill(EMPTY)
+
+    # Put the fingerprint into the first free slot, return False if the bucket is full
+    def place(self, idx, finger) -> bool:
+        row = self.buckets[idx]
+        if row[-1] != EMPTY:
             return False
+        row[row.tolist().index(EMPTY)] = finger
+        return True
+
+    # Replace a randomly chosen slot of a full bucket with the fingerprint, return the evicted one
+    def kick_out_random(self, idx, finger) -> int:
+        slot = self.rng.randrange(self.bucket_size)
+        row = self.buckets[idx]
+        out = int(row[slot])
+        row[slot] = finger
+        return out
 
     """
-    Kick out the first(oldest) fingerprint in a bucket, and insert a new one at the end.
-     - idx: the index of the target bucket.
-     - finger: fingerprint
+    One-pass hash pipeline
+     - username: the target string
 
-     Return the oledst fingerprint that is being kicked out.
+    Return (bucket index, fingerprint) from a single 128-bit murmur3 call: the index is taken from
+    the low bits of the first 64-bit half and the fingerprint from the second half, so the two are
+    independent (the legacy scheme took the fingerprint from the index itself, which makes every
+    fingerprint of a bucket identical whenever bucket_num has fewer bits than the fingerprint).
     """
 
-    def kick_out_move_in(self, idx, finger) -> int:
-        out = self.buckets[idx][0]
-        self.buckets[idx][0] = self.buckets[idx][1]
-        self.buckets[idx][1] = self.buckets[idx][2]
-        self.buckets[idx][2] = self.buckets[idx][3]
-        self.buckets[idx][3] = finger
-        return out
+    def index_and_fingerprint(self, username):
+        if self.instrument is not None:
+            self.instrument.count("hash_calls")
+        if self.hash_scheme == "legacy":
+            h1x = mmh3.hash(username, seed=self.hash_seed) % self.bucket_num
+            return h1x, nonzero_fingerprint(h1x & ((1 << self.finger_bits) - 1))
+        return self.locate(*mmh3.hash64(username, seed=self.hash_seed, signed=False))
+
+    # Bucket index and fingerprint from the two 64-bit halves of the split scheme hash
+    def locate(self, h_idx, h_finger):
+        return h_idx & (self.bucket_num - 1), nonzero_fingerprint(
+            h_finger & ((1 << self.finger_bits) - 1)
+        )
 
-    # Fingerprint is calculated by truncate the hash value with a bitmask of length 8 or 12
+    # Fingerprints are never 0, 0 is reserved for empty slots
     def fingerprint(self, username: str):
-        return self.h1(username) & ((1 << self.finger_bits) - 1)
+        return self.index_and_fingerprint(username)[1]
 
     def h1(self, username: str) -> int:
-        return mmh3.hash(username, seed=self.hash_seed) % self.bucket_num
+        return self.index_and_fingerprint(username)[0]
 
     def h2(self, h1x: int, fingerprint: int) -> int:
         """
         To make sure the resulting H2 value lies within the range of [0, bucket_number],
             we use bitmask to constrain the value of H2, calculating as follows:
 
-            H2 = (H1 xor hash(fingerprint)) & (bucket_num - 1)
+            H2 = H1 xor (hash(fingerprint) & (bucket_num - 1))
 
-        The bitmask (bucket_num - 1) effectively truncates the result of the XOR operation
-            to the number of bits required to represent bucket_num. Since num_buckets is a power of 2,
-            (num_buckets - 1) is a bitmask with all lower bits set to 1
-            (e.g., for num_buckets = 256, the bitmask is 11111111 in binary).
+        The bitmask (bucket_num - 1) effectively truncates the hash to the number of bits required
+            to represent bucket_num. Since num_buckets is a power of 2, (num_buckets - 1) is a bitmask
+            with all lower bits set to 1 (e.g., for num_buckets = 256, the bitmask is 11111111 in binary).
+        The masked hash only depends on the fingerprint, so it is precomputed for all
+            2^finger_bits fingerprints (see build_alt_offsets) and H2 is a single table lookup.
         Reference: https://stackoverflow.com/questions/66585651
         """
-        hf = mmh3.hash(str(fingerprint), signed=False, seed=self.hash_seed)
-        return (h1x ^ hf) & (self.bucket_num - 1)
+        return h1x ^ self.alt_offsets[fingerprint]
+
+    # Alternate bucket offset of every possible fingerprint
+    def build_alt_offsets(self):
+        mask = self.bucket_num - 1
+        if self.hash_scheme == "legacy":
+            return [
+                mmh3.hash(str(f), signed=False, seed=self.hash_seed) & mask
+                for f in range(1 << self.finger_bits)
+            ]
+        return [
+            mmh3.hash(f.to_bytes(4, "little"), signed=False, seed=self.hash_seed) & mask
+            for f in range(1 << self.finger_bits)
+        ]
 
     def reset(self):
+        if self.instrument is not None:
+            self.instrument.count("resets")
         self.hash_seed += 1
-        self.buckets = [[] for _ in range(self.bucket_num)]
+        self.alt_offsets = self.build_alt_offsets()
+        self.clear()
+        self.stash = []
+        self.rng = random.Random(self.hash_seed)
+
+    def enable_stats(self):
+        self.instrument = FilterStats()
+
+    """
+    Snapshot of the filter's state: load, stash use and the bucket occupancy histogram (number of
+    buckets holding 0..bucket_size fingerprints). With enable_stats(), also the event counters and
+    the kick chain length histogram (0 for inserts that found a free slot right away).
+
+    Load and occupancy read the whole table (all of the file of a mapped filter); scan=False leaves
+    them out.
+    """
+
+    def stats(self, scan=True):
+        snapshot = {
+            "bucket_num": self.bucket_num,
+            "bucket_size": self.bucket_size,
+            "stash": len(self.stash),
+            "stash_size": self.stash_size,
+        }
+        if scan:
+            occupancy = np.bincount(
+                np.count_nonzero(self.buckets, axis=1), minlength=self.bucket_size + 1
+            )
+            snapshot["load"] = (
+                int(occupancy @ np.arange(self.bucket_size + 1)) / self.buckets.size
+            )
+            snapshot["occupancy"] = dict(enumerate(occupancy.tolist()))
+        if self.instrument is not None:
+            snapshot.update(self.instrument.snapshot())
+        return snapshot
+
+    """
+    On-disk format support (see filter_store.py)
+     - header: the parameters and the stash, JSON serializable
+     - payload: the packed bucket table
+     - from_payload: rebuild a filter around a buffer without copying it (e.g. a mmap)
+    """
+
+    def header(self):
+        return {
+            "bucket_size": self.bucket_size,
+            "load_factor": self.load_factor,
+            "bucket_num_bit_length": self.bucket_num_bit_length,
+            "bucket_num": self.bucket_num,
+            "finger_bits": self.finger_bits,
+            "dtype": self.buckets.dtype.str,
+            "max_kick": self.max_kick,
+            "hash_seed": self.hash_seed,
+            "hash_scheme": self.hash_scheme,
+            "stash": self.stash,
+            "stash_size": self.stash_size,
+        }
 
-    # check if a bucket is full
+    def payload(self):
+        return self.buckets
+
+    @classmethod
+    def from_payload(cls, header, buffer):
+        cf = cls.__new__(cls)
+        cf.__dict__.update(header)
+        del cf.dtype
+        cf.stash = [tuple(entry) for entry in header["stash"]]
+        cf.buckets = np.frombuffer(buffer, dtype=header["dtype"]).reshape(
+            cf.bucket_num, cf.bucket_size
+        )
+        cf.alt_offsets = cf.build_alt_offsets()
+        cf.rng = random.Random(cf.hash_seed)
+        return cf
+
+    # check if a bucket is full, occupied slots are packed to the left
     def full(self, idx: int):
-        return len(self.buckets[idx]) == self.bucket_size
+        return self.buckets[idx, -1] != EMPTY
+
+    # Filters pickled by older versions stored buckets as lists of lists, had no stash and no offset table
+    def __setstate__(self, state):
+        if isinstance(state["buckets"], list):
+            state["buckets"] = table_from_lists(
+                state["buckets"], state["bucket_size"], state["finger_bits"]
+            )
+        state.setdefault("stash", [])
+        state.setdefault("stash_size", 4)
+        state.setdefault("rng", random.Random(state["hash_seed"]))
+        self.__dict__.update(state)
+        if "alt_offsets" not in state:
+            self.alt_offsets = self.build_alt_offsets()
 
     def __str__(self):
-        return f"bucket size: {self.bucket_size}\nnumber of buckets: {self.bucket_num}\nfingerprint size: {self.finger_bits}\n{self.buckets}"
+        return f"bucket size: {self.bucket_size}\nnumber of buckets: {self.bucket_num}\nfingerprint size: {self.finger_bits}\nstash: {self.stash}\n{self.buckets}"
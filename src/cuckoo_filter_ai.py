@@ -5,8 +5,16 @@
 #  Created by Generative AI (DeepSeek) on 2/5/25.
 #
 
+import numpy as np
 import mmh3
 
+from src.bucket_table import (
+    EMPTY,
+    new_bucket_table,
+    nonzero_fingerprint,
+    table_from_lists,
+)
+
 
 class CuckooFilter:
     def __init__(self, capacity, bucket_size=4, fingerprint_size=8, max_kicks=500):
@@ -25,7 +33,8 @@ class CuckooFilter:
 
         # Calculate the number of buckets
         self.num_buckets = (capacity + bucket_size - 1) // bucket_size
-        self.buckets = [[] for _ in range(self.num_buckets)]
+        # Packed num_buckets x bucket_size table, fingerprint 0 marks an empty slot
+        self.buckets = new_bucket_table(self.num_buckets, bucket_size, fingerprint_size)
 
         # Mask to constrain fingerprints to the desired size
         self.fingerprint_mask = (1 << fingerprint_size) - 1
@@ -35,8 +44,8 @@ class CuckooFilter:
         return mmh3.hash(item) % self.num_buckets
 
     def _fingerprint(self, item):
-        """Compute the fingerprint of an item."""
-        return mmh3.hash(item) & self.fingerprint_mask
+        """Compute the fingerprint of an item, 0 is reserved for empty slots."""
+        return nonzero_fingerprint(mmh3.hash(item) & self.fingerprint_mask)
 
     def _alternate_bucket(self, bucket_index, fingerprint):
         """Compute the alternate bucket index using XOR."""
@@ -62,10 +71,14 @@ class CuckooFilter:
             return True
 
         # If both buckets are full, perform kicking out
+        path = []
         for _ in range(self.max_kicks):
-            # Kick out a random fingerprint from the primary bucket
-            kicked_fingerprint = self.buckets[bucket_index].pop(0)
-            self.buckets[bucket_index].append(fingerprint)
+            # Kick out the oldest fingerprint from the primary bucket
+            bucket = self.buckets[bucket_index]
+            kicked_fingerprint = int(bucket[0])
+            bucket[:-1] = bucket[1:]
+            bucket[-1] = fingerprint
+            path.append(bucket_index)
 
             # Compute the alternate bucket for the kicked fingerprint
             bucket_index = self._alternate_bucket(bucket_index, kicked_fingerprint)
@@ -75,9 +88,16 @@ class CuckooFilter:
             if self._insert_into_bucket(bucket_index, fingerprint):
                 return True
 
-        # If max kicks is reached, reshuffle the filter
-        self._reshuffle()
-        return self.insert(item)  # Retry insertion after reshuffling
+        # If max kicks is reached, undo the kicks and refuse the insert. Reshuffling cannot help:
+        # the stored fingerprints are not the items, re-hashing them as items (what the former
+        # _reshuffle did) replaced every fingerprint with a wrong one
+        for bucket_index in reversed(path):
+            bucket = self.buckets[bucket_index]
+            displaced = int(bucket[-1])
+            bucket[1:] = bucket[:-1].copy()
+            bucket[0] = fingerprint
+            fingerprint = displaced
+        return False
 
     def _insert_into_bucket(self, bucket_index, fingerprint):
         """
@@ -87,8 +107,9 @@ class CuckooFilter:
         :param fingerprint: The fingerprint to insert.
         :return: True if the insertion was successful, False otherwise.
         """
-        if len(self.buckets[bucket_index]) < self.bucket_size:
-            self.buckets[bucket_index].append(fingerprint)
+        bucket = self.buckets[bucket_index]
+        if bucket[-1] == EMPTY:
+            bucket[bucket.tolist().index(EMPTY)] = fingerprint
             return True
         return False
 
@@ -103,32 +124,63 @@ class CuckooFilter:
         bucket_index = self._hash(item)
 
         # Check the primary bucket
-        if fingerprint in self.buckets[bucket_index]:
+        if fingerprint in self.buckets[bucket_index].tolist():
             return True
 
         # Check the alternate bucket
         alt_bucket_index = self._alternate_bucket(bucket_index, fingerprint)
-        if fingerprint in self.buckets[alt_bucket_index]:
+        if fingerprint in self.buckets[alt_bucket_index].tolist():
             return True
 
         return False
 
-    def _reshuffle(self):
-        """Reshuffle the filter by reinserting all elements."""
-        print("Reshuffling the filter...")
-        all_items = []
-        for bucket in self.buckets:
-            all_items.extend(bucket)
-        self.buckets = [[] for _ in range(self.num_buckets)]
-        for fingerprint in all_items:
-            self.insert(str(fingerprint))  # Reinsert fingerprints
+    def bucket_rows(self, idx):
+        """Fingerprints of an array of buckets, one row per bucket (see BatchLookup)."""
+        return self.buckets[idx]
 
     def __str__(self):
         """String representation of the Cuckoo Filter."""
         return f"Cuckoo Filter: {self.buckets}"
 
     def reset(self):
-        pass
+        """Empty the filter, it used to keep every fingerprint."""
+        self.buckets.fill(EMPTY)
+
+    def header(self):
+        """Parameters written in front of the bucket table by filter_store.py."""
+        return {
+            "capacity": self.capacity,
+            "bucket_size": self.bucket_size,
+            "fingerprint_size": self.fingerprint_size,
+            "max_kicks": self.max_kicks,
+            "num_buckets": self.num_buckets,
+            "dtype": self.buckets.dtype.str,
+        }
+
+    def payload(self):
+        """The packed bucket table."""
+        return self.buckets
+
+    @classmethod
+    def from_payload(cls, header, buffer):
+        """Rebuild a filter around a buffer (e.g. a mmap) without copying it."""
+        cf = cls.__new__(cls)
+        for key in ("capacity", "bucket_size", "fingerprint_size", "max_kicks"):
+            setattr(cf, key, header[key])
+        cf.num_buckets = header["num_buckets"]
+        cf.buckets = np.frombuffer(buffer, dtype=header["dtype"]).reshape(
+            cf.num_buckets, cf.bucket_size
+        )
+        cf.fingerprint_mask = (1 << cf.fingerprint_size) - 1
+        return cf
+
+    def __setstate__(self, state):
+        """Convert the list-of-lists buckets of filters pickled by older versions."""
+        if isinstance(state["buckets"], list):
+            state["buckets"] = table_from_lists(
+                state["buckets"], state["bucket_size"], state["fingerprint_size"]
+            )
+        self.__dict__.update(state)
 
 
 # Example usage
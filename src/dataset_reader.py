@@ -0,0 +1,68 @@
+#
+#  dataset_reader.py
+#  Login Checker Program
+#
+
+import os
+
+from tqdm import tqdm
+
+# Bytes read per block, large enough that the per-block Python overhead vanishes
+BLOCK_SIZE = 1 << 24
+
+"""
+Streaming reader for the username datasets (one name per line).
+
+The file is read in large binary blocks and every block is split into lines with one
+bytes.splitlines call, so there is no per-line readline/strip/decode in Python. A line cut by the
+end of a block is carried over to the next one. Lines come out as bytes: the filters hash bytes to
+the same bits as the UTF-8 encoded str, so the batches can go straight into insert_many or
+BatchLookup.exist.
+
+Progress is reported by byte offset (the file size is known up front), so no counting pass over
+the file is needed to drive tqdm.
+"""
+
+
+# start and end limit the read to a byte range, they must fall on line starts (see parallel_build.split_file)
+def read_line_batches(
+    filename, block_size=BLOCK_SIZE, progress=False, start=0, end=None
+):
+    if end is None:
+        end = os.path.getsize(filename)
+    with open(filename, "rb") as f, tqdm(
+        total=end - start, unit="B", unit_scale=True, disable=not progress
+    ) as bar:
+        f.seek(start)
+        remaining = end - start
+        tail = b""
+        while remaining > 0:
+            block = f.read(min(block_size, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            bar.update(len(block))
+            block = tail + block
+            cut = block.rfind(b"\n") + 1
+            tail = block[cut:]
+            if cut:
+                yield block[:cut].splitlines()
+        if tail:
+            yield tail.splitlines()
+
+
+# All lines of the file, one by one
+def read_lines(filename, block_size=BLOCK_SIZE, progress=False):
+    for batch in read_line_batches(filename, block_size, progress):
+        yield from batch
+
+
+# Count newline-terminated lines (plus an unterminated last one) without splitting them
+def count_lines(filename, block_size=BLOCK_SIZE):
+    count = 0
+    last = b"\n"
+    with open(filename, "rb") as f:
+        while block := f.read(block_size):
+            count += block.count(b"\n")
+            last = block[-1:]
+    return count + (last != b"\n")
@@ -0,0 +1,170 @@
+#
+#  filter_planner.py
+#  Login Checker Program
+#
+
+import math
+
+from src.blocked_bloom_filter import BlockedBloomFilter, BLOCK_BITS
+from src.bloom_filter import BloomFilter
+from src.bucket_table import fingerprint_dtype
+from src.cuckoo_filter import CuckooFilter
+
+"""
+Filter sizing from the number of items, a target false positive rate and/or a memory budget.
+
+    plan = plan_filter(count_lines(filename), fpr=0.01)
+    print(plan)               # kind, parameters, expected memory and false positive rate
+    filter = plan.new_filter()
+
+ - fpr only: the smallest filter reaching the rate
+ - memory_bytes only: the lowest rate that fits the budget
+ - both: the smallest filter reaching the rate within the budget, ValueError if there is none
+
+Bloom filters are sized by the textbook formulas (the same ones BloomFilter uses). Cuckoo filters
+pick a bucket size, a fingerprint width and a load factor; the bucket count is a power of 2 rounded
+up (round_up=True, unlike the plain CuckooFilter constructor), so the real load ends up between half the load factor and the load factor, and the expected rate is
+computed from the real load. Fingerprints are stored in whole bytes (see bucket_table.py), so only
+8 and 16-bit fingerprints are planned: anything in between costs as much as 16 bits.
+"""
+
+KINDS = ("bloom", "cuckoo")
+PLAN_KINDS = ("bloom", "blocked_bloom", "cuckoo")
+# Load every bucket size fills to reliably, with a margin below the ~84% / 95% / 98% where inserts
+# start failing (Fan et al., "Cuckoo Filter: Practically Better Than Bloom")
+CUCKOO_LOAD_FACTORS = {2: 0.8, 4: 0.9, 8: 0.95}
+CUCKOO_FINGERPRINT_BITS = (8, 16)
+
+
+class FilterPlan:
+    """
+    Parameters of one filter and what to expect from it.
+
+    :param kind: one of PLAN_KINDS.
+    :param num_items: number of items the filter is sized for.
+    :param params: keyword arguments of the filter class.
+    :param memory_bytes: size of the filter's table.
+    :param fpr: expected false positive rate once all items are inserted.
+    """
+
+    def __init__(self, kind, num_items, params, memory_bytes, fpr):
+        self.kind = kind
+        self.num_items = num_items
+        self.params = params
+        self.memory_bytes = memory_bytes
+        self.fpr = fpr
+
+    def new_filter(self):
+        if self.kind == "bloom":
+            return BloomFilter(**self.params)
+        if self.kind == "blocked_bloom":
+            return BlockedBloomFilter(**self.params)
+        return CuckooFilter(**self.params)
+
+    def __repr__(self):
+        params = ", ".join(f"{k}={v}" for k, v in self.params.items())
+        return (
+            f"{self.kind}({params}): {self.memory_bytes / 2**20:.2f} MiB, "
+            f"expected false positive rate {self.fpr:.3g}"
+        )
+
+
+# (1 - e^(-kn/m))^k for n items in m bits probed by k hash functions
+def bloom_fpr(num_items, num_bits, num_hash):
+    return (1 - math.exp(-num_hash * num_items / num_bits)) ** num_hash
+
+
+def bloom_plan(num_items, fpr=None, memory_bytes=None, blocked=False):
+    prob = fpr
+    if prob is None:
+        # The rate whose optimal bit count is the whole budget
+        budget_bits = memory_bytes * 8
+        if blocked:
+            budget_bits -= budget_bits % BLOCK_BITS
+        prob = min(math.exp(-budget_bits * math.log(2) ** 2 / num_items), 0.5)
+    while True:
+        plan = _bloom_plan(num_items, prob, blocked)
+        # k is rounded down, which can miss the target by a hair: ask for a little less
+        if fpr is None or plan.fpr <= fpr:
+            return plan
+        prob *= 0.99
+
+
+def _bloom_plan(num_items, prob, blocked):
+    # Mirrors the sizing in BloomFilter.__init__ and BlockedBloomFilter.__init__
+    num_bits = int(-1 * num_items * math.log(prob) / (math.log(2)) ** 2)
+    num_hash = max(1, int(num_bits / num_items * math.log(2)))
+    if blocked:
+        num_bits = max(1, -(-num_bits // BLOCK_BITS)) * BLOCK_BITS
+    return FilterPlan(
+        "blocked_bloom" if blocked else "bloom",
+        num_items,
+        {"num_users": num_items, "prob": prob},
+        num_bits // 8,
+        # Blocks fill unevenly, a blocked filter does a little worse (see fpr_penalty)
+        bloom_fpr(num_items, num_bits, num_hash),
+    )
+
+
+# Every bucket size and fingerprint width, sized like CuckooFilter.__init__ sizes its table with round_up
+def cuckoo_plans(num_items):
+    for bucket_size, load_factor in CUCKOO_LOAD_FACTORS.items():
+        bucket_num = 2 ** max(
+            0, math.ceil(math.log2(num_items / (load_factor * bucket_size)))
+        )
+        load = num_items / (bucket_num * bucket_size)
+        for fingerprint_size in CUCKOO_FINGERPRINT_BITS:
+            itemsize = fingerprint_dtype(fingerprint_size)().itemsize
+            yield FilterPlan(
+                "cuckoo",
+                num_items,
+                {
+                    "capacity": num_items,
+                    "bucket_size": bucket_size,
+                    "fingerprint_size": fingerprint_size,
+                    "load_factor": load_factor,
+                    "round_up": True,
+                },
+                bucket_num * bucket_size * itemsize,
+                # A lookup compares against 2 buckets of bucket_size slots, load of them occupied
+                1 - (1 - 2.0**-fingerprint_size) ** (2 * bucket_size * load),
+            )
+
+
+def plan_filter(num_items, fpr=None, memory_bytes=None, kinds=KINDS):
+    if fpr is None and memory_bytes is None:
+        raise ValueError(
+            "Plan needs a target false positive rate, a memory budget or both"
+        )
+    if fpr is not None and not 0 < fpr < 1:
+        raise ValueError(f"False positive rate must be in (0, 1), got {fpr}")
+    for kind in kinds:
+        if kind not in PLAN_KINDS:
+            raise ValueError(f"Unknown filter kind: {kind}")
+    num_items = max(int(num_items), 1)
+
+    candidates = []
+    for kind in kinds:
+        if kind == "cuckoo":
+            candidates.extend(cuckoo_plans(num_items))
+        elif fpr is not None:
+            candidates.append(bloom_plan(num_items, fpr, blocked=kind != "bloom"))
+        else:
+            candidates.append(
+                bloom_plan(
+                    num_items, memory_bytes=memory_bytes, blocked=kind != "bloom"
+                )
+            )
+
+    if fpr is not None:
+        candidates = [plan for plan in candidates if plan.fpr <= fpr]
+    if memory_bytes is not None:
+        candidates = [plan for plan in candidates if plan.memory_bytes <= memory_bytes]
+    if not candidates:
+        raise ValueError(
+            f"No {'/'.join(kinds)} filter for {num_items} items reaches false positive "
+            f"rate {fpr} within {memory_bytes} bytes"
+        )
+    if fpr is not None:
+        return min(candidates, key=lambda plan: (plan.memory_bytes, plan.fpr))
+    return min(candidates, key=lambda plan: (plan.fpr, plan.memory_bytes))
@@ -0,0 +1,176 @@
+#
+#  filter_store.py
+#  Login Checker Program
+#
+
+import json
+import mmap
+import os
+import struct
+
+import numpy as np
+
+from src.binary_fuse_filter import BinaryFuseFilter
+from src.blocked_bloom_filter import BlockedBloomFilter
+from src.bloom_filter import BloomFilter
+from src.compact_hash_set import CompactHashSet
+from src.cuckoo_filter import CuckooFilter
+from src.cuckoo_filter_ai import CuckooFilter as CuckooFilterAI
+from src.front_coded_store import FrontCodedStore
+from src.growable_cuckoo_filter import GrowableCuckooFilter
+from src.scalable_bloom_filter import ScalableBloomFilter
+from src.semi_sorted_cuckoo_filter import SemiSortedCuckooFilter
+
+"""
+Versioned binary file format for saved filters, replacing pickle snapshots.
+
+    | preamble (16 bytes) | JSON header | zero padding | payload |
+
+ - preamble: magic b"LCFILTER", format version (u16), flags (u16, unused), header length (u32)
+ - header: {"type": ..., "params": filter.header(), "payload_bytes": ...}, i.e. the filter type,
+   its sizes, seeds and hash scheme
+ - payload: the raw bit array or bucket table (or the arrays of an exact store, back to back),
+   starting at a 64-byte aligned offset
+
+Because the payload is stored exactly as it sits in memory, open_filter can memory-map the file and
+build the filter around the mapping: lookups start right away and pages are read on demand.
+"""
+
+MAGIC = b"LCFILTER"
+FORMAT_VERSION = 1
+PAYLOAD_ALIGN = 64
+PREAMBLE = struct.Struct("<8sHHI")
+
+FILTER_TYPES = {
+    "bloom": BloomFilter,
+    "blocked_bloom": BlockedBloomFilter,
+    "cuckoo": CuckooFilter,
+    "cuckoo_ai": CuckooFilterAI,
+    "semi_sorted_cuckoo": SemiSortedCuckooFilter,
+    "scalable_bloom": ScalableBloomFilter,
+    "growable_cuckoo": GrowableCuckooFilter,
+    "binary_fuse": BinaryFuseFilter,
+    "compact_hash_set": CompactHashSet,
+    "front_coded": FrontCodedStore,
+}
+
+
+def filter_type(filter):
+    for name, cls in FILTER_TYPES.items():
+        if type(filter) is cls:
+            return name
+    raise TypeError(f"Filter type {type(filter)} cannot be saved")
+
+
+def _payload_offset(header_len):
+    end = PREAMBLE.size + header_len
+    return -(-end // PAYLOAD_ALIGN) * PAYLOAD_ALIGN
+
+
+# payload() may return a tuple of buffers, they are stored back to back as one payload
+def payload_parts(filter):
+    payload = filter.payload()
+    parts = payload if isinstance(payload, tuple) else (payload,)
+    return [memoryview(part).cast("B") for part in parts]
+
+
+# fsync a directory, so a rename inside it is durable (directories cannot be opened on Windows)
+def _fsync_dir(dirname):
+    if os.name != "posix":
+        return
+    fd = os.open(dirname or ".", os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+"""
+Write the filter to a temporary file first, so a crash never leaves a half written snapshot.
+
+The temporary file is fsynced before it replaces the old snapshot and the directory after, so once
+save_filter returns the new snapshot survives a power loss (journal.py relies on this before it
+empties its journal).
+"""
+
+
+def save_filter(filter, filename):
+    parts = payload_parts(filter)
+    header = json.dumps(
+        {
+            "type": filter_type(filter),
+            "params": filter.header(),
+            "payload_bytes": sum(part.nbytes for part in parts),
+        }
+    ).encode()
+    offset = _payload_offset(len(header))
+
+    tmp_filename = filename + ".tmp"
+    with open(tmp_filename, "wb") as f:
+        f.write(PREAMBLE.pack(MAGIC, FORMAT_VERSION, 0, len(header)))
+        f.write(header)
+        f.write(b"\0" * (offset - PREAMBLE.size - len(header)))
+        for part in parts:
+            f.write(part)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_filename, filename)
+    _fsync_dir(os.path.dirname(filename))
+
+
+def is_filter_file(filename):
+    with open(filename, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+# Return the parsed header and the offset of the payload
+def read_header(f):
+    magic, version, _, header_len = PREAMBLE.unpack(f.read(PREAMBLE.size))
+    if magic != MAGIC:
+        raise ValueError("Not a saved filter file")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported filter file version: {version}")
+    header = json.loads(f.read(header_len))
+    return header, _payload_offset(header_len)
+
+
+"""
+Open a saved filter
+ - filename: file written by save_filter
+ - mmap_mode: like numpy.load,
+        None: read the payload into memory;
+        "r": map the file read-only, inserts fail but nothing is read until a lookup needs it;
+        "c": map the file copy-on-write, inserts change memory only, never the file.
+
+A filter opened with "r" always matches its file, it remembers the file name in saved_filename so
+other processes can map the same file instead of copying the filter (see lookup_pool.py).
+"""
+
+
+def open_filter(filename, mmap_mode="r"):
+    if mmap_mode not in (None, "r", "c"):
+        raise ValueError(f"Unknown mmap mode: {mmap_mode}")
+    with open(filename, "rb") as f:
+        header, offset = read_header(f)
+        size = header["payload_bytes"]
+        if mmap_mode is None:
+            # Keep the in-memory copy 64-byte aligned as well
+            raw = np.empty(size + PAYLOAD_ALIGN, dtype=np.uint8)
+            start = -raw.ctypes.data % PAYLOAD_ALIGN
+            buffer = raw[start : start + size]
+            f.seek(offset)
+            if f.readinto(buffer) != size:
+                raise ValueError("Truncated filter file")
+        elif size == 0:
+            buffer = bytearray()
+        else:
+            access = mmap.ACCESS_READ if mmap_mode == "r" else mmap.ACCESS_COPY
+            # The mapping stays alive as long as the filter holds the view
+            mapped = mmap.mmap(f.fileno(), 0, access=access)
+            if len(mapped) < offset + size:
+                raise ValueError("Truncated filter file")
+            buffer = memoryview(mapped)[offset : offset + size]
+    filter = FILTER_TYPES[header["type"]].from_payload(header["params"], buffer)
+    if mmap_mode == "r":
+        filter.saved_filename = os.path.abspath(filename)
+    return filter
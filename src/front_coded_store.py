@@ -0,0 +1,180 @@
+#
+#  front_coded_store.py
+#  Login Checker Program
+#
+
+from array import array
+import os
+
+from src.dataset_reader import read_lines
+
+# Keys per block, a lookup decodes at most one block
+BLOCK_KEYS = 16
+
+
+def _write_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data, pos):
+    value, shift = 0, 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+class FrontCodedStore:
+    """
+    Compressed, exact store of a sorted list of usernames.
+
+    Names are cut into blocks of block_keys. The first name of a block is stored in full
+    (varint length + bytes); every following one as the length of the prefix it shares with the
+    previous name, then the length and bytes of the rest:
+
+        block: | len | key 0 | shared | len | suffix 1 | shared | len | suffix 2 | ...
+
+    Sorted usernames share long prefixes, so most names shrink to a few bytes. The only index is
+    the byte offset of every block (8 bytes per block_keys names): since block starts hold full
+    keys, they double as the sampled first-key index. contains() binary searches the block starts
+    and then decodes a single block.
+
+    Saved and memory-mapped through filter_store.py like the filters.
+
+    :param block_keys: names per block, more compress better but make lookups decode more.
+    """
+
+    def __init__(self, block_keys=BLOCK_KEYS):
+        self.block_keys = block_keys
+        self.count = 0
+        self.data = bytearray()
+        self.block_offsets = array("Q")
+        self._last = None
+
+    # Build from names in sorted order (str or bytes)
+    @classmethod
+    def from_sorted(cls, names, block_keys=BLOCK_KEYS):
+        store = cls(block_keys)
+        for name in names:
+            store.append(name)
+        return store
+
+    @classmethod
+    def from_file(cls, filename, block_keys=BLOCK_KEYS):
+        return cls.from_sorted(read_lines(filename, progress=True), block_keys)
+
+    # Add a name larger than every name in the store
+    def append(self, name):
+        if isinstance(name, str):
+            name = name.encode("utf-8")
+        last, data = self._last, self.data
+        if last is not None and name <= last:
+            raise ValueError(
+                f"Names must be sorted and unique, got {name!r} after {last!r}"
+            )
+        if self.count % self.block_keys == 0:
+            self.block_offsets.append(len(data))
+            _write_varint(data, len(name))
+            data += name
+        else:
+            shared = len(os.path.commonprefix((last, name)))
+            _write_varint(data, shared)
+            _write_varint(data, len(name) - shared)
+            data += name[shared:]
+        self._last = name
+        self.count += 1
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def nbytes(self):
+        return len(self.data) + self.block_offsets.itemsize * len(self.block_offsets)
+
+    def first_key(self, block):
+        length, pos = _read_varint(self.data, self.block_offsets[block])
+        return bytes(self.data[pos : pos + length])
+
+    # Decode the names of one block
+    def block(self, block):
+        data = self.data
+        pos = self.block_offsets[block]
+        end = (
+            self.block_offsets[block + 1]
+            if block + 1 < len(self.block_offsets)
+            else len(data)
+        )
+        length, pos = _read_varint(data, pos)
+        name = bytes(data[pos : pos + length])
+        pos += length
+        yield name
+        while pos < end:
+            shared, pos = _read_varint(data, pos)
+            length, pos = _read_varint(data, pos)
+            name = name[:shared] + bytes(data[pos : pos + length])
+            pos += length
+            yield name
+
+    def __iter__(self):
+        for block in range(len(self.block_offsets)):
+            yield from self.block(block)
+
+    # Binary search the last block starting at or before the name, then scan that block
+    def contains(self, name):
+        if isinstance(name, str):
+            name = name.encode("utf-8")
+        low, high = 0, len(self.block_offsets) - 1
+        if high < 0 or name < self.first_key(0):
+            return False
+        while low < high:
+            mid = (low + high + 1) // 2
+            if self.first_key(mid) <= name:
+                low = mid
+            else:
+                high = mid - 1
+        for key in self.block(low):
+            if key >= name:
+                return key == name
+        return False
+
+    # Same interface as the filters, but the answer is exact
+    def exist(self, name):
+        return self.contains(name)
+
+    def __contains__(self, name):
+        return self.contains(name)
+
+    """
+    On-disk format support (see filter_store.py)
+     - payload: the block offsets, then the encoded blocks
+     - from_payload: both are views of the buffer, a store opened this way is read-only
+    """
+
+    def header(self):
+        return {
+            "block_keys": self.block_keys,
+            "count": self.count,
+            "num_blocks": len(self.block_offsets),
+            "data_bytes": len(self.data),
+        }
+
+    def payload(self):
+        return self.block_offsets, self.data
+
+    @classmethod
+    def from_payload(cls, header, buffer):
+        store = cls.__new__(cls)
+        store.block_keys = header["block_keys"]
+        store.count = header["count"]
+        buffer = memoryview(buffer).cast("B")
+        index_bytes = header["num_blocks"] * 8
+        store.block_offsets = buffer[:index_bytes].cast("Q")
+        store.data = buffer[index_bytes : index_bytes + header["data_bytes"]]
+        store._last = None
+        return store
@@ -0,0 +1,157 @@
+#
+#  growable_cuckoo_filter.py
+#  Login Checker Program
+#
+
+import logging
+
+import mmh3
+import numpy as np
+
+from src.cuckoo_filter import CuckooFilter
+
+"""
+Growable cuckoo filter: a chain of CuckooFilter tables, in the spirit of the scalable Bloom filter
+(see scalable_bloom_filter.py).
+
+Inserts go into the newest table. When it refuses an insert (its kick walk failed and its stash is
+full, nothing was evicted) a new table is added, growth times larger, with one more fingerprint
+bit, and the insert is retried there. A lookup checks every table: table i has false positive rate
+at most 2 * bucket_size / 2^(fingerprint_size + i) (a full table), so the rates of the whole chain
+add up to less than twice that of a full first table, see fpr_bound.
+
+The bound only holds while every table gets one more bit, and fingerprints stop at 16 bits. The
+chain therefore holds at most 16 - fingerprint_size + 1 tables: once the last of them refuses an
+insert, the insert is refused (logged, returns False) like CuckooFilter's. Start with short
+fingerprints (the default 12 bits allow 5 tables) to leave room to grow.
+
+The tables are never rebuilt. Doubling a table in place would need index bits the fingerprints do
+not carry (index and fingerprint come from independent halves of the hash), so the stored
+fingerprints stay where they are and growth adds capacity next to them; nothing is re-read from
+the source data, unlike reset() followed by a full rebuild.
+
+All tables share one hash seed: a name is hashed once and every table takes its own bucket index
+and fingerprint from the same two halves (see CuckooFilter.locate).
+"""
+
+MAX_FINGERPRINT_BITS = 16
+
+
+class GrowableCuckooFilter:
+    """
+    Cuckoo filter that adds tables instead of refusing inserts.
+
+    :param initial_capacity: items the first table is sized for.
+    :param growth: capacity ratio of two consecutive tables.
+    :param table_kwargs: CuckooFilter arguments of the first table (bucket_size, fingerprint_size,
+        stash_size, load_factor).
+    """
+
+    def __init__(self, initial_capacity=1_000_000, growth=2, **table_kwargs):
+        self.initial_capacity = initial_capacity
+        self.growth = growth
+        self.table_kwargs = table_kwargs
+        self.tables = []
+        self._add_table()
+
+    @property
+    def fingerprint_size(self):
+        return self.table_kwargs.get("fingerprint_size", 12)
+
+    # Every table has one more fingerprint bit than the one before, up to MAX_FINGERPRINT_BITS
+    @property
+    def max_tables(self):
+        return MAX_FINGERPRINT_BITS - self.fingerprint_size + 1
+
+    def _add_table(self):
+        i = len(self.tables)
+        kwargs = dict(self.table_kwargs)
+        kwargs["fingerprint_size"] = self.fingerprint_size + i
+        table = CuckooFilter(
+            capacity=int(self.initial_capacity * self.growth**i), **kwargs
+        )
+        self.tables.append(table)
+        if i:
+            logging.warning(
+                f"cuckoo table {i - 1} is full, added table {i} with {table.bucket_num} buckets"
+            )
+
+    @property
+    def hash_seed(self):
+        return self.tables[0].hash_seed
+
+    def insert(self, username):
+        h_idx, h_finger = mmh3.hash64(username, seed=self.hash_seed, signed=False)
+        while True:
+            table = self.tables[-1]
+            h1x, finger = table.locate(h_idx, h_finger)
+            if table.insert_into(finger, h1x) is None:
+                return True
+            if len(self.tables) >= self.max_tables:
+                logging.error(
+                    f"all {len(self.tables)} cuckoo tables are full, failed with username: {username}"
+                )
+                return False
+            self._add_table()
+
+    def exist(self, username):
+        h_idx, h_finger = mmh3.hash64(username, seed=self.hash_seed, signed=False)
+        return any(
+            table.exist_at(*table.locate(h_idx, h_finger))
+            for table in reversed(self.tables)
+        )
+
+    # Sum of the tables' false positive rates at their current load, at most twice a full first table's
+    def fpr_bound(self):
+        return sum(
+            2
+            * np.count_nonzero(table.buckets)
+            / table.bucket_num
+            / 2**table.finger_bits
+            for table in self.tables
+        )
+
+    # The bound needs every table's load, so it is only computed with scan
+    def stats(self, scan=True):
+        snapshot = {
+            "tables": len(self.tables),
+            "bucket_num": sum(table.bucket_num for table in self.tables),
+            "memory_bytes": sum(table.buckets.nbytes for table in self.tables),
+            "filters": [table.stats(scan) for table in self.tables],
+        }
+        if scan:
+            snapshot["fpr_bound"] = self.fpr_bound()
+        return snapshot
+
+    """
+    On-disk format support (see filter_store.py)
+     - header: the chain parameters and every table's own header
+     - payload: the tables' bucket tables, back to back
+     - from_payload: split the buffer by the tables' byte sizes, without copying it
+    """
+
+    def header(self):
+        return {
+            "initial_capacity": self.initial_capacity,
+            "growth": self.growth,
+            "table_kwargs": self.table_kwargs,
+            "tables": [table.header() for table in self.tables],
+            "nbytes": [table.buckets.nbytes for table in self.tables],
+        }
+
+    def payload(self):
+        return tuple(table.payload() for table in self.tables)
+
+    @classmethod
+    def from_payload(cls, header, buffer):
+        gcf = cls.__new__(cls)
+        for key in ("initial_capacity", "growth", "table_kwargs"):
+            setattr(gcf, key, header[key])
+        gcf.tables = []
+        offset = 0
+        for params, nbytes in zip(header["tables"], header["nbytes"]):
+            gcf.tables.append(
+                CuckooFilter.from_payload(params, buffer[offset : offset + nbytes])
+            )
+            offset += nbytes
+        return gcf
@@ -6,20 +6,44 @@
 #  Copyright © 2025 Pinjing (Alex) Xu. All rights reserved.
 #
 
-from tqdm import tqdm
-
+from src.batch_lookup import BatchLookup
+from src.binary_fuse_filter import BinaryFuseFilter
+from src.blocked_bloom_filter import BlockedBloomFilter
 from src.bloom_filter import BloomFilter
 from src.cuckoo_filter import CuckooFilter
 from src.cuckoo_filter_ai import CuckooFilter as CuckooFilterAI
-
+from src.dataset_reader import read_line_batches, read_lines, count_lines
+from src.filter_store import save_filter, open_filter, is_filter_file
+from src.filter_planner import plan_filter
+from src.parallel_build import build_bloom_filter_parallel
+from src.login_checker import LoginChecker
+from src.lookup_pool import LookupPool
+from src.merge_join import merge_join
+from src.result_cache import CachedFilter
+from src.sorted_index import SortedFileIndex
+from src.sharded_cuckoo_filter import (
+    build_sharded_cuckoo_filter,
+    is_sharded_filter,
+    open_sharded_filter,
+)
+
+import math
+import os
 import pickle
 import time
 
 DATA_DIR = "data/"
 SORTED_USERNAMES_FILE = DATA_DIR + "sorted_usernames.txt"
 USERNAMES_CHECK_FILE = DATA_DIR + "usernames_check.txt"
-SAVED_BLOOM_FILTER = DATA_DIR + "prebuild/saved_bloom_filter.pkl"
-SAVED_CUCKOO_FILTER = DATA_DIR + "prebuild/saved_cuckoo_filter.pkl"
+SAVED_BLOOM_FILTER = DATA_DIR + "prebuild/saved_bloom_filter.bin"
+SAVED_CUCKOO_FILTER = DATA_DIR + "prebuild/saved_cuckoo_filter.bin"
+SAVED_BINARY_FUSE_FILTER = DATA_DIR + "prebuild/saved_binary_fuse_filter.bin"
+# A directory of shard files plus a manifest, see sharded_cuckoo_filter.py
+SAVED_SHARDED_CUCKOO_FILTER = DATA_DIR + "prebuild/saved_sharded_cuckoo_filter.shards"
+# False positive rate targets of the built filters when neither a rate nor a memory budget is
+# given, see filter_planner.py
+BLOOM_FPR = 0.05
+CUCKOO_FPR = 0.001
 
 
 def resamble_filename(src: str, dataset_postfix, ai=False):
@@ -29,58 +53,105 @@ def resamble_filename(src: str, dataset_postfix, ai=False):
     return parts[0] + dataset_postfix + "." + parts[1]
 
 
-def build_bloom_filter_from_file(filename):
+def build_bloom_filter_from_file(
+    filename, blocked=False, processes=1, fpr=None, memory_bytes=None
+):
     print("Initializing...")
-    total = num_line(filename)
-    print("Building Bloom Filter from file", filename)
-    bloom_filter = BloomFilter(prob=0.05)
+    if fpr is None and memory_bytes is None:
+        fpr = BLOOM_FPR
+    # Sized for the lines actually in the file, not for the filters' default of 1e9 users
+    plan = plan_filter(
+        num_line(filename),
+        fpr,
+        memory_bytes,
+        kinds=("blocked_bloom" if blocked else "bloom",),
+    )
+    print("- Filter plan:", plan)
+    filter_cls = BlockedBloomFilter if blocked else BloomFilter
+    if processes != 1:
+        # Sharded build, workers OR-merge into a filter identical to the serial one
+        print("Building Bloom Filter from file", filename, "with a process pool")
+        bloom_filter = build_bloom_filter_parallel(
+            filename, filter_cls, processes, **plan.params
+        )
+    else:
+        print("Building Bloom Filter from file", filename)
+        bloom_filter = plan.new_filter()
 
-    # Insert data into filter
-    with open(filename, "r") as f:
-        for line in tqdm(f, total=total):
-            bloom_filter.insert(line.strip())
+        # Insert data into filter, a block of lines at a time
+        for batch in read_line_batches(filename, progress=True):
+            bloom_filter.insert_many(batch)
+    print("- Filter stats:", bloom_filter.stats(scan=False))
 
     # Save data structure onto local disk as binary file for future use
     print(
         "Saving binary into ",
         resamble_filename(
-            SAVED_BLOOM_FILTER, "_" + filename.split("_")[2].split(".")[0]
+            SAVED_BLOOM_FILTER,
+            "_" + filename.split("_")[2].split(".")[0] + ("Blocked" if blocked else ""),
         ),
     )
-    with open(
+    save_filter(
+        bloom_filter,
         resamble_filename(
-            SAVED_BLOOM_FILTER, "_" + filename.split("_")[2].split(".")[0]
+            SAVED_BLOOM_FILTER,
+            "_" + filename.split("_")[2].split(".")[0] + ("Blocked" if blocked else ""),
         ),
-        "wb",
-    ) as output_file:
-        pickle.dump(bloom_filter, output_file)
+    )
 
 
-def build_cuckoo_filter_from_file(filename, use_ai=False):
+def build_cuckoo_filter_from_file(
+    filename, use_ai=False, shards=1, processes=None, fpr=None, memory_bytes=None
+):
     print("Initializing (this may take a while)...")
+    if fpr is None and memory_bytes is None:
+        fpr = CUCKOO_FPR
     total = num_line(filename)
+    plan = plan_filter(total, fpr, memory_bytes, kinds=("cuckoo",))
+    print("- Filter plan:", plan)
+    if shards != 1:
+        # Every shard is built by its own worker and saved straight into the directory
+        directory = resamble_filename(
+            SAVED_SHARDED_CUCKOO_FILTER, "_" + filename.split("_")[2].split(".")[0]
+        )
+        print("Building", shards, "Cuckoo Filter shards from file", filename)
+        build_sharded_cuckoo_filter(
+            filename,
+            directory,
+            num_shards=shards,
+            processes=processes,
+            **plan.params,
+        )
+        print("Saved shards into ", directory)
+        return
+
     print("Building Cuckoo Filter from file", filename)
     cuckoo_filter = None
     if use_ai:
+        # Sized in slots, without a load factor of its own
         cuckoo_filter = CuckooFilterAI(
-            capacity=int(total * 5), bucket_size=8, fingerprint_size=12
+            capacity=math.ceil(total / plan.params["load_factor"]),
+            bucket_size=plan.params["bucket_size"],
+            fingerprint_size=plan.params["fingerprint_size"],
         )
     else:
-        cuckoo_filter = CuckooFilter(
-            capacity=int(total * 5), bucket_size=8, fingerprint_size=12
-        )
-
-    # Insert data into filter
-    success = False
-    while not success:
-        with open(filename, "r") as f:
-            for line in tqdm(f, total=total):
-                success = cuckoo_filter.insert(line.strip())
-                if not success:
-                    # reshuffle
-                    print("reshuffling...")
-                    cuckoo_filter.reset()
-                    break
+        cuckoo_filter = plan.new_filter()
+
+    # Count kick chains and stash moves while building, printed with the filter stats below
+    if hasattr(cuckoo_filter, "enable_stats"):
+        cuckoo_filter.enable_stats()
+
+    # Insert data into filter. Failed kick walks end up in the victim stash, an insert is only
+    # refused once the stash overflows: the filter is over capacity and re-reading the file with
+    # the same capacity would not help, so stop instead of rebuilding
+    for line_num, line in enumerate(read_lines(filename, progress=True)):
+        if not cuckoo_filter.insert(line):
+            raise RuntimeError(
+                f"Cuckoo filter is full after {line_num} of {total} usernames, "
+                "build it again with a larger capacity"
+            )
+    if hasattr(cuckoo_filter, "stats"):
+        print("- Filter stats:", cuckoo_filter.stats(scan=False))
 
     # Save data structure onto local disk as binary file for future use
     print(
@@ -89,63 +160,192 @@ def build_cuckoo_filter_from_file(filename, use_ai=False):
             SAVED_CUCKOO_FILTER, "_" + filename.split("_")[2].split(".")[0], use_ai
         ),
     )
-    with open(
+    save_filter(
+        cuckoo_filter,
         resamble_filename(
             SAVED_CUCKOO_FILTER, "_" + filename.split("_")[2].split(".")[0], use_ai
         ),
-        "wb",
-    ) as output_file:
-        pickle.dump(cuckoo_filter, output_file)
+    )
+
 
+# Static filter for the immutable datasets, built from all names at once (see binary_fuse_filter.py)
+def build_binary_fuse_filter_from_file(filename):
+    print("Building Binary Fuse Filter from file", filename)
+    fuse_filter = BinaryFuseFilter.from_file(filename)
+    print("- Filter stats:", fuse_filter.stats(scan=False))
 
-def load_filter_from_disk(filename):
+    # Save data structure onto local disk as binary file for future use
+    saved = resamble_filename(
+        SAVED_BINARY_FUSE_FILTER, "_" + filename.split("_")[2].split(".")[0]
+    )
+    print("Saving binary into ", saved)
+    save_filter(fuse_filter, saved)
+
+
+# Saved filters are memory-mapped (see filter_store.py), older .pkl snapshots are still unpickled
+def load_filter_from_disk(filename, mmap_mode="r"):
     print("- Loading data from", filename)
+    if is_sharded_filter(filename):
+        return open_sharded_filter(filename, mmap_mode=mmap_mode)
+    if is_filter_file(filename):
+        return open_filter(filename, mmap_mode=mmap_mode)
     with open(filename, "rb") as f:
         return pickle.load(f)
 
 
-def check_usernames(filter, check_filename):
+# Streams the check file in batches, so the list never has to fit in memory at once
+# cache_size > 0 puts a result cache in front of the filter, see result_cache.py
+# processes != 1 checks the file with a pool of worker processes instead (saved filter types only)
+# Filter stats are the cheap counters, scan_stats=True adds the fill / occupancy scan of the whole
+# filter, which pages in all of a mapped filter
+def check_usernames(
+    filter,
+    check_filename,
+    cache_size=0,
+    cache_policy="lru",
+    processes=1,
+    scan_stats=False,
+):
     print("- Looking for usernames in filter")
-    with open(check_filename, "r") as f:
-        check_name_list = [line.strip() for line in f.readlines()]
-        counter = 0
-        t_start = time.time()
-        for username in check_name_list:
-            if filter.exist(username):
-                counter += 1
-        t_end = time.time()
-        print(
-            f"{counter}/{len(check_name_list)} usernames in the list already exists, \
-            time consumed {t_end - t_start:.4f} seconds"
-        )
+    cached = None
+    if cache_size:
+        cached = CachedFilter(filter, cache_size, cache_policy)
+    engine = BatchLookup(filter) if BatchLookup.supports(filter) else None
+    counter = 0
+    total = 0
+    t_start = time.time()
+    if processes != 1 and cached is None and LookupPool.supports(filter):
+        # Workers share one copy of the filter and each check a slice of the file, see lookup_pool.py
+        with LookupPool(filter, processes) as pool:
+            found = pool.exist_file(check_filename)
+        counter, total = int(found.sum()), len(found)
+    else:
+        for batch in read_line_batches(check_filename):
+            total += len(batch)
+            if cached is not None:
+                counter += sum(cached.exist_many(batch))
+            elif engine is not None:
+                counter += int(engine.exist(batch).sum())
+            else:
+                for username in batch:
+                    if filter.exist(username):
+                        counter += 1
+    t_end = time.time()
+    print(
+        f"{counter}/{total} usernames in the list already exists, \
+        time consumed {t_end - t_start:.4f} seconds"
+    )
+    if cached is not None:
+        print("- Result cache:", cached.stats())
+    if hasattr(filter, "stats"):
+        print("- Filter stats:", filter.stats(scan=scan_stats))
 
 
-def run_bloom_filter(dataset):
+def run_bloom_filter(dataset, blocked=False, processes=1):
     print("Running demo of Bloom Filter...")
 
     # Build the data structure from text file
-    build_bloom_filter_from_file(resamble_filename(SORTED_USERNAMES_FILE, dataset))
+    build_bloom_filter_from_file(
+        resamble_filename(SORTED_USERNAMES_FILE, dataset),
+        blocked=blocked,
+        processes=processes,
+    )
 
     # Load save binary data structure into memory
-    bf = load_filter_from_disk(resamble_filename(SAVED_BLOOM_FILTER, dataset))
+    bf = load_filter_from_disk(
+        resamble_filename(SAVED_BLOOM_FILTER, dataset + ("Blocked" if blocked else ""))
+    )
 
     # Test the lookup operation and benchmark with time elapsed
-    check_usernames(bf, USERNAMES_CHECK_FILE)
+    check_usernames(bf, USERNAMES_CHECK_FILE, processes=processes)
 
 
-def run_cuckoo_filter(dataset, ai=False):
+def run_cuckoo_filter(dataset, ai=False, shards=1, processes=1):
     print("Running demo of Cuckoo Filter...")
 
     # Build the data structure from text file
     build_cuckoo_filter_from_file(
-        resamble_filename(SORTED_USERNAMES_FILE, dataset), use_ai=ai
+        resamble_filename(SORTED_USERNAMES_FILE, dataset),
+        use_ai=ai,
+        shards=shards,
+        processes=processes,
     )
 
     # Load save binary data structure into memory
-    cf = load_filter_from_disk(resamble_filename(SAVED_CUCKOO_FILTER, dataset, ai))
+    if shards != 1:
+        cf = load_filter_from_disk(
+            resamble_filename(SAVED_SHARDED_CUCKOO_FILTER, dataset)
+        )
+    else:
+        cf = load_filter_from_disk(resamble_filename(SAVED_CUCKOO_FILTER, dataset, ai))
+
+    # Test the lookup operation and benchmark with time elapsed
+    check_usernames(cf, USERNAMES_CHECK_FILE, processes=processes)
+
+
+def run_binary_fuse_filter(dataset, processes=1):
+    print("Running demo of Binary Fuse Filter...")
+
+    # Build the data structure from text file
+    build_binary_fuse_filter_from_file(resamble_filename(SORTED_USERNAMES_FILE, dataset))
+
+    # Load save binary data structure into memory
+    fuse_filter = load_filter_from_disk(
+        resamble_filename(SAVED_BINARY_FUSE_FILTER, dataset)
+    )
 
     # Test the lookup operation and benchmark with time elapsed
-    check_usernames(cf, USERNAMES_CHECK_FILE)
+    check_usernames(fuse_filter, USERNAMES_CHECK_FILE, processes=processes)
+
+
+# Exact lookups straight from the memory-mapped sorted file, see sorted_index.py
+def run_sorted_file_index(dataset):
+    print("Running demo of Binary Search on the sorted file...")
+    print("Building or loading the line offset index...")
+    with SortedFileIndex(resamble_filename(SORTED_USERNAMES_FILE, dataset)) as index:
+        check_usernames(index, USERNAMES_CHECK_FILE)
+
+
+# Check the whole list with one sequential pass over the sorted file, see merge_join.py
+def run_merge_join(dataset):
+    print("Running demo of Sorted Merge Join...")
+    t_start = time.time()
+    result = merge_join(
+        resamble_filename(SORTED_USERNAMES_FILE, dataset), USERNAMES_CHECK_FILE
+    )
+    t_end = time.time()
+    print(
+        f"{result['hits']}/{result['total']} usernames in the list already exists, \
+        time consumed {t_end - t_start:.4f} seconds"
+    )
+
+
+# Exact answers: the saved Bloom filter answers first, the sorted file verifies its positives
+def run_login_checker(dataset):
+    print(
+        "Running demo of Login Checker (Bloom Filter, verified on the sorted file)..."
+    )
+    saved_filter = resamble_filename(SAVED_BLOOM_FILTER, dataset)
+    if not os.path.exists(saved_filter):
+        build_bloom_filter_from_file(resamble_filename(SORTED_USERNAMES_FILE, dataset))
+    bf = load_filter_from_disk(saved_filter)
+
+    with SortedFileIndex(resamble_filename(SORTED_USERNAMES_FILE, dataset)) as index:
+        checker = LoginChecker(bf, index)
+        counter = 0
+        t_start = time.time()
+        for batch in read_line_batches(USERNAMES_CHECK_FILE):
+            counter += sum(checker.exist_many(batch))
+        t_end = time.time()
+    stats = checker.stats()
+    print(
+        f"{counter}/{stats['checked']} usernames in the list already exists, \
+        time consumed {t_end - t_start:.4f} seconds"
+    )
+    print(
+        f"{stats['filtered']} answered by the filter, {stats['verified']} verified, \
+        {stats['false_positives']} false positives caught"
+    )
 
 
 # Load text file data into list of strings
@@ -153,11 +353,11 @@ def prepare_data_for_simple_search(dataset):
     name_list = None
     check_list = None
     print("Loading data from file...")
-    with open(resamble_filename(SORTED_USERNAMES_FILE, dataset), "r") as f:
-        name_list = [line.strip() for line in f]
-
-    with open(USERNAMES_CHECK_FILE, "r") as f:
-        check_list = [line.strip() for line in f]
+    name_list = [
+        line.decode("utf-8")
+        for line in read_lines(resamble_filename(SORTED_USERNAMES_FILE, dataset))
+    ]
+    check_list = [line.decode("utf-8") for line in read_lines(USERNAMES_CHECK_FILE)]
 
     if name_list is None or check_list is None:
         print("Usernames load failed. Exit.")
@@ -165,10 +365,6 @@ def prepare_data_for_simple_search(dataset):
     return name_list, check_list
 
 
-# Count total number of lines in dataset
+# Count total number of lines in dataset, see dataset_reader.count_lines
 def num_line(filename):
-    count = 0
-    with open(filename, "r") as f:
-        for _ in f:
-            count += 1
-    return count
+    return count_lines(filename)
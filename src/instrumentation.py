@@ -0,0 +1,72 @@
+#
+#  instrumentation.py
+#  Login Checker Program
+#
+
+from collections import Counter, defaultdict
+
+"""
+Opt-in hot-path instrumentation for the filters.
+
+Filters carry an `instrument` attribute that is None unless enable_stats() was called, so with
+instrumentation off every hot path pays a single `is not None` check. Once enabled, events are
+counted in a FilterStats and the filter's stats() adds the counters and histograms to its own
+snapshot (sizes, fill ratio, occupancy, ...).
+"""
+
+
+class Histogram:
+    """Counts of non-negative integers in power-of-2 buckets: bucket b holds [2^(b-1), 2^b)."""
+
+    def __init__(self):
+        self.counts = [0] * 40
+        self.total = 0
+
+    def record(self, value):
+        self.counts[min(int(value).bit_length(), len(self.counts) - 1)] += 1
+        self.total += 1
+
+    # Upper bound of the bucket holding the q-th quantile
+    def quantile(self, q):
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= q * self.total:
+                return 1 << bucket
+        return 0
+
+    def snapshot(self):
+        return {
+            "count": self.total,
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+            "buckets": {1 << b: c for b, c in enumerate(self.counts) if c},
+        }
+
+
+class FilterStats:
+    """Event counters and value histograms of one filter."""
+
+    def __init__(self):
+        self.counters = Counter()
+        self.histograms = defaultdict(Histogram)
+
+    def count(self, event, n=1):
+        self.counters[event] += n
+
+    def record(self, name, value):
+        self.histograms[name].record(value)
+
+    # Pass items through while counting them under every event, for the bulk insert/lookup paths
+    def counted(self, items, *events):
+        counters = self.counters
+        for item in items:
+            for event in events:
+                counters[event] += 1
+            yield item
+
+    def snapshot(self):
+        return {
+            "counters": dict(self.counters),
+            "histograms": {k: h.snapshot() for k, h in self.histograms.items()},
+        }
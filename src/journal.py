@@ -0,0 +1,106 @@
+#
+#  journal.py
+#  Login Checker Program
+#
+
+import logging
+import os
+
+from src.filter_store import save_filter, open_filter
+
+JOURNAL_SUFFIX = ".journal"
+
+
+class JournaledFilter:
+    """
+    A saved filter plus an append-only insert journal next to it.
+
+    New usernames are appended to <snapshot>.journal (one per line) before they are inserted, so
+    they survive a restart without rewriting the multi-GB snapshot: opening the filter maps the
+    snapshot copy-on-write and replays the journal on top of it. Every compact_every inserts (or
+    on compact()) the filter is written out as the new snapshot and the journal is emptied.
+
+    Works with every filter type filter_store.py can save, i.e. Bloom and cuckoo filters.
+
+    :param snapshot_filename: file written by filter_store.save_filter.
+    :param compact_every: journal length that triggers a compaction, None to only compact on request.
+    :param sync: fsync the journal after every insert, otherwise an OS crash can lose the last inserts.
+    """
+
+    def __init__(self, snapshot_filename, compact_every=1_000_000, sync=False):
+        self.snapshot_filename = snapshot_filename
+        self.journal_filename = snapshot_filename + JOURNAL_SUFFIX
+        self.compact_every = compact_every
+        self.sync = sync
+        self.filter = open_filter(snapshot_filename, mmap_mode="c")
+        self.pending = self.replay()
+        self.journal = open(self.journal_filename, "ab")
+
+    """
+    Insert every journaled username into the filter, return how many were replayed.
+
+    A record is only complete once its newline is written; a trailing partial record left by a crash
+    in the middle of a write is dropped and cut off the journal.
+    """
+
+    def replay(self):
+        if not os.path.exists(self.journal_filename):
+            return 0
+        with open(self.journal_filename, "rb") as f:
+            data = f.read()
+        complete = data.rfind(b"\n") + 1
+        if complete < len(data):
+            logging.warning(
+                f"Dropping a torn record at the end of {self.journal_filename}"
+            )
+            with open(self.journal_filename, "r+b") as f:
+                f.truncate(complete)
+        records = data[:complete].split(b"\n")[:-1]
+        for record in records:
+            self.filter.insert(record.decode("utf-8"))
+        return len(records)
+
+    # Write-ahead: the username is durable before the filter changes
+    def insert(self, username):
+        if "\n" in username:
+            raise ValueError("Usernames cannot contain a newline")
+        self.journal.write(username.encode("utf-8") + b"\n")
+        self.journal.flush()
+        if self.sync:
+            os.fsync(self.journal.fileno())
+        result = self.filter.insert(username)
+        self.pending += 1
+        if self.compact_every and self.pending >= self.compact_every:
+            self.compact()
+        return result
+
+    def exist(self, username):
+        return self.filter.exist(username)
+
+    """
+    Fold the journal into the snapshot.
+
+    The new snapshot replaces the old one atomically and is fsynced (see save_filter) before the
+    journal is emptied, so a power loss never leaves an empty journal next to the old snapshot. A crash in
+    between replays the journal onto a snapshot that already holds it: harmless for Bloom filters,
+    and a cuckoo filter only stores those fingerprints twice.
+    """
+
+    def compact(self):
+        save_filter(self.filter, self.snapshot_filename)
+        self.journal.truncate(0)
+        self.journal.flush()
+        if self.sync:
+            os.fsync(self.journal.fileno())
+        self.pending = 0
+        # Map the new snapshot, dropping the private pages copied from the old one
+        self.filter = open_filter(self.snapshot_filename, mmap_mode="c")
+
+    def close(self):
+        self.journal.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,72 @@
+#
+#  login_checker.py
+#  Login Checker Program
+#
+
+from src.batch_lookup import BatchLookup
+
+
+class LoginChecker:
+    """
+    Exact username checks at filter speed: filter first, verify the maybes.
+
+    A filter never answers "no" for a taken name, so a negative from the filter is final. Only
+    positives, which may be false, go to the exact verifier: SortedFileIndex (the sorted file on
+    disk), CompactHashSet or FrontCodedStore, anything with contains(). Most checked names are
+    free, so most checks stop at the in-memory filter.
+
+    Counters:
+     - filtered: answers that stopped at the filter
+     - verified: answers the verifier was asked for
+     - false_positives: verified names the verifier did not have
+
+    :param filter: any filter with exist(), batch checks use BatchLookup when it supports it.
+    :param verifier: exact store with contains().
+    """
+
+    def __init__(self, filter, verifier):
+        self.filter = filter
+        self.verifier = verifier
+        self.engine = BatchLookup(filter) if BatchLookup.supports(filter) else None
+        self.filtered = 0
+        self.verified = 0
+        self.false_positives = 0
+
+    def exist(self, username):
+        if not self.filter.exist(username):
+            self.filtered += 1
+            return False
+        return self._verify(username)
+
+    def _verify(self, username):
+        self.verified += 1
+        if self.verifier.contains(username):
+            return True
+        self.false_positives += 1
+        return False
+
+    # Check a batch of names, returns a list of booleans in input order
+    def exist_many(self, usernames):
+        usernames = list(usernames)
+        if self.engine is not None:
+            maybe = self.engine.exist(usernames).tolist()
+        else:
+            maybe = [self.filter.exist(username) for username in usernames]
+        result = []
+        for username, hit in zip(usernames, maybe):
+            if hit:
+                result.append(self._verify(username))
+            else:
+                self.filtered += 1
+                result.append(False)
+        return result
+
+    def stats(self):
+        checked = self.filtered + self.verified
+        return {
+            "checked": checked,
+            "filtered": self.filtered,
+            "verified": self.verified,
+            "false_positives": self.false_positives,
+            "verified_share": self.verified / checked if checked else 0.0,
+        }
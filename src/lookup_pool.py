@@ -0,0 +1,136 @@
+#
+#  lookup_pool.py
+#  Login Checker Program
+#
+
+from multiprocessing import Pool, shared_memory
+import json
+import os
+
+import numpy as np
+
+from src.batch_lookup import BatchLookup
+from src.filter_store import FILTER_TYPES, filter_type, payload_parts, open_filter
+from src.parallel_build import split_file, read_range
+
+# Byte ranges per worker process, more than one so a slow range does not hold up the others
+RANGES_PER_PROCESS = 4
+
+"""
+Multi-process bulk lookups over one shared copy of a filter.
+
+The filter's payload (its bit array or bucket table, the same buffers filter_store.py writes to
+disk) is copied once into a multiprocessing.shared_memory block. Every worker process rebuilds the
+filter around that block with from_payload, which wraps the buffer without copying it, so N
+workers cost one filter's worth of memory, not N, and nothing filter sized is ever pickled.
+
+A filter opened read-only from its file (filter_store.open_filter with mmap_mode "r") is not
+copied at all: every worker maps the same file, and the page cache holds one copy of the pages
+the lookups touch.
+
+    with LookupPool(filter, processes=32) as pool:
+        found = pool.exist_file("data/usernames_check.txt")  # bool per line, in file order
+
+exist_file hands each worker a line-aligned byte range of the file to read and check itself, only
+the answers travel back. exist sends chunks of an in-memory list instead. Both return the answers
+in input order. Workers answer with BatchLookup when it supports the filter.
+
+Inserts made to the filter after the pool was created are not visible to the workers.
+"""
+
+_worker = {}
+
+
+def _use(filter):
+    _worker["filter"] = filter
+    _worker["engine"] = BatchLookup(filter) if BatchLookup.supports(filter) else None
+
+
+# Pool initializer: attach to the shared block and wrap the filter around it
+def _attach(shm_name, type_name, header, nbytes):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _worker["shm"] = shm
+    _use(FILTER_TYPES[type_name].from_payload(header, shm.buf[:nbytes]))
+
+
+# Pool initializer for a filter mapped from its file: map the same file
+def _open(filename):
+    _use(open_filter(filename, mmap_mode="r"))
+
+
+def _check_names(names):
+    if _worker["engine"] is not None:
+        return _worker["engine"].exist(names)
+    filter = _worker["filter"]
+    return np.fromiter((filter.exist(name) for name in names), dtype=bool)
+
+
+def _check_range(args):
+    filename, start, end = args
+    return _check_names(list(read_range(filename, start, end)))
+
+
+class LookupPool:
+    """
+    Worker processes answering lookups against one filter in shared memory.
+
+    :param filter: any filter filter_store.py can save (see FILTER_TYPES).
+    :param processes: number of worker processes, defaults to the number of cores.
+    :param chunk_size: names per task of exist().
+    """
+
+    def __init__(self, filter, processes=None, chunk_size=1 << 16):
+        self.processes = processes or os.cpu_count()
+        self.chunk_size = chunk_size
+        filename = getattr(filter, "saved_filename", None)
+        self.shm = None
+        if filename is not None:
+            initializer, initargs = _open, (filename,)
+        else:
+            parts = payload_parts(filter)
+            nbytes = sum(part.nbytes for part in parts)
+            self.shm = shared_memory.SharedMemory(create=True, size=max(nbytes, 1))
+            offset = 0
+            for part in parts:
+                self.shm.buf[offset : offset + part.nbytes] = part
+                offset += part.nbytes
+            # Workers see the header exactly as open_filter would, after a JSON round trip
+            header = json.loads(json.dumps(filter.header()))
+            initializer = _attach
+            initargs = (self.shm.name, filter_type(filter), header, nbytes)
+        self.pool = Pool(self.processes, initializer=initializer, initargs=initargs)
+
+    @staticmethod
+    def supports(filter):
+        return type(filter) in FILTER_TYPES.values()
+
+    def exist(self, names):
+        names = list(names)
+        chunks = [
+            names[start : start + self.chunk_size]
+            for start in range(0, len(names), self.chunk_size)
+        ]
+        return self._merge(self.pool.imap(_check_names, chunks))
+
+    def exist_file(self, filename):
+        ranges = split_file(filename, self.processes * RANGES_PER_PROCESS)
+        tasks = [(filename, start, end) for start, end in ranges]
+        return self._merge(self.pool.imap(_check_range, tasks))
+
+    # imap yields in task order, so the answers come back in input order
+    @staticmethod
+    def _merge(results):
+        return np.concatenate([np.zeros(0, dtype=bool), *results])
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,84 @@
+#
+#  merge_join.py
+#  Login Checker Program
+#
+
+import heapq
+import os
+import tempfile
+
+from src.dataset_reader import read_lines
+
+# Names sorted in memory at once, longer check lists are sorted in runs on disk
+RUN_SIZE = 1_000_000
+
+
+"""
+Sort the usernames of a check file, externally if needed
+ - check_filename: one username per line, any order
+ - run_size: names sorted in memory per run
+ - tmp_dir: where the sorted runs are written
+
+Yield the names as bytes in sorted order, duplicates included. A list of up to run_size names is
+sorted in memory; a longer one is cut into sorted run files that are merged with heapq.merge.
+"""
+
+
+def sorted_names(check_filename, run_size=RUN_SIZE, tmp_dir=None):
+    run, run_files = [], []
+    with tempfile.TemporaryDirectory(dir=tmp_dir) as run_dir:
+        for name in read_lines(check_filename):
+            run.append(name)
+            if len(run) >= run_size:
+                run_files.append(_write_run(run, run_dir, len(run_files)))
+                run = []
+        if not run_files:
+            run.sort()
+            yield from run
+            return
+        if run:
+            run_files.append(_write_run(run, run_dir, len(run_files)))
+        yield from heapq.merge(*(read_lines(f) for f in run_files))
+
+
+def _write_run(run, run_dir, run_id):
+    run.sort()
+    filename = os.path.join(run_dir, f"run_{run_id:06d}.txt")
+    with open(filename, "wb") as f:
+        f.write(b"\n".join(run) + b"\n")
+    return filename
+
+
+"""
+Bulk membership by one sequential merge pass
+ - sorted_filename: the sorted dataset, e.g. sorted_usernames_*.txt
+ - check_filename: the names to check, any order
+ - collect: also return the names that were found
+ - run_size, tmp_dir: see sorted_names
+
+Both sides are walked once in sorted order, O(n + m) sequential reads instead of m independent
+lookups, with at most run_size check names in memory. Every occurrence of a name in the check
+list is counted.
+
+Return {"hits": ..., "total": ..., "matches": [...] or None}, matches as bytes in sorted order.
+"""
+
+
+def merge_join(
+    sorted_filename, check_filename, collect=False, run_size=RUN_SIZE, tmp_dir=None
+):
+    hits, total = 0, 0
+    matches = [] if collect else None
+    data = read_lines(sorted_filename)
+    current = next(data, None)
+    for name in sorted_names(check_filename, run_size, tmp_dir):
+        total += 1
+        while current is not None and current < name:
+            previous, current = current, next(data, None)
+            if current is not None and current < previous:
+                raise ValueError(f"{sorted_filename} is not sorted at {current!r}")
+        if current == name:
+            hits += 1
+            if collect:
+                matches.append(name)
+    return {"hits": hits, "total": total, "matches": matches}
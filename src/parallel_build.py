@@ -0,0 +1,83 @@
+#
+#  parallel_build.py
+#  Login Checker Program
+#
+
+from multiprocessing import Pool
+import os
+
+import numpy as np
+
+from src.bloom_filter import BloomFilter
+from src.dataset_reader import read_line_batches
+
+"""
+Split a file into byte ranges that start and end on line boundaries
+ - filename: the dataset
+ - parts: number of ranges wanted, fewer are returned for tiny files
+
+Return a list of (start, end) byte offsets covering the whole file.
+"""
+
+
+def split_file(filename, parts):
+    size = os.path.getsize(filename)
+    bounds = [0]
+    with open(filename, "rb") as f:
+        for i in range(1, parts):
+            f.seek(max(size * i // parts, bounds[-1]))
+            # Move to the start of the next line
+            if f.tell() > 0:
+                f.seek(f.tell() - 1)
+                f.readline()
+            if f.tell() >= size:
+                break
+            if f.tell() > bounds[-1]:
+                bounds.append(f.tell())
+    bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+# Yield the lines of one byte range, split exactly like dataset_reader.read_line_batches splits them
+def read_range(filename, start, end):
+    for batch in read_line_batches(filename, start=start, end=end):
+        yield from batch
+
+
+# Worker: build a partial filter of one byte range and ship back its raw bits
+def _build_partial(args):
+    filter_cls, init_kwargs, filename, start, end = args
+    partial = filter_cls(**init_kwargs)
+    partial.insert_many(read_range(filename, start, end))
+    return bytes(partial.payload())
+
+
+"""
+Multi-process Bloom filter build
+ - filename: the dataset, one username per line
+ - filter_cls: BloomFilter or BlockedBloomFilter
+ - processes: number of worker processes, defaults to the number of cores
+ - init_kwargs: constructor arguments of the filter, e.g. num_users and prob
+
+Every worker builds a partial filter with the same parameters from its own slice of the file, and
+the partial bit arrays are OR-merged into the result. Setting a bit is idempotent and OR is
+commutative, so the result is bit-identical to a serial build whatever order the parts finish in.
+Each worker holds one full-size bit array while it runs.
+"""
+
+
+def build_bloom_filter_parallel(
+    filename, filter_cls=BloomFilter, processes=None, **init_kwargs
+):
+    processes = processes or os.cpu_count()
+    bloom_filter = filter_cls(**init_kwargs)
+    merged = np.frombuffer(bloom_filter.payload(), dtype=np.uint8)
+
+    tasks = [
+        (filter_cls, init_kwargs, filename, start, end)
+        for start, end in split_file(filename, processes)
+    ]
+    with Pool(processes) as pool:
+        for partial in pool.imap_unordered(_build_partial, tasks):
+            np.bitwise_or(merged, np.frombuffer(partial, dtype=np.uint8), out=merged)
+    return bloom_filter
@@ -0,0 +1,190 @@
+#
+#  result_cache.py
+#  Login Checker Program
+#
+
+from collections import OrderedDict
+
+from src.batch_lookup import BatchLookup
+
+# Marks a missing entry, cached answers are booleans
+_MISSING = object()
+
+
+# Cache key of a name: str and bytes names hash alike in the filters, so "alice" and b"alice" share
+# one entry and an insert of either form drops it
+def _key(username):
+    return username.encode() if isinstance(username, str) else username
+
+
+class LRUCache:
+    """Size-bounded map that evicts the least recently used entry."""
+
+    def __init__(self, size):
+        self.size = size
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        value = self.entries.get(key, _MISSING)
+        if value is not _MISSING:
+            self.entries.move_to_end(key)
+        return value
+
+    # Return True if an entry had to be evicted
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+            return True
+        return False
+
+    def discard(self, key):
+        self.entries.pop(key, None)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class ClockCache:
+    """
+    Size-bounded map with CLOCK eviction, an LRU approximation.
+
+    Entries sit in a fixed ring of slots with a reference bit. A hit only sets the bit, so it
+    costs no reordering; on eviction the hand sweeps the ring, clearing set bits, and replaces the
+    first entry whose bit is already clear.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.keys = [_MISSING] * size
+        self.values = [None] * size
+        self.referenced = [False] * size
+        self.slots = {}
+        self.hand = 0
+
+    def get(self, key):
+        slot = self.slots.get(key)
+        if slot is None:
+            return _MISSING
+        self.referenced[slot] = True
+        return self.values[slot]
+
+    def put(self, key, value):
+        slot = self.slots.get(key)
+        if slot is not None:
+            self.values[slot] = value
+            self.referenced[slot] = True
+            return False
+        while self.referenced[self.hand]:
+            self.referenced[self.hand] = False
+            self.hand = (self.hand + 1) % self.size
+        slot = self.hand
+        self.hand = (self.hand + 1) % self.size
+        evicted = self.keys[slot] is not _MISSING
+        if evicted:
+            del self.slots[self.keys[slot]]
+        self.keys[slot], self.values[slot] = key, value
+        self.slots[key] = slot
+        return evicted
+
+    # The slot is left empty (bit clear), the next sweep reuses it
+    def discard(self, key):
+        slot = self.slots.pop(key, None)
+        if slot is not None:
+            self.keys[slot] = _MISSING
+            self.referenced[slot] = False
+
+    def __len__(self):
+        return len(self.slots)
+
+
+CACHE_POLICIES = {"lru": LRUCache, "clock": ClockCache}
+
+
+class CachedFilter:
+    """
+    Result cache in front of a filter's exist().
+
+    Repeated lookups of the same (popular) names are answered from a size-bounded cache instead of
+    hashing and probing the filter again. insert() goes to the filter and drops the cached answer
+    of that name, so a cached "no" never hides a name inserted later.
+
+    Counters: hits, misses and evictions, see stats().
+
+    :param filter: any filter with exist() (and insert() to insert through the cache).
+    :param size: maximum number of cached answers.
+    :param policy: "lru" or "clock".
+    """
+
+    def __init__(self, filter, size=100_000, policy="lru"):
+        if policy not in CACHE_POLICIES:
+            raise ValueError(f"Unknown cache policy: {policy}")
+        self.filter = filter
+        self.cache = CACHE_POLICIES[policy](size)
+        self.engine = BatchLookup(filter) if BatchLookup.supports(filter) else None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def exist(self, username):
+        key = _key(username)
+        result = self.cache.get(key)
+        if result is not _MISSING:
+            self.hits += 1
+            return result
+        self.misses += 1
+        result = bool(self.filter.exist(username))
+        self.evictions += self.cache.put(key, result)
+        return result
+
+    """
+    Bulk lookup, returns a list of booleans in input order.
+
+    Names missing from the cache are looked up together (through BatchLookup when the filter
+    supports it). A name repeated within the batch counts as one miss, then hits, like it would
+    one name at a time.
+    """
+
+    def exist_many(self, usernames):
+        usernames = list(usernames)
+        result = [None] * len(usernames)
+        # Cache key -> input positions, and the name the filter is asked about
+        pending = {}
+        names = []
+        for i, username in enumerate(usernames):
+            key = _key(username)
+            cached = self.cache.get(key)
+            if cached is not _MISSING:
+                self.hits += 1
+                result[i] = cached
+            elif key in pending:
+                self.hits += 1
+                pending[key].append(i)
+            else:
+                self.misses += 1
+                pending[key] = [i]
+                names.append(username)
+        if self.engine is not None:
+            answers = self.engine.exist(names).tolist()
+        else:
+            answers = [bool(self.filter.exist(name)) for name in names]
+        for key, answer in zip(pending, answers):
+            self.evictions += self.cache.put(key, answer)
+            for i in pending[key]:
+                result[i] = answer
+        return result
+
+    def insert(self, username):
+        self.cache.discard(_key(username))
+        return self.filter.insert(username)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "cached": len(self.cache),
+        }
@@ -0,0 +1,140 @@
+#
+#  scalable_bloom_filter.py
+#  Login Checker Program
+#
+
+from itertools import islice
+
+from src.bloom_filter import BloomFilter
+
+"""
+Scalable Bloom filter (Almeida et al., "Scalable Bloom Filters", 2007)
+
+A chain of BloomFilters that grows online: inserts go into the newest sub-filter, and once it holds
+the number of items it was sized for a new one is added, growth times larger and with a false
+positive rate tightening times lower. Sub-filter i is sized for
+
+    initial_capacity * growth^i items at  prob * (1 - tightening) * tightening^i
+
+so the rates of the whole chain add up to less than prob however many sub-filters are added. A
+lookup checks every sub-filter, newest (largest) first. Nothing is ever re-hashed or re-read: the
+full sub-filters are kept as they are.
+"""
+
+
+class ScalableBloomFilter:
+    """
+    Bloom filter that grows with the number of items instead of being sized for all of them.
+
+    :param initial_capacity: items the first sub-filter is sized for.
+    :param prob: bound on the false positive rate of the whole chain.
+    :param growth: capacity ratio of two consecutive sub-filters.
+    :param tightening: false positive rate ratio of two consecutive sub-filters, below 1.
+    """
+
+    def __init__(self, initial_capacity=1_000_000, prob=0.01, growth=2, tightening=0.5):
+        if not 0 < tightening < 1:
+            raise ValueError(f"Tightening ratio must be in (0, 1), got {tightening}")
+        self.initial_capacity = initial_capacity
+        self.prob = prob
+        self.growth = growth
+        self.tightening = tightening
+        self.filters = []
+        # Items inserted into each sub-filter
+        self.counts = []
+        self._add_filter()
+
+    def _add_filter(self):
+        i = len(self.filters)
+        bf = BloomFilter(
+            num_users=int(self.initial_capacity * self.growth**i),
+            prob=self.prob * (1 - self.tightening) * self.tightening**i,
+        )
+        # A name probes other bits in every sub-filter
+        bf.hash_seed = i
+        self.filters.append(bf)
+        self.counts.append(0)
+
+    def _room(self):
+        if self.counts[-1] >= self.filters[-1].num_users:
+            self._add_filter()
+        return self.filters[-1].num_users - self.counts[-1]
+
+    def insert(self, item):
+        self._room()
+        self.filters[-1].insert(item)
+        self.counts[-1] += 1
+
+    # Bulk insert, the newest sub-filter takes as many items as it has room for at a time
+    def insert_many(self, items):
+        items = iter(items)
+        while True:
+            chunk = list(islice(items, self._room()))
+            if not chunk:
+                return
+            self.filters[-1].insert_many(chunk)
+            self.counts[-1] += len(chunk)
+
+    def exist(self, item):
+        return any(bf.exist(item) for bf in reversed(self.filters))
+
+    def exist_many(self, items):
+        items = list(items)
+        found = [False] * len(items)
+        for bf in reversed(self.filters):
+            found = [f or hit for f, hit in zip(found, bf.exist_many(items))]
+        return found
+
+    def __len__(self):
+        return sum(self.counts)
+
+    # Sum of the sub-filters' rates, the bound of the chain's false positive rate
+    def fpr_bound(self):
+        return sum(bf.probability_fp for bf in self.filters)
+
+    def stats(self, scan=True):
+        return {
+            "items": len(self),
+            "sub_filters": len(self.filters),
+            "size": sum(bf.size for bf in self.filters),
+            "fpr_bound": self.fpr_bound(),
+            "filters": [
+                dict(bf.stats(scan), items=count)
+                for bf, count in zip(self.filters, self.counts)
+            ],
+        }
+
+    """
+    On-disk format support (see filter_store.py)
+     - header: the chain parameters and every sub-filter's own header
+     - payload: the sub-filters' bit buffers, back to back
+     - from_payload: split the buffer by the sub-filters' byte sizes, without copying it
+    """
+
+    def header(self):
+        return {
+            "initial_capacity": self.initial_capacity,
+            "prob": self.prob,
+            "growth": self.growth,
+            "tightening": self.tightening,
+            "counts": self.counts,
+            "filters": [bf.header() for bf in self.filters],
+            "nbytes": [bf.payload().nbytes for bf in self.filters],
+        }
+
+    def payload(self):
+        return tuple(bf.payload() for bf in self.filters)
+
+    @classmethod
+    def from_payload(cls, header, buffer):
+        sbf = cls.__new__(cls)
+        for key in ("initial_capacity", "prob", "growth", "tightening", "counts"):
+            setattr(sbf, key, header[key])
+        sbf.filters = []
+        offset = 0
+        for params, nbytes in zip(header["filters"], header["nbytes"]):
+            sbf.filters.append(
+                BloomFilter.from_payload(params, buffer[offset : offset + nbytes])
+            )
+            offset += nbytes
+        return sbf
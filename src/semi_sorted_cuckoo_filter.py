@@ -0,0 +1,234 @@
+#
+#  semi_sorted_cuckoo_filter.py
+#  Login Checker Program
+#
+
+from itertools import combinations_with_replacement
+
+import numpy as np
+import random
+
+from src.bucket_table import EMPTY
+from src.cuckoo_filter import CuckooFilter
+
+"""
+Semi-sorted bucket encoding (Fan et al., "Cuckoo Filter: Practically Better Than Bloom", section 5.2)
+
+The order of the fingerprints inside a bucket carries no information. Sorting a bucket of 4
+fingerprints makes their high 4 bits a non-decreasing sequence, and there are only
+C(16 + 4 - 1, 4) = 3876 such sequences: one 12-bit code replaces the 16 high bits, saving one bit
+per entry. The low bits are stored as they are, in the same sorted order.
+
+A bucket is 12 + 4 * (fingerprint_size - 4) bits, packed back to back in one byte buffer with no
+alignment, e.g. 44 bits (11 per entry) for 12-bit fingerprints, where the plain table stores every
+12-bit fingerprint in a uint16. Empty slots are fingerprint 0, as in bucket_table.py, and sort
+first.
+
+Every bucket access decodes and re-encodes the whole bucket, so inserts and lookups are slower than
+with the plain table: memory is traded for lookup time (see benchmark.py).
+"""
+
+BUCKET_SIZE = 4
+HIGH_BITS = 4
+CODE_BITS = 12
+CODE_MASK = (1 << CODE_BITS) - 1
+# Enough bytes to hold any bucket whatever its bit offset, buckets are at most 60 bits
+WINDOW = 9
+
+# Sorted high nibbles of every code, and the code of every sorted sequence
+DECODE = list(combinations_with_replacement(range(1 << HIGH_BITS), BUCKET_SIZE))
+ENCODE = {high: code for code, high in enumerate(DECODE)}
+_DECODE_TABLE = np.array(DECODE, dtype=np.uint32)
+
+
+class SemiSortedCuckooFilter(CuckooFilter):
+    """
+    CuckooFilter storing its buckets semi-sorted and bit-packed.
+
+    Same hashing, kick walk, stash and persistence as CuckooFilter, only the bucket level
+    operations (contains, place, kick_out_random) go through the encoding. Buckets always hold 4
+    slots; fingerprints are 5 to 16 bits.
+    """
+
+    def __init__(
+        self,
+        capacity=int(1e9),
+        bucket_size=BUCKET_SIZE,
+        fingerprint_size=12,
+        stash_size=4,
+        load_factor=0.25,
+        round_up=False,
+    ):
+        if bucket_size != BUCKET_SIZE:
+            raise ValueError(f"Semi-sorted buckets hold {BUCKET_SIZE} slots")
+        if not HIGH_BITS < fingerprint_size <= 16:
+            raise ValueError(
+                f"Fingerprints of {fingerprint_size} bits are not supported"
+            )
+        super().__init__(
+            capacity, bucket_size, fingerprint_size, stash_size, load_factor, round_up
+        )
+
+    # Allocates the packed table instead of the plain one
+    def allocate(self):
+        self._init_layout()
+        self.packed = np.zeros(self.packed_size(), dtype=np.uint8)
+
+    def _init_layout(self):
+        self.low_bits = self.finger_bits - HIGH_BITS
+        self.low_mask = (1 << self.low_bits) - 1
+        self.bucket_bits = CODE_BITS + BUCKET_SIZE * self.low_bits
+
+    def packed_size(self):
+        return -(-self.bucket_num * self.bucket_bits // 8) + WINDOW - 1
+
+    # The 4 fingerprints of a bucket in ascending order, empty slots (0) first
+    def read_bucket(self, idx):
+        offset = idx * self.bucket_bits
+        start = offset >> 3
+        word = int.from_bytes(self.packed[start : start + WINDOW], "little") >> (
+            offset & 7
+        )
+        high = DECODE[word & CODE_MASK]
+        low_bits, low_mask = self.low_bits, self.low_mask
+        word >>= CODE_BITS
+        return [
+            (high[j] << low_bits) | ((word >> (j * low_bits)) & low_mask)
+            for j in range(BUCKET_SIZE)
+        ]
+
+    def write_bucket(self, idx, fingers):
+        fingers = sorted(fingers)
+        low_bits, low_mask = self.low_bits, self.low_mask
+        word = ENCODE[tuple(f >> low_bits for f in fingers)]
+        for j, finger in enumerate(fingers):
+            word |= (finger & low_mask) << (CODE_BITS + j * low_bits)
+
+        offset = idx * self.bucket_bits
+        start, shift = offset >> 3, offset & 7
+        end = (offset + self.bucket_bits + 7) >> 3
+        old = int.from_bytes(self.packed[start:end], "little")
+        mask = ((1 << self.bucket_bits) - 1) << shift
+        new = (old & ~mask) | (word << shift)
+        self.packed[start:end] = np.frombuffer(
+            new.to_bytes(end - start, "little"), dtype=np.uint8
+        )
+
+    """
+    Decoded buckets for an array of bucket indexes, shape (len(idx), 4), for BatchLookup and stats.
+    Every bucket is read as a 9-byte window starting at its first byte: the low 8 bytes as one
+    little-endian uint64 shifted down by the bit offset, plus the 9th byte for the bits that spill
+    over.
+    """
+
+    def bucket_rows(self, idx):
+        offset = np.asarray(idx, dtype=np.uint64) * np.uint64(self.bucket_bits)
+        start = (offset >> np.uint64(3)).astype(np.int64)
+        shift = offset & np.uint64(7)
+        window = self.packed[start[:, None] + np.arange(WINDOW)]
+        low = np.ascontiguousarray(window[:, :8]).view("<u8").ravel()
+        spill = window[:, 8].astype(np.uint64) << np.uint64(8)
+        # Two shifts, a single shift by 64 would be undefined when the offset is byte aligned
+        word = (low >> shift) | (spill << (np.uint64(56) - shift))
+
+        high = _DECODE_TABLE[(word & np.uint64(CODE_MASK)).astype(np.int64)]
+        lows = np.stack(
+            [
+                (word >> np.uint64(CODE_BITS + j * self.low_bits))
+                & np.uint64(self.low_mask)
+                for j in range(BUCKET_SIZE)
+            ],
+            axis=1,
+        ).astype(np.uint32)
+        return (high << np.uint32(self.low_bits)) | lows
+
+    # Bucket level operations of CuckooFilter, through the encoding
+
+    def contains(self, idx, finger) -> bool:
+        return finger in self.read_bucket(idx)
+
+    def full(self, idx: int):
+        return self.read_bucket(idx)[0] != EMPTY
+
+    def place(self, idx, finger) -> bool:
+        fingers = self.read_bucket(idx)
+        if fingers[0] != EMPTY:
+            return False
+        fingers[0] = finger
+        self.write_bucket(idx, fingers)
+        return True
+
+    def kick_out_random(self, idx, finger) -> int:
+        slot = self.rng.randrange(self.bucket_size)
+        fingers = self.read_bucket(idx)
+        out = fingers[slot]
+        fingers[slot] = finger
+        self.write_bucket(idx, fingers)
+        return out
+
+    def clear(self):
+        self.packed.fill(EMPTY)
+
+    # Bits of the packed table per stored entry, the plain table needs the dtype's width
+    def bits_per_entry(self):
+        return self.bucket_bits / BUCKET_SIZE
+
+    def stats(self, scan=True):
+        snapshot = {
+            "bucket_num": self.bucket_num,
+            "bucket_size": self.bucket_size,
+            "bucket_bits": self.bucket_bits,
+            "stash": len(self.stash),
+            "stash_size": self.stash_size,
+        }
+        if scan:
+            occupancy = np.zeros(BUCKET_SIZE + 1, dtype=np.int64)
+            for start in range(0, self.bucket_num, 1 << 16):
+                rows = self.bucket_rows(
+                    np.arange(start, min(start + (1 << 16), self.bucket_num))
+                )
+                occupancy += np.bincount(
+                    np.count_nonzero(rows, axis=1), minlength=BUCKET_SIZE + 1
+                )
+            snapshot["load"] = int(occupancy @ np.arange(BUCKET_SIZE + 1)) / (
+                self.bucket_num * BUCKET_SIZE
+            )
+            snapshot["occupancy"] = dict(enumerate(occupancy.tolist()))
+        if self.instrument is not None:
+            snapshot.update(self.instrument.snapshot())
+        return snapshot
+
+    """
+    On-disk format support (see filter_store.py), the payload is the packed table
+    """
+
+    def header(self):
+        return {
+            "bucket_size": self.bucket_size,
+            "load_factor": self.load_factor,
+            "bucket_num_bit_length": self.bucket_num_bit_length,
+            "bucket_num": self.bucket_num,
+            "finger_bits": self.finger_bits,
+            "max_kick": self.max_kick,
+            "hash_seed": self.hash_seed,
+            "hash_scheme": self.hash_scheme,
+            "stash": self.stash,
+            "stash_size": self.stash_size,
+        }
+
+    def payload(self):
+        return self.packed
+
+    @classmethod
+    def from_payload(cls, header, buffer):
+        cf = cls.__new__(cls)
+        cf.__dict__.update(header)
+        cf.stash = [tuple(entry) for entry in header["stash"]]
+        cf._init_layout()
+        cf.packed = np.frombuffer(buffer, dtype=np.uint8)
+        cf.alt_offsets = cf.build_alt_offsets()
+        cf.rng = random.Random(cf.hash_seed)
+        return cf
+
+    def __str__(self):
+        return f"bucket size: {self.bucket_size}\nnumber of buckets: {self.bucket_num}\nfingerprint size: {self.finger_bits}\nbucket bits: {self.bucket_bits}\nstash: {self.stash}"
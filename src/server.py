@@ -0,0 +1,287 @@
+#
+#  server.py
+#  Login Checker Program
+#
+
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from src.batch_lookup import BatchLookup
+from src.filter_store import is_filter_file
+from src.helper import load_filter_from_disk
+from src.instrumentation import Histogram
+from src.journal import JournaledFilter
+
+"""
+asyncio login-check service.
+
+Line protocol over TCP, one request per line, answers in request order (requests can be pipelined):
+
+    CHECK <username>    ->  1 (taken, or a filter false positive) / 0 (free)
+    INSERT <username>   ->  OK / FULL (the filter refused the insert) / ERR (read-only filter)
+    STATS               ->  one line of JSON: batch sizes and latency histograms
+    anything else       ->  ERR <reason>
+
+A request that fails is answered ERR <reason>, the connection keeps going.
+
+CHECK requests of all connections are grouped into micro-batches: a batch is flushed as soon as it
+holds max_batch names or max_delay seconds after its first name arrived, and answered with one
+BatchLookup call. Run with: python -m src.server data/prebuild/saved_bloom_filter_1m.bin
+
+Inserts only survive a restart when they are journaled: main() serves a saved filter file through a
+JournaledFilter (see journal.py), and serves static filters and shard directories read-only.
+"""
+
+
+class MicroBatcher:
+    """
+    Groups single lookups into batches for a bulk lookup function.
+
+    :param lookup: takes a list of names, returns their answers in the same order.
+    :param max_batch: a batch this large is flushed right away.
+    :param max_delay: seconds a name may wait for its batch to fill up.
+    """
+
+    def __init__(self, lookup, max_batch=1024, max_delay=0.0005):
+        self.lookup = lookup
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.names = []
+        self.futures = []
+        self.timer = None
+        self.batch_sizes = Histogram()
+        # Microseconds per bulk lookup
+        self.batch_times = Histogram()
+
+    def submit(self, name):
+        future = asyncio.get_running_loop().create_future()
+        self.names.append(name)
+        self.futures.append(future)
+        if len(self.names) >= self.max_batch:
+            self.flush()
+        elif self.timer is None:
+            self.timer = asyncio.get_running_loop().call_later(
+                self.max_delay, self.flush
+            )
+        return future
+
+    def flush(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if not self.names:
+            return
+        names, futures = self.names, self.futures
+        self.names, self.futures = [], []
+        t_start = time.perf_counter()
+        try:
+            answers = self.lookup(names)
+        except Exception as e:
+            for future in futures:
+                future.set_exception(e)
+            return
+        self.batch_times.record((time.perf_counter() - t_start) * 1e6)
+        self.batch_sizes.record(len(names))
+        for future, answer in zip(futures, answers):
+            if not future.cancelled():
+                future.set_result(bool(answer))
+
+
+class LoginCheckServer:
+    """
+    TCP server answering CHECK and INSERT requests against one loaded filter.
+
+    :param filter: the filter, a JournaledFilter (or in memory) if inserts are wanted.
+    :param inserts: answer INSERT requests, by default if the filter has insert().
+    :param host, port: where to listen, port 0 picks a free port (see self.port after start()).
+    :param max_batch, max_delay: micro-batching limits, see MicroBatcher.
+    :param max_inflight: unanswered requests per connection before it stops reading.
+    :param max_line: longest request line in bytes.
+    """
+
+    def __init__(
+        self,
+        filter,
+        host="127.0.0.1",
+        port=0,
+        max_batch=1024,
+        max_delay=0.0005,
+        max_inflight=4096,
+        max_line=1024,
+        inserts=None,
+    ):
+        self.filter = filter
+        self.inserts = hasattr(filter, "insert") if inserts is None else inserts
+        self.host = host
+        self.port = port
+        self.max_inflight = max_inflight
+        self.max_line = max_line
+        self.engine = self.engine_filter = None
+        self.batcher = MicroBatcher(self.lookup, max_batch, max_delay)
+        # Microseconds from reading a request to having its answer
+        self.latency = {"CHECK": Histogram(), "INSERT": Histogram()}
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(
+            self.handle, self.host, self.port, limit=self.max_line
+        )
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    def stats(self):
+        return {
+            "batch_sizes": self.batcher.batch_sizes.snapshot(),
+            "batch_lookup_us": self.batcher.batch_times.snapshot(),
+            "latency_us": {cmd: h.snapshot() for cmd, h in self.latency.items()},
+        }
+
+    # A JournaledFilter swaps its filter on compaction, the engine follows the current one
+    def lookup(self, names):
+        filter = self.filter
+        if isinstance(filter, JournaledFilter):
+            filter = filter.filter
+        if filter is not self.engine_filter:
+            self.engine_filter = filter
+            self.engine = BatchLookup(filter) if BatchLookup.supports(filter) else None
+        if self.engine is None:
+            return [filter.exist(name) for name in names]
+        return self.engine.exist(names)
+
+    def insert(self, name):
+        # Checks queued before the insert are answered without it
+        self.batcher.flush()
+        return self.filter.insert(name) is not False
+
+    def _record(self, command, t_start):
+        self.latency[command].record((time.perf_counter() - t_start) * 1e6)
+
+    async def _check(self, t_start, future):
+        taken = await future
+        self._record("CHECK", t_start)
+        return "1" if taken else "0"
+
+    # Parse one request, return an awaitable of the answer line
+    def request(self, line):
+        t_start = time.perf_counter()
+        command, _, name = line.decode("utf-8", "replace").rstrip("\r\n").partition(" ")
+        if command == "CHECK" and name:
+            return self._check(t_start, self.batcher.submit(name))
+        if command == "INSERT" and name:
+            if not self.inserts:
+                return _ready("ERR inserts are not supported by this filter")
+            try:
+                inserted = self.insert(name)
+            except Exception as e:
+                return _ready(f"ERR {type(e).__name__}: {e}")
+            self._record(command, t_start)
+            return _ready("OK" if inserted else "FULL")
+        if command == "STATS":
+            return _ready(json.dumps(self.stats()))
+        return _ready(f"ERR unknown request {command!r}")
+
+    async def handle(self, reader, writer):
+        answers = asyncio.Queue(self.max_inflight)
+        responder = asyncio.create_task(self._respond(answers, writer))
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    await answers.put(_ready("ERR request too long"))
+                    break
+                if not line:
+                    break
+                await answers.put(self.request(line))
+        except ConnectionError:
+            pass
+        finally:
+            await answers.put(None)
+            await responder
+
+    """
+    Write the answers back in request order.
+
+    A failed lookup is answered ERR, and after the client went away the answers are still taken
+    off the queue (and dropped), so handle() never blocks on a full queue.
+    """
+
+    async def _respond(self, answers, writer):
+        connected = True
+        try:
+            while (answer := await answers.get()) is not None:
+                try:
+                    text = await answer
+                except Exception as e:
+                    text = f"ERR {type(e).__name__}: {e}"
+                if not connected:
+                    continue
+                try:
+                    writer.write(text.encode() + b"\n")
+                    if answers.empty():
+                        await writer.drain()
+                except ConnectionError:
+                    connected = False
+        finally:
+            writer.close()
+
+
+async def _ready(text):
+    return text
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Login checker TCP service")
+    parser.add_argument("filter", help="saved filter (.bin file or shard directory)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--max-batch", type=int, default=1024)
+    parser.add_argument("--max-delay-us", type=int, default=500)
+    parser.add_argument("--max-inflight", type=int, default=4096)
+    parser.add_argument(
+        "--sync",
+        action="store_true",
+        help="fsync the insert journal after every insert",
+    )
+    args = parser.parse_args()
+
+    # Inserts go through the journal next to a saved filter file, anything else is served read-only
+    filter = load_filter_from_disk(args.filter, mmap_mode="r")
+    inserts = (
+        os.path.isfile(args.filter)
+        and is_filter_file(args.filter)
+        and hasattr(filter, "insert")
+    )
+    if inserts:
+        filter = JournaledFilter(args.filter, sync=args.sync)
+    server = LoginCheckServer(
+        filter,
+        args.host,
+        args.port,
+        max_batch=args.max_batch,
+        max_delay=args.max_delay_us / 1e6,
+        max_inflight=args.max_inflight,
+        inserts=inserts,
+    )
+
+    async def run():
+        await server.start()
+        print(f"Listening on {server.host}:{server.port}")
+        await server.serve_forever()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
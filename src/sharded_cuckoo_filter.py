@@ -0,0 +1,283 @@
+#
+#  sharded_cuckoo_filter.py
+#  Login Checker Program
+#
+
+from itertools import islice
+from multiprocessing import Pool
+import json
+import logging
+import os
+import shutil
+
+import mmh3
+import numpy as np
+
+from src.cuckoo_filter import CuckooFilter
+from src.filter_store import save_filter, open_filter
+from src.parallel_build import split_file, read_range
+from src.vector_hash import to_byte_matrix, murmur3_x64_128
+
+MANIFEST = "manifest.json"
+# A shard whose build is refused is rebuilt with twice the capacity, at most this many times
+MAX_SHARD_REBUILDS = 3
+
+
+class ShardedCuckooFilter:
+    """
+    Hash-partitioned cuckoo filter.
+
+    Every username is routed by the top bits of its first 64-bit hash half to one of num_shards
+    independent CuckooFilter shards. The shards take their bucket index from the low bits of the
+    same half and the fingerprint from the second half, so a name is hashed once and the routing
+    bits are independent of everything the shard uses (as long as shard bits + bucket bits <= 64).
+
+    Shards never see each other's names: they can be built in separate processes (see
+    build_sharded_cuckoo_filter), and a shard that runs full is rebuilt alone.
+
+    :param capacity: expected number of usernames over all shards.
+    :param num_shards: power of 2.
+    :param shard_kwargs: the other CuckooFilter arguments, e.g. bucket_size and fingerprint_size.
+    """
+
+    def __init__(self, capacity=int(1e9), num_shards=16, **shard_kwargs):
+        self.shard_bits = shard_bits(num_shards)
+        self.shards = [
+            CuckooFilter(capacity=capacity // num_shards, **shard_kwargs)
+            for _ in range(num_shards)
+        ]
+        self.hash_seed = self.shards[0].hash_seed
+
+    # Wrap already built shards, e.g. loaded from disk or returned by worker processes
+    @classmethod
+    def from_shards(cls, shards):
+        sf = cls.__new__(cls)
+        sf.shards = list(shards)
+        sf.shard_bits = shard_bits(len(sf.shards))
+        sf.hash_seed = sf.shards[0].hash_seed
+        if any(s.hash_seed != sf.hash_seed for s in sf.shards):
+            raise ValueError("All shards must use the same hash seed")
+        return sf
+
+    @property
+    def num_shards(self):
+        return len(self.shards)
+
+    # Shard index and the two hash halves of a username
+    def route(self, username):
+        h_idx, h_finger = mmh3.hash64(username, seed=self.hash_seed, signed=False)
+        return h_idx >> (64 - self.shard_bits), h_idx, h_finger
+
+    def insert(self, username):
+        shard_id, h_idx, h_finger = self.route(username)
+        shard = self.shards[shard_id]
+        h1x, finger = shard.locate(h_idx, h_finger)
+        res = shard.insert_into(finger, h1x)
+        if res is not None:
+            logging.error(res + f"\nShard {shard_id} failed with username: {username}")
+            return False
+        return True
+
+    def exist(self, username):
+        shard_id, h_idx, h_finger = self.route(username)
+        shard = self.shards[shard_id]
+        return shard.exist_at(*shard.locate(h_idx, h_finger))
+
+    def __str__(self):
+        return f"{self.num_shards} shards\n" + "\n".join(map(str, self.shards))
+
+
+def shard_bits(num_shards):
+    if num_shards < 1 or num_shards & (num_shards - 1):
+        raise ValueError(f"Number of shards must be a power of 2, got {num_shards}")
+    return num_shards.bit_length() - 1
+
+
+def shard_filename(shard_id):
+    return f"shard_{shard_id:04d}.bin"
+
+
+"""
+Shard-by-shard on-disk format: a directory with one filter_store file per shard and a manifest.
+
+    manifest.json: {"type": "sharded_cuckoo", "hash_seed": ..., "shards": [file names]}
+
+The manifest is written last (atomically), so a directory without one is an unfinished build.
+"""
+
+
+def _write_manifest(directory, hash_seed, num_shards):
+    manifest = {
+        "type": "sharded_cuckoo",
+        "hash_seed": hash_seed,
+        "shards": [shard_filename(i) for i in range(num_shards)],
+    }
+    tmp_filename = os.path.join(directory, MANIFEST + ".tmp")
+    with open(tmp_filename, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_filename, os.path.join(directory, MANIFEST))
+
+
+def save_sharded_filter(sharded_filter, directory):
+    os.makedirs(directory, exist_ok=True)
+    for shard_id, shard in enumerate(sharded_filter.shards):
+        save_filter(shard, os.path.join(directory, shard_filename(shard_id)))
+    _write_manifest(directory, sharded_filter.hash_seed, sharded_filter.num_shards)
+
+
+def is_sharded_filter(path):
+    return os.path.isfile(os.path.join(path, MANIFEST))
+
+
+# mmap_mode applies to every shard, see filter_store.open_filter
+def open_sharded_filter(directory, mmap_mode="r"):
+    with open(os.path.join(directory, MANIFEST)) as f:
+        manifest = json.load(f)
+    return ShardedCuckooFilter.from_shards(
+        open_filter(os.path.join(directory, name), mmap_mode=mmap_mode)
+        for name in manifest["shards"]
+    )
+
+
+"""
+Parallel build, in two passes so the dataset is read and hashed once whatever the number of shards.
+
+ 1. Partition: every worker reads one line-aligned byte range of the file, hashes its names in
+    batches (vector_hash.py) and appends each name's two 64-bit hash halves to the spill file of
+    its shard, one spill file per (range, shard) pair.
+ 2. Build: every worker builds one shard from its spill files, read in range order so the shard
+    sees its names in file order, exactly like serial inserts. A shard that refuses an insert is
+    rebuilt with twice the capacity from the same hashes, without going back to the dataset.
+
+The spill files hold 16 bytes per name (16 GB for 1b names) in <directory>/spill, removed once
+every shard is saved.
+"""
+
+SPILL_DIR = "spill"
+# Byte ranges per worker process in the partition pass
+RANGES_PER_PROCESS = 4
+PARTITION_BATCH = 1 << 16
+
+
+def spill_filename(directory, part_id, shard_id):
+    return os.path.join(directory, SPILL_DIR, f"part_{part_id:04d}_{shard_id:04d}.bin")
+
+
+# Shard index of every hash, the top shard bits of the first half
+def _shard_ids(h_idx, bits):
+    if not bits:
+        return np.zeros(len(h_idx), dtype=np.int64)
+    return (h_idx >> np.uint64(64 - bits)).astype(np.int64)
+
+
+# Worker of pass 1: route the names of one byte range to the spill files of their shards
+def _partition_range(args):
+    filename, directory, part_id, start, end, num_shards, seed = args
+    bits = shard_bits(num_shards)
+    spills = [
+        open(spill_filename(directory, part_id, i), "wb") for i in range(num_shards)
+    ]
+    try:
+        names = read_range(filename, start, end)
+        while batch := list(islice(names, PARTITION_BATCH)):
+            h_idx, h_finger = murmur3_x64_128(*to_byte_matrix(batch), seed=seed)
+            shard_ids = _shard_ids(h_idx, bits)
+            # Stable, so every shard keeps its names in file order
+            order = np.argsort(shard_ids, kind="stable")
+            pairs = np.stack([h_idx, h_finger], axis=1)[order]
+            bounds = np.cumsum(np.bincount(shard_ids, minlength=num_shards))
+            for shard_id, chunk in enumerate(np.split(pairs, bounds[:-1])):
+                spills[shard_id].write(chunk.tobytes())
+    finally:
+        for spill in spills:
+            spill.close()
+
+
+"""
+Worker of pass 2: build one shard from its spill files and save it into the directory.
+
+If the shard refuses an insert it is built again with twice the capacity; the other shards are not
+affected. Return the capacity the shard was built with.
+"""
+
+
+def _build_shard(args):
+    directory, shard_id, num_parts, capacity, shard_kwargs = args
+    hashes = np.concatenate(
+        [
+            np.fromfile(spill_filename(directory, part_id, shard_id), dtype=np.uint64)
+            for part_id in range(num_parts)
+        ]
+    ).reshape(-1, 2)
+    for _ in range(MAX_SHARD_REBUILDS + 1):
+        shard = CuckooFilter(capacity=capacity, **shard_kwargs)
+        refused = False
+        for h_idx, h_finger in hashes.tolist():
+            h1x, finger = shard.locate(h_idx, h_finger)
+            if shard.insert_into(finger, h1x) is not None:
+                refused = True
+                break
+        if not refused:
+            save_filter(shard, os.path.join(directory, shard_filename(shard_id)))
+            return capacity
+        logging.warning(
+            f"Shard {shard_id} is full, rebuilding it with capacity {capacity * 2}"
+        )
+        capacity *= 2
+    raise RuntimeError(
+        f"Shard {shard_id} is still full after {MAX_SHARD_REBUILDS} rebuilds"
+    )
+
+
+"""
+Multi-process sharded cuckoo filter build
+ - filename: the dataset, one username per line
+ - directory: where the shards and the manifest are saved
+ - capacity: expected number of usernames over all shards
+ - num_shards: power of 2
+ - processes: number of worker processes, defaults to the number of cores
+ - shard_kwargs: the other CuckooFilter arguments
+
+Each shard is built by one worker and written straight to disk, nothing is sent back through the
+pool but its capacity. Return the filter opened from the directory with mmap_mode.
+"""
+
+
+def build_sharded_cuckoo_filter(
+    filename,
+    directory,
+    capacity,
+    num_shards=16,
+    processes=None,
+    mmap_mode="r",
+    **shard_kwargs,
+):
+    processes = processes or os.cpu_count()
+    os.makedirs(os.path.join(directory, SPILL_DIR), exist_ok=True)
+    # Every shard hashes with the seed a new CuckooFilter starts with
+    seed = CuckooFilter(capacity=1, **shard_kwargs).hash_seed
+    ranges = split_file(filename, processes * RANGES_PER_PROCESS)
+    try:
+        with Pool(processes) as pool:
+            pool.map(
+                _partition_range,
+                [
+                    (filename, directory, part_id, start, end, num_shards, seed)
+                    for part_id, (start, end) in enumerate(ranges)
+                ],
+            )
+            pool.map(
+                _build_shard,
+                [
+                    (directory, i, len(ranges), capacity // num_shards, shard_kwargs)
+                    for i in range(num_shards)
+                ],
+            )
+    finally:
+        shutil.rmtree(os.path.join(directory, SPILL_DIR), ignore_errors=True)
+    sharded = ShardedCuckooFilter.from_shards(
+        open_filter(os.path.join(directory, shard_filename(i)), mmap_mode=mmap_mode)
+        for i in range(num_shards)
+    )
+    _write_manifest(directory, sharded.hash_seed, num_shards)
+    return sharded
@@ -8,6 +8,8 @@
 
 from tqdm import tqdm
 
+from src.compact_hash_set import CompactHashSet
+
 import time
 
 
@@ -44,28 +46,21 @@ def run_binary_search(name_list, check_list):
     )
 
 
-# Binary Search Algorithm
+# Binary Search Algorithm, iterative over data[start_idx..end_idx] (both inclusive)
 def binary_search(target, data, start_idx, end_idx) -> bool:
-    if target > data[end_idx] or target < data[start_idx]:
-        return False
-
-    if (end_idx - start_idx) == 1:
-        if data[end_idx] == target or data[start_idx] == target:
-            return True
-        else:
-            return False
-    else:
+    while start_idx <= end_idx:
         mid = (start_idx + end_idx) // 2
-        if target > data[mid]:
-            start_idx = mid
-            return binary_search(target, data, start_idx, end_idx)
+        if data[mid] < target:
+            start_idx = mid + 1
+        elif data[mid] > target:
+            end_idx = mid - 1
         else:
-            end_idx = mid
-            return binary_search(target, data, start_idx, end_idx)
+            return True
+    return False
 
 
 def run_hash_table(name_list, check_list):
-    print("Running demo of Hash Mapping (using Python built-in dict)...")
+    print("Running demo of Hash Mapping (using a compact open-addressing hash set)...")
     print("Building the hash table...")
     table = build_hash_table(name_list)
 
@@ -73,7 +68,7 @@ def run_hash_table(name_list, check_list):
     counter = 0
     t_start = time.time()
     for name in check_list:
-        if table.get(name) is not None:
+        if name in table:
             counter += 1
     t_end = time.time()
     print(
@@ -82,8 +77,8 @@ def run_hash_table(name_list, check_list):
     )
 
 
-def build_hash_table(keys) -> dict:
-    user_dict = {}
-    for key in keys:
-        user_dict[key] = 1
-    return user_dict
+# One byte arena plus an offset table instead of a dict of str, see compact_hash_set.py
+def build_hash_table(keys) -> CompactHashSet:
+    table = CompactHashSet(capacity=len(keys))
+    table.add_many(keys)
+    return table
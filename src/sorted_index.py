@@ -0,0 +1,122 @@
+#
+#  sorted_index.py
+#  Login Checker Program
+#
+
+from array import array
+import mmap
+import os
+
+import numpy as np
+
+from src.dataset_reader import BLOCK_SIZE
+
+INDEX_SUFFIX = ".idx"
+
+
+class SortedFileIndex:
+    """
+    Exact membership over a sorted username file, without loading the names.
+
+    The file is memory-mapped and searched in place. The only thing kept in memory is an
+    array('Q') of line start offsets (8 bytes per name) plus a sentinel one past the last line, so
+    line i is file[offsets[i] : offsets[i + 1] - 1]. Lookups run an iterative binary search that
+    compares the raw bytes of the mapped lines; only the ~log2(n) probed pages are read.
+
+    The offsets are saved next to the file (<file>.idx) and reused as long as the file's size and
+    modification time match the ones recorded in the index.
+
+    Lines must be sorted by their UTF-8 bytes and end with "\\n", like sorted_usernames_*.txt.
+
+    :param filename: the sorted dataset.
+    :param index_filename: where the offsets are kept, defaults to filename + ".idx".
+    """
+
+    def __init__(self, filename, index_filename=None):
+        self.filename = filename
+        self.index_filename = index_filename or filename + INDEX_SUFFIX
+        with open(filename, "rb") as f:
+            stat = os.fstat(f.fileno())
+            self.stamp = array("Q", [stat.st_size, stat.st_mtime_ns])
+            self.data = (
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                if stat.st_size
+                else b""
+            )
+        self.offsets = self.load_offsets()
+        if self.offsets is None:
+            self.offsets = self.build_offsets()
+            self.save_offsets()
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    # Line starts found block by block with NumPy, never one Python object per line
+    def build_offsets(self):
+        offsets = array("Q", [0])
+        size = len(self.data)
+        for start in range(0, size, BLOCK_SIZE):
+            block = np.frombuffer(self.data[start : start + BLOCK_SIZE], dtype=np.uint8)
+            ends = np.flatnonzero(block == ord("\n")) + (start + 1)
+            offsets.frombytes(ends.astype("<u8").tobytes())
+        # Sentinel for an unterminated last line, as if it ended with a newline
+        if size and self.data[size - 1 : size] != b"\n":
+            offsets.append(size + 1)
+        return offsets
+
+    # Index file: file size, file mtime, then the offsets
+    def save_offsets(self):
+        tmp_filename = self.index_filename + ".tmp"
+        with open(tmp_filename, "wb") as f:
+            self.stamp.tofile(f)
+            self.offsets.tofile(f)
+        os.replace(tmp_filename, self.index_filename)
+
+    # Return the saved offsets, or None if there are none or they belong to an older file
+    def load_offsets(self):
+        if not os.path.exists(self.index_filename):
+            return None
+        count = os.path.getsize(self.index_filename) // 8 - len(self.stamp)
+        stamp, offsets = array("Q"), array("Q")
+        with open(self.index_filename, "rb") as f:
+            stamp.fromfile(f, len(self.stamp))
+            if stamp != self.stamp or count < 1:
+                return None
+            offsets.fromfile(f, count)
+        return offsets
+
+    def line(self, i):
+        return self.data[self.offsets[i] : self.offsets[i + 1] - 1]
+
+    # Iterative binary search over the mapped lines
+    def contains(self, username):
+        target = username if isinstance(username, bytes) else username.encode("utf-8")
+        data, offsets = self.data, self.offsets
+        low, high = 0, len(offsets) - 2
+        while low <= high:
+            mid = (low + high) // 2
+            line = data[offsets[mid] : offsets[mid + 1] - 1]
+            if line < target:
+                low = mid + 1
+            elif line > target:
+                high = mid - 1
+            else:
+                return True
+        return False
+
+    # Same interface as the filters, but the answer is exact
+    def exist(self, username):
+        return self.contains(username)
+
+    def __contains__(self, username):
+        return self.contains(username)
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,91 @@
+#
+#  synthetic_data.py
+#  Login Checker Program
+#
+
+import random
+import string
+
+import mmh3
+
+"""
+Deterministic synthetic datasets, a local stand-in for the downloaded sorted_usernames_*.txt.
+
+Every username encodes an integer value as fixed-width base-26 lowercase letters with an underscore
+after every 4 letters, e.g. "baqd_kzet_ab". Equal widths make string order equal to value order, so
+a dataset written in value order is sorted.
+
+The dataset holds the even values 2 * (i * SPREAD + jitter(i)) for i < n, where the jitter is a hash
+of (i, seed): names are unevenly spaced, yet the i-th name can be computed without generating the
+ones before it. Odd values are never in the dataset, so a check list gets exactly the hit ratio it
+asks for by drawing hits from dataset names and misses from odd values.
+"""
+
+SPREAD = 16
+LETTERS = string.ascii_lowercase
+
+
+def name_width(n):
+    width = 4
+    while 26**width <= 2 * n * SPREAD:
+        width += 1
+    return width
+
+
+def username(value, width):
+    letters = []
+    for _ in range(width):
+        value, digit = divmod(value, 26)
+        letters.append(LETTERS[digit])
+    letters.reverse()
+    return "_".join("".join(letters[i : i + 4]) for i in range(0, len(letters), 4))
+
+
+def dataset_value(i, seed=0):
+    return 2 * (i * SPREAD + mmh3.hash(str(i), seed=seed, signed=False) % SPREAD)
+
+
+def dataset_names(n, seed=0):
+    width = name_width(n)
+    for i in range(n):
+        yield username(dataset_value(i, seed), width)
+
+
+"""
+Check list of count names in random order
+ - n, seed: the dataset the list is checked against
+ - hit_ratio: share of names taken from the dataset, the rest are never in it
+ - check_seed: seed of the draw
+
+Return the list of names and the exact number of hits.
+"""
+
+
+def check_names(n, count, hit_ratio=0.5, seed=0, check_seed=1):
+    rng = random.Random(check_seed)
+    width = name_width(n)
+    hits = round(count * hit_ratio) if n else 0
+    names = [
+        username(dataset_value(rng.randrange(n), seed), width) for _ in range(hits)
+    ]
+    names += [
+        username(2 * rng.randrange(max(n, 1) * SPREAD) + 1, width)
+        for _ in range(count - hits)
+    ]
+    rng.shuffle(names)
+    return names, hits
+
+
+# Stream a sorted dataset of n names to a file, one per line
+def write_dataset(filename, n, seed=0, chunk=100_000):
+    with open(filename, "w") as f:
+        names = dataset_names(n, seed)
+        for start in range(0, n, chunk):
+            f.write("".join(next(names) + "\n" for _ in range(min(chunk, n - start))))
+
+
+def write_check_list(filename, n, count, hit_ratio=0.5, seed=0, check_seed=1):
+    names, hits = check_names(n, count, hit_ratio, seed, check_seed)
+    with open(filename, "w") as f:
+        f.write("".join(name + "\n" for name in names))
+    return hits
@@ -0,0 +1,118 @@
+#
+#  vector_hash.py
+#  Login Checker Program
+#
+
+import numpy as np
+
+_U32 = np.uint32
+_U64 = np.uint64
+
+
+"""
+Vectorized MurmurHash3, bit-identical to mmh3.hash / mmh3.hash64.
+
+Usernames are laid out as a zero-padded byte matrix (one row per name). Zero padding makes the
+tail step safe to run unconditionally: a tail word made of padding is 0, and 0 mixed into the
+state is a no-op, exactly like the reference implementation skipping missing tail bytes.
+"""
+
+
+# str names are encoded as UTF-8 like mmh3 does, lengths come from the encoded bytes
+def to_byte_matrix(names, block=16):
+    encoded = [n if isinstance(n, bytes) else str(n).encode("utf-8") for n in names]
+    n = len(encoded)
+    lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=n)
+    width = int(lengths.max()) if n else 0
+    # Always leave room for one (possibly empty) tail block after the last full block
+    padded = (width // block + 1) * block
+    matrix = np.zeros((n, padded), dtype=np.uint8)
+    if width:
+        starts = np.cumsum(lengths) - lengths
+        rows = np.repeat(np.arange(n), lengths)
+        cols = np.arange(int(lengths.sum())) - np.repeat(starts, lengths)
+        matrix[rows, cols] = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    return matrix, lengths
+
+
+def _rotl32(x, r):
+    return (x << _U32(r)) | (x >> _U32(32 - r))
+
+
+def _rotl64(x, r):
+    return (x << _U64(r)) | (x >> _U64(64 - r))
+
+
+def _fmix32(h):
+    h ^= h >> _U32(16)
+    h *= _U32(0x85EBCA6B)
+    h ^= h >> _U32(13)
+    h *= _U32(0xC2B2AE35)
+    h ^= h >> _U32(16)
+    return h
+
+
+def _fmix64(k):
+    k ^= k >> _U64(33)
+    k *= _U64(0xFF51AFD7ED558CCD)
+    k ^= k >> _U64(33)
+    k *= _U64(0xC4CEB9FE1A85EC53)
+    k ^= k >> _U64(33)
+    return k
+
+
+# Vectorized mmh3.hash(name, seed, signed=False), returns a uint32 array
+def murmur3_32(matrix, lengths, seed=0):
+    c1, c2 = _U32(0xCC9E2D51), _U32(0x1B873593)
+    words = matrix.view("<u4")
+    nblocks = lengths // 4
+    rows = np.arange(len(lengths))
+    h = np.full(len(lengths), seed & 0xFFFFFFFF, dtype=_U32)
+    with np.errstate(over="ignore"):
+        for i in range(int(nblocks.max()) if len(lengths) else 0):
+            active = np.nonzero(nblocks > i)[0]
+            k = words[active, i] * c1
+            k = _rotl32(k, 15) * c2
+            ha = h[active] ^ k
+            h[active] = _rotl32(ha, 13) * _U32(5) + _U32(0xE6546B64)
+        k = words[rows, nblocks] * c1
+        h ^= _rotl32(k, 15) * c2
+        h ^= lengths.astype(_U32)
+        return _fmix32(h)
+
+
+# Vectorized mmh3.hash64(name, seed, signed=False), returns two uint64 arrays
+def murmur3_x64_128(matrix, lengths, seed=0):
+    c1, c2 = _U64(0x87C37B91114253D5), _U64(0x4CF5AD432745937F)
+    words = matrix.view("<u8")
+    nblocks = lengths // 16
+    rows = np.arange(len(lengths))
+    h1 = np.full(len(lengths), seed & 0xFFFFFFFF, dtype=_U64)
+    h2 = h1.copy()
+    with np.errstate(over="ignore"):
+        for i in range(int(nblocks.max()) if len(lengths) else 0):
+            active = np.nonzero(nblocks > i)[0]
+            a1, a2 = h1[active], h2[active]
+            k1 = _rotl64(words[active, 2 * i] * c1, 31) * c2
+            a1 ^= k1
+            a1 = _rotl64(a1, 27) + a2
+            a1 = a1 * _U64(5) + _U64(0x52DCE729)
+            k2 = _rotl64(words[active, 2 * i + 1] * c2, 33) * c1
+            a2 ^= k2
+            a2 = _rotl64(a2, 31) + a1
+            a2 = a2 * _U64(5) + _U64(0x38495AB5)
+            h1[active], h2[active] = a1, a2
+        k2 = _rotl64(words[rows, 2 * nblocks + 1] * c2, 33) * c1
+        h2 ^= k2
+        k1 = _rotl64(words[rows, 2 * nblocks] * c1, 31) * c2
+        h1 ^= k1
+        length = lengths.astype(_U64)
+        h1 ^= length
+        h2 ^= length
+        h1 += h2
+        h2 += h1
+        h1 = _fmix64(h1)
+        h2 = _fmix64(h2)
+        h1 += h2
+        h2 += h1
+        return h1, h2
@@ -0,0 +1,86 @@
+#
+#  test_batch_lookup.py
+#  Login Checker Program
+#
+
+import unittest
+import random
+import string
+
+import mmh3
+
+from src.batch_lookup import BatchLookup, to_byte_matrix, murmur3_32, murmur3_x64_128
+from src.blocked_bloom_filter import BlockedBloomFilter
+from src.bloom_filter import BloomFilter
+from src.cuckoo_filter import CuckooFilter
+from src.cuckoo_filter_ai import CuckooFilter as CuckooFilterAI
+
+
+class TestBatchLookup(unittest.TestCase):
+    def setUp(self):
+        """Random usernames of every length around the 4 and 16 byte block boundaries."""
+        rng = random.Random(520)
+        alphabet = string.ascii_lowercase + "_"
+        self.names = [
+            "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 40)))
+            for _ in range(2000)
+        ]
+        # Non-ASCII and trailing NUL names must hash exactly like mmh3 does
+        self.names += ["josé", "名前_user", "trailing\x00", "\x00"]
+
+    def test_murmur3_32_matches_mmh3(self):
+        """Test the vectorized 32-bit hash is bit-identical to mmh3.hash."""
+        matrix, lengths = to_byte_matrix(self.names)
+        hashes = murmur3_32(matrix, lengths, seed=42)
+        for name, h in zip(self.names, hashes):
+            self.assertEqual(int(h), mmh3.hash(name, seed=42, signed=False))
+
+    def test_murmur3_x64_128_matches_mmh3(self):
+        """Test the vectorized 128-bit hash is bit-identical to mmh3.hash64."""
+        matrix, lengths = to_byte_matrix(self.names)
+        h1, h2 = murmur3_x64_128(matrix, lengths, seed=7)
+        for name, a, b in zip(self.names, h1, h2):
+            self.assertEqual((int(a), int(b)), mmh3.hash64(name, seed=7, signed=False))
+
+    def check_filter(self, f):
+        for name in self.names[:1000]:
+            f.insert(name)
+        mask = BatchLookup(f).exist(self.names)
+        expected = [f.exist(name) for name in self.names]
+        mismatches = [n for n, a, b in zip(self.names, mask, expected) if a != b]
+        self.assertEqual(mismatches, [])
+        self.assertTrue(mask[:1000].all())
+
+    def test_bloom_filter(self):
+        """Test batch answers match BloomFilter.exist for both hash schemes."""
+        self.check_filter(BloomFilter(num_users=1000, prob=0.05))
+        self.check_filter(BloomFilter(num_users=1000, prob=0.05, hash_scheme="seeded"))
+
+    def test_blocked_bloom_filter(self):
+        """Test batch answers match BlockedBloomFilter.exist."""
+        self.check_filter(BlockedBloomFilter(num_users=1000, prob=0.05))
+
+    def test_cuckoo_filter(self):
+        """Test batch answers match CuckooFilter.exist."""
+        self.check_filter(CuckooFilter(capacity=5000, bucket_size=8))
+
+    def test_legacy_cuckoo_filter(self):
+        """Test batch answers match CuckooFilter.exist for filters from older snapshots."""
+        cf = CuckooFilter(capacity=5000, bucket_size=8)
+        cf.hash_scheme = "legacy"
+        cf.alt_offsets = cf.build_alt_offsets()
+        self.check_filter(cf)
+
+    def test_cuckoo_filter_ai(self):
+        """Test batch answers match the AI generated CuckooFilter.exist."""
+        self.check_filter(CuckooFilterAI(capacity=5000, bucket_size=8))
+
+    def test_unsupported_filter(self):
+        """Test unsupported filter types are rejected."""
+        self.assertFalse(BatchLookup.supports({}))
+        with self.assertRaises(TypeError):
+            BatchLookup({})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,32 @@
+#
+#  test_benchmark.py
+#  Login Checker Program
+#
+
+import unittest
+import json
+
+from src.benchmark import run_benchmarks, METHODS
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_small_run(self):
+        """Test every method runs, exact methods find exactly the generated hits."""
+        report = run_benchmarks(scales=(2000,), num_checks=500, hit_ratio=0.3)
+        json.dumps(report)
+        results = {r["method"]: r for r in report["results"]}
+        self.assertEqual(set(results), set(METHODS))
+        for method in ("binary", "hash"):
+            self.assertEqual(results[method]["hits"], 150)
+        for method in ("bloom", "cuckoo", "semi_sorted", "binary_fuse"):
+            self.assertTrue(results[method]["hits"] >= 150)
+        self.assertTrue(all(r["memory_bytes"] > 0 for r in results.values()))
+        # Same filter in 11 instead of 16 bits per slot
+        self.assertTrue(
+            results["semi_sorted"]["bits_per_item"]
+            < results["cuckoo"]["bits_per_item"] * 0.75
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
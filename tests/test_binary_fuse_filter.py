@@ -0,0 +1,100 @@
+#
+#  test_binary_fuse_filter.py
+#  Login Checker Program
+#
+
+import unittest
+import os
+import tempfile
+from unittest import mock
+
+import numpy as np
+
+from src.batch_lookup import BatchLookup
+from src.binary_fuse_filter import BinaryFuseFilter, fuse_layout
+from src.filter_store import save_filter, open_filter
+
+
+class TestBinaryFuseFilter(unittest.TestCase):
+    def setUp(self):
+        self.names = [f"user_{i}" for i in range(0, 40000, 2)]
+        self.fuse = BinaryFuseFilter.from_iterable(self.names)
+
+    def test_no_false_negatives(self):
+        """Test every name of the set is found, by exist and exist_many."""
+        self.assertTrue(all(self.fuse.exist(name) for name in self.names))
+        self.assertTrue(self.fuse.exist_many(self.names).all())
+
+    def test_false_positive_rate(self):
+        """Test about 1/256 false positives at about 9 bits per key."""
+        others = [f"user_{i}" for i in range(1, 400000, 2)]
+        rate = self.fuse.exist_many(others).mean()
+        self.assertTrue(0.002 < rate < 0.006)
+        self.assertTrue(self.fuse.bits_per_key() < 10)
+
+    def test_chunked_build(self):
+        """Test a build in many chunks gives the same filter as a build in one."""
+        with mock.patch("src.binary_fuse_filter.BUILD_CHUNK", 1000):
+            chunked = BinaryFuseFilter.from_iterable(self.names)
+            self.assertTrue(len(self.names) // chunked._chunk() >= 4)
+        self.assertEqual(chunked.seed, self.fuse.seed)
+        np.testing.assert_array_equal(chunked.fingerprints, self.fuse.fingerprints)
+
+    def test_exist_matches_bulk(self):
+        """Test the scalar and vectorized lookups agree, also through BatchLookup."""
+        checks = [f"user_{i}" for i in range(5000)] + [b"user_8", "ユーザー"]
+        single = [self.fuse.exist(name) for name in checks]
+        self.assertEqual(self.fuse.exist_many(checks).tolist(), single)
+        self.assertEqual(BatchLookup(self.fuse).exist(checks).tolist(), single)
+
+    def test_small_and_duplicate_sets(self):
+        """Test tiny sets and repeated names still build."""
+        for names in ([], ["only"], ["a", "b", "a"], [f"n{i}" for i in range(30)]):
+            fuse = BinaryFuseFilter.from_iterable(names)
+            self.assertTrue(all(fuse.exist(name) for name in names))
+            self.assertEqual(fuse.num_keys, len(set(names)))
+
+    def test_retries_on_peeling_failure(self):
+        """Test a failed peeling attempt is retried with another seed."""
+
+        class FlakyFilter(BinaryFuseFilter):
+            seeds = []
+
+            def _build(self, hashes):
+                self.seeds.append(self.seed)
+                return len(self.seeds) > 2 and super()._build(hashes)
+
+        fuse = FlakyFilter.from_iterable(self.names)
+        self.assertEqual(len(set(FlakyFilter.seeds)), 3)
+        self.assertTrue(fuse.exist_many(self.names).all())
+
+        # An array one segment short cannot hold the keys
+        hashes = BinaryFuseFilter.base_hashes(self.names)
+        fuse = BinaryFuseFilter(len(hashes))
+        fuse.segment_count -= 1
+        fuse.array_length -= fuse.segment_length
+        self.assertFalse(fuse._build(hashes))
+        with self.assertRaises(RuntimeError):
+            BinaryFuseFilter.from_hashes(hashes, max_attempts=0)
+
+    def test_layout(self):
+        """Test the array shrinks to about 1.125 slots per key on large sets."""
+        for num_keys in (10_000, 1_000_000, 10_000_000):
+            segment_length, segment_count = fuse_layout(num_keys)
+            self.assertTrue(segment_length <= 1 << 18)
+            slots = (segment_count + 2) * segment_length / num_keys
+            self.assertTrue(1.12 < slots < (1.3 if num_keys < 1e6 else 1.15))
+
+    def test_save_and_open(self):
+        """Test the fingerprint array round trips through filter_store."""
+        with tempfile.TemporaryDirectory() as tmp:
+            filename = os.path.join(tmp, "fuse.bin")
+            save_filter(self.fuse, filename)
+            loaded = open_filter(filename)
+            self.assertIsInstance(loaded, BinaryFuseFilter)
+            self.assertTrue(loaded.exist_many(self.names).all())
+            del loaded
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+#
+#  test_blocked_bloom_filter.py
+#  Login Checker Program
+#
+
+import unittest
+import pickle
+
+from src.blocked_bloom_filter import (
+    BlockedBloomFilter,
+    BLOCK_BITS,
+    CACHE_LINE,
+    fpr_penalty,
+    measure_fpr,
+)
+
+
+class TestBlockedBloomFilter(unittest.TestCase):
+    def setUp(self):
+        """Initialize the Blocked Bloom Filter for testing."""
+        self.bf = BlockedBloomFilter(num_users=1000, prob=0.1)
+
+    def test_insert_and_exist(self):
+        """Test insertion and existence check for elements."""
+        elements = ["hello", "world", "foo", "bar"]
+        self.bf.insert_many(elements)
+        for element in elements:
+            self.assertTrue(self.bf.exist(element))
+        self.assertEqual(self.bf.exist_many(elements), [True] * 4)
+        self.assertFalse(self.bf.exist("baz"))
+
+    def test_positions_stay_in_one_block(self):
+        """Test all probe positions of a key land in the same 512-bit block and are distinct."""
+        for i in range(100):
+            positions = self.bf.positions(f"user_{i}")
+            self.assertEqual(len(set(positions)), self.bf.num_hash)
+            self.assertEqual(len({pos // BLOCK_BITS for pos in positions}), 1)
+            self.assertTrue(all(0 <= pos < self.bf.size for pos in positions))
+
+    def test_blocks_are_cache_line_aligned(self):
+        """Test the bit buffer starts on a 64-byte boundary, also after a pickle round trip."""
+        for bf in (self.bf, BlockedBloomFilter(num_users=100000, prob=0.05)):
+            bf.insert("hello")
+            self.assertEqual(bf.filter.buffer_info()[0] % CACHE_LINE, 0)
+            restored = pickle.loads(pickle.dumps(bf))
+            self.assertEqual(restored.filter.buffer_info()[0] % CACHE_LINE, 0)
+            self.assertEqual(restored.filter, bf.filter)
+            self.assertTrue(restored.exist("hello"))
+
+    def test_false_positive_rate(self):
+        """Test the measured false positive rate stays close to the classic layout."""
+        self.bf.insert_many(f"item_{i}" for i in range(1000))
+        self.assertAlmostEqual(measure_fpr(self.bf, 10000), 0.1, delta=0.04)
+
+        report = fpr_penalty(num_users=5000, prob=0.05, num_queries=20000)
+        self.assertLess(report["penalty"], 1.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -68,6 +68,32 @@ class TestBloomFilter(unittest.TestCase):
         expected_num_hash = int(bf.size / num_users * math.log(2))
         self.assertEqual(bf.num_hash, expected_num_hash)
 
+    def test_insert_many_and_exist_many(self):
+        """Test bulk insertion and lookup agree with the single item methods."""
+        elements = [f"user_{i}" for i in range(200)]
+        self.bf.insert_many(elements)
+        self.assertEqual(self.bf.exist_many(elements), [True] * len(elements))
+
+        queries = [f"other_{i}" for i in range(500)]
+        self.assertEqual(
+            self.bf.exist_many(queries), [self.bf.exist(q) for q in queries]
+        )
+
+    def test_double_hashing_positions(self):
+        """Test the double hashing scheme yields num_hash valid positions from one hash."""
+        positions = self.bf.positions("hello_wo")
+        self.assertEqual(len(positions), self.bf.num_hash)
+        for pos in positions:
+            self.assertTrue(0 <= pos < self.bf.size)
+
+    def test_seeded_scheme(self):
+        """Test the legacy one-hash-per-probe scheme still works."""
+        bf = BloomFilter(num_users=1000, prob=0.1, hash_scheme="seeded")
+        bf.insert_many(["hello", "world"])
+        self.assertTrue(bf.exist("hello"))
+        self.assertEqual(bf.exist_many(["hello", "world"]), [True, True])
+        self.assertFalse(bf.exist("baz"))
+
 
 if __name__ == "__main__":
     unittest.main()
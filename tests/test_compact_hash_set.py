@@ -0,0 +1,74 @@
+#
+#  test_compact_hash_set.py
+#  Login Checker Program
+#
+
+import unittest
+import os
+import tempfile
+
+from src.compact_hash_set import CompactHashSet
+from src.filter_store import save_filter, open_filter
+from src.simple_algorithms import build_hash_table
+
+
+class TestCompactHashSet(unittest.TestCase):
+    def setUp(self):
+        """Usernames in the set and usernames that are not."""
+        self.usernames = [f"user_{i}" for i in range(0, 20000, 2)]
+        self.absent = [f"user_{i}" for i in range(1, 20000, 2)]
+
+    def test_add_and_contains(self):
+        """Test single adds grow the table and give exact answers."""
+        hash_set = CompactHashSet(capacity=8)
+        for name in self.usernames:
+            self.assertTrue(hash_set.add(name))
+        self.assertFalse(hash_set.add(self.usernames[0]))
+        self.assertEqual(len(hash_set), len(self.usernames))
+        self.assertTrue(all(name in hash_set for name in self.usernames))
+        self.assertFalse(any(name in hash_set for name in self.absent))
+
+    def test_add_many(self):
+        """Test bulk adds, str and bytes lookups and growth between batches."""
+        hash_set = CompactHashSet(capacity=100)
+        hash_set.add_many(self.usernames[:3000])
+        hash_set.add_many(name.encode() for name in self.usernames[3000:])
+        self.assertTrue(all(hash_set.exist(name) for name in self.usernames))
+        self.assertTrue(hash_set.exist(self.usernames[-1].encode()))
+        self.assertFalse(any(hash_set.exist(name) for name in self.absent))
+        self.assertTrue(len(hash_set) <= hash_set.max_load * len(hash_set.slots))
+
+    def test_non_ascii_and_long_names(self):
+        """Test UTF-8 names and the length limit."""
+        hash_set = CompactHashSet()
+        hash_set.add_many(["josé", "", "名前"])
+        self.assertTrue(all(n in hash_set for n in ("josé", "", "名前")))
+        self.assertFalse("jose" in hash_set)
+        with self.assertRaises(ValueError):
+            hash_set.add("x" * 256)
+
+    def test_from_file_save_and_mmap(self):
+        """Test a set built from a file is saved and searched in place."""
+        with tempfile.TemporaryDirectory() as tmp:
+            filename = os.path.join(tmp, "sorted_usernames.txt")
+            with open(filename, "w") as f:
+                f.write("\n".join(sorted(self.usernames)) + "\n")
+            hash_set = CompactHashSet.from_file(filename)
+            self.assertEqual(len(hash_set), len(self.usernames))
+
+            saved = os.path.join(tmp, "hash_set.bin")
+            save_filter(hash_set, saved)
+            for mmap_mode in (None, "r"):
+                loaded = open_filter(saved, mmap_mode=mmap_mode)
+                self.assertTrue(all(name in loaded for name in self.usernames))
+                self.assertFalse(any(name in loaded for name in self.absent))
+
+    def test_build_hash_table(self):
+        """Test the simple hash table demo is backed by the compact set."""
+        table = build_hash_table(self.usernames)
+        self.assertIsInstance(table, CompactHashSet)
+        self.assertTrue(self.usernames[5] in table)
+
+
+if __name__ == "__main__":
+    unittest.main()
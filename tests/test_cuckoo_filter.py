@@ -7,7 +7,11 @@
 
 import unittest
 
+import mmh3
+
+from src.bucket_table import EMPTY
 from src.cuckoo_filter import CuckooFilter
+from src.cuckoo_filter_ai import CuckooFilter as CuckooFilterAI
 
 
 class TestCuckooFilter(unittest.TestCase):
@@ -18,8 +22,37 @@ class TestCuckooFilter(unittest.TestCase):
     def test_fingerprint(self):
         """Test if the fingerprint is calculated correctly."""
         username = "hello_wo"
-        expected_fingerprint = self.cf.h1(username) & ((1 << self.cf.finger_bits) - 1)
+        h_idx, h_finger = mmh3.hash64(username, seed=self.cf.hash_seed, signed=False)
+        expected_fingerprint = (h_finger & ((1 << self.cf.finger_bits) - 1)) or 1
+        self.assertEqual(self.cf.fingerprint(username), expected_fingerprint)
+        self.assertEqual(self.cf.h1(username), h_idx & (self.cf.bucket_num - 1))
+
+    def test_bucket_count(self):
+        """Test the power of 2 is rounded down by default and up with round_up."""
+        # 1000 / (0.25 * 4) = 1000 buckets wanted
+        self.assertEqual(CuckooFilter(capacity=1000).bucket_num, 512)
+        self.assertEqual(CuckooFilter(capacity=1000, round_up=True).bucket_num, 1024)
+        self.assertEqual(CuckooFilter(capacity=1024, round_up=True).bucket_num, 1024)
+
+    def test_legacy_hash_scheme(self):
+        """Test filters from older snapshots keep deriving the fingerprint from the index."""
+        self.cf.hash_scheme = "legacy"
+        self.cf.alt_offsets = self.cf.build_alt_offsets()
+        username = "hello_wo"
+        expected_fingerprint = (
+            self.cf.h1(username) & ((1 << self.cf.finger_bits) - 1)
+        ) or 1
         self.assertEqual(self.cf.fingerprint(username), expected_fingerprint)
+        self.assertTrue(self.cf.insert(username))
+        self.assertTrue(self.cf.exist(username))
+
+    def test_alt_offsets(self):
+        """Test h2 is an involution driven by the precomputed offset table."""
+        self.assertEqual(len(self.cf.alt_offsets), 1 << self.cf.finger_bits)
+        for finger in range(1, 1 << self.cf.finger_bits):
+            h2x = self.cf.h2(5, finger)
+            self.assertTrue(0 <= h2x < self.cf.bucket_num)
+            self.assertEqual(self.cf.h2(h2x, finger), 5)
 
     def test_h1(self):
         """Test if h1 produces a valid bucket index."""
@@ -50,8 +83,8 @@ class TestCuckooFilter(unittest.TestCase):
 
         # Fill a bucket to its capacity
         bucket_idx = self.cf.h1(username)
-        for i in range(self.cf.bucket_size):
-            self.cf.buckets[bucket_idx].append(i)  # Fill with dummy fingerprints
+        # Dummy fingerprints
+        self.cf.buckets[bucket_idx] = range(1, self.cf.bucket_size + 1)
 
         # Insert the new element into the full bucket
         self.cf.insert(username)
@@ -66,16 +99,15 @@ class TestCuckooFilter(unittest.TestCase):
     def test_full(self):
         """Test if the full method correctly identifies a full bucket."""
         bucket_idx = 0
-        for i in range(self.cf.bucket_size):
-            self.cf.buckets[bucket_idx].append(i)  # Fill with dummy fingerprints
+        self.assertFalse(self.cf.full(bucket_idx))
+        # Dummy fingerprints
+        self.cf.buckets[bucket_idx] = range(1, self.cf.bucket_size + 1)
         self.assertTrue(self.cf.full(bucket_idx))
 
     def test_kick_out_too_many_times(self):
         """Test if the filter handles excessive kicking out."""
         # Fill all buckets to force excessive kicking
-        for bucket in self.cf.buckets:
-            for i in range(self.cf.bucket_size):
-                bucket.append(i)  # Fill with dummy fingerprints
+        self.cf.buckets[:] = range(1, self.cf.bucket_size + 1)  # Dummy fingerprints
 
         # Try to insert a new element
         username = "hello_wo"
@@ -123,6 +155,87 @@ class TestCuckooFilter(unittest.TestCase):
         first_user = "user_0"
         self.assertTrue(self.cf.exist(first_user))
 
+    def test_packed_table(self):
+        """Test buckets are one contiguous fixed-width array with a reserved empty value."""
+        self.assertEqual(
+            self.cf.buckets.shape, (self.cf.bucket_num, self.cf.bucket_size)
+        )
+        self.assertTrue(self.cf.buckets.flags["C_CONTIGUOUS"])
+        self.assertEqual(self.cf.buckets.itemsize, 1)  # 8-bit fingerprints
+        self.assertEqual(
+            CuckooFilter(capacity=100, fingerprint_size=12).buckets.itemsize, 2
+        )
+        self.assertTrue((self.cf.buckets == EMPTY).all())
+
+    def test_load_list_buckets(self):
+        """Test filters pickled with list-of-lists buckets are converted on load."""
+        self.cf.insert("hello_wo")
+        state = dict(self.cf.__dict__)
+        state["buckets"] = [
+            [f for f in row if f != EMPTY] for row in self.cf.buckets.tolist()
+        ]
+        restored = CuckooFilter.__new__(CuckooFilter)
+        restored.__setstate__(state)
+        self.assertTrue((restored.buckets == self.cf.buckets).all())
+        self.assertTrue(restored.exist("hello_wo"))
+
+    def test_stash(self):
+        """Test a victim that cannot be placed goes to the stash and stays findable."""
+        self.cf.buckets[:] = range(1, self.cf.bucket_size + 1)  # Dummy fingerprints
+        username = "hello_wo"
+        with self.assertLogs(level="WARNING"):
+            self.assertTrue(self.cf.insert(username))
+        self.assertEqual(len(self.cf.stash), 1)
+        self.assertTrue(self.cf.exist(username))
+
+        # Once the stash is full, inserts are refused without evicting anything
+        self.cf.stash_size = 1
+        before = self.cf.buckets.copy()
+        with self.assertLogs(level="ERROR"):
+            self.assertFalse(self.cf.insert("another_user"))
+        self.assertTrue((self.cf.buckets == before).all())
+        self.assertTrue(self.cf.exist(username))
+
+        self.cf.reset()
+        self.assertEqual(self.cf.stash, [])
+
+    def test_reinsert_does_not_fill_stash(self):
+        """Test inserting the same username over and over never fills the stash."""
+        username = "hello_wo"
+        for _ in range(4 * self.cf.bucket_size + self.cf.stash_size):
+            with self.assertNoLogs(level="ERROR"):
+                self.assertTrue(self.cf.insert(username))
+        self.assertLessEqual(len(self.cf.stash), 1)
+        self.assertTrue(self.cf.insert("another_user"))
+        self.assertTrue(self.cf.exist(username))
+
+    def test_any_bucket_size(self):
+        """Test a heavily loaded filter with 8-slot buckets keeps every inserted username."""
+        cf = CuckooFilter(capacity=2000, bucket_size=8, fingerprint_size=12)
+        usernames = [f"user_{i}" for i in range(int(cf.bucket_num * 8 * 0.9))]
+        for user in usernames:
+            self.assertTrue(cf.insert(user))
+        for user in usernames:
+            self.assertTrue(cf.exist(user))
+
+
+class TestCuckooFilterAI(unittest.TestCase):
+    def test_refused_insert_keeps_table(self):
+        """Test a failed kick walk is undone instead of reshuffling fingerprints."""
+        cf = CuckooFilterAI(
+            capacity=16, bucket_size=4, fingerprint_size=8, max_kicks=20
+        )
+        refused = 0
+        for i in range(64):
+            before = cf.buckets.copy()
+            if not cf.insert(f"user_{i}"):
+                refused += 1
+                self.assertTrue((cf.buckets == before).all())
+        self.assertTrue(refused > 0)
+
+        cf.reset()
+        self.assertTrue((cf.buckets == EMPTY).all())
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,51 @@
+#
+#  test_dataset_reader.py
+#  Login Checker Program
+#
+
+import unittest
+import os
+import tempfile
+
+from src.dataset_reader import read_line_batches, read_lines, count_lines
+
+
+class TestDatasetReader(unittest.TestCase):
+    def setUp(self):
+        """Temporary directory for the dataset files."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.usernames = [f"user_{i}_{'x' * (i % 11)}" for i in range(2000)]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, content):
+        filename = os.path.join(self.tmp.name, "usernames.txt")
+        with open(filename, "wb") as f:
+            f.write(content)
+        return filename
+
+    def test_lines_across_block_boundaries(self):
+        """Test lines cut by a block boundary come out whole, for any block size."""
+        filename = self.write(("\n".join(self.usernames) + "\n").encode())
+        expected = [name.encode() for name in self.usernames]
+        for block_size in (1, 7, 64, 4096, 1 << 20):
+            self.assertEqual(list(read_lines(filename, block_size)), expected)
+            batches = list(read_line_batches(filename, block_size))
+            self.assertTrue(all(batches))
+
+    def test_missing_final_newline_and_crlf(self):
+        """Test an unterminated last line and Windows line ends."""
+        filename = self.write(b"alice\r\nbob\r\ncarol")
+        self.assertEqual(list(read_lines(filename, 4)), [b"alice", b"bob", b"carol"])
+        self.assertEqual(count_lines(filename), 3)
+
+    def test_count_lines(self):
+        """Test the block count matches the number of lines."""
+        filename = self.write(("\n".join(self.usernames) + "\n").encode())
+        self.assertEqual(count_lines(filename, block_size=100), len(self.usernames))
+        self.assertEqual(count_lines(self.write(b"")), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+#
+#  test_filter_planner.py
+#  Login Checker Program
+#
+
+import unittest
+
+from src.bloom_filter import BloomFilter
+from src.cuckoo_filter import CuckooFilter
+from src.filter_planner import plan_filter
+
+
+class TestFilterPlanner(unittest.TestCase):
+    def test_fpr_target(self):
+        """Test every kind meets the target and the plan matches the built filter."""
+        for kind in ("bloom", "blocked_bloom", "cuckoo"):
+            plan = plan_filter(5000, fpr=0.01, kinds=(kind,))
+            self.assertEqual(plan.kind, kind)
+            self.assertTrue(plan.fpr <= 0.01)
+            filter = plan.new_filter()
+            if kind == "cuckoo":
+                self.assertEqual(filter.buckets.nbytes, plan.memory_bytes)
+            else:
+                self.assertEqual(filter.size // 8, plan.memory_bytes)
+
+    def test_scales_with_items(self):
+        """Test small datasets get small filters instead of the 1e9 user default."""
+        small = plan_filter(1000, fpr=0.05, kinds=("bloom",))
+        large = plan_filter(1_000_000, fpr=0.05, kinds=("bloom",))
+        self.assertTrue(small.memory_bytes * 500 < large.memory_bytes)
+        self.assertTrue(large.memory_bytes < BloomFilter(prob=0.05).size // 8 // 500)
+
+    def test_memory_budget(self):
+        """Test a budget alone gives the lowest rate that fits, a larger budget a lower rate."""
+        tight = plan_filter(100_000, memory_bytes=64 * 1024)
+        loose = plan_filter(100_000, memory_bytes=256 * 1024)
+        self.assertTrue(tight.memory_bytes <= 64 * 1024)
+        self.assertTrue(loose.memory_bytes <= 256 * 1024)
+        self.assertTrue(loose.fpr < tight.fpr)
+
+    def test_impossible(self):
+        """Test unreachable or missing targets raise ValueError."""
+        with self.assertRaises(ValueError):
+            plan_filter(1_000_000, fpr=1e-6, memory_bytes=1024)
+        with self.assertRaises(ValueError):
+            plan_filter(1000)
+        with self.assertRaises(ValueError):
+            plan_filter(1000, fpr=0.01, kinds=("xor",))
+
+    def test_cuckoo_plan_holds_all_items(self):
+        """Test a planned cuckoo filter takes every item at its high load factor."""
+        plan = plan_filter(3000, fpr=0.001, kinds=("cuckoo",))
+        cf = plan.new_filter()
+        self.assertIsInstance(cf, CuckooFilter)
+        names = [f"user_{i}" for i in range(3000)]
+        self.assertTrue(all(cf.insert(name) for name in names))
+        self.assertTrue(all(cf.exist(name) for name in names))
+        self.assertTrue(3000 / cf.buckets.size > plan.params["load_factor"] / 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+#
+#  test_filter_store.py
+#  Login Checker Program
+#
+
+import unittest
+import os
+import pickle
+import tempfile
+
+from src.blocked_bloom_filter import BlockedBloomFilter, CACHE_LINE
+from src.bloom_filter import BloomFilter
+from src.cuckoo_filter import CuckooFilter
+from src.cuckoo_filter_ai import CuckooFilter as CuckooFilterAI
+from src.filter_store import (
+    PAYLOAD_ALIGN,
+    save_filter,
+    open_filter,
+    is_filter_file,
+    read_header,
+)
+
+
+class TestFilterStore(unittest.TestCase):
+    def setUp(self):
+        """Temporary file for the saved filter."""
+        fd, self.filename = tempfile.mkstemp(suffix=".bin")
+        os.close(fd)
+        self.inserted = [f"user_{i}" for i in range(300)]
+        self.absent = [f"absent_{i}" for i in range(300)]
+
+    def tearDown(self):
+        os.remove(self.filename)
+
+    def round_trip(self, f):
+        for name in self.inserted:
+            f.insert(name)
+        save_filter(f, self.filename)
+        self.assertTrue(is_filter_file(self.filename))
+        for mode in (None, "r", "c"):
+            loaded = open_filter(self.filename, mmap_mode=mode)
+            self.assertIs(type(loaded), type(f))
+            for name in self.inserted + self.absent:
+                self.assertEqual(loaded.exist(name), f.exist(name))
+        return loaded
+
+    def test_bloom_filter(self):
+        """Test a Bloom filter answers the same after saving and opening it."""
+        self.round_trip(BloomFilter(num_users=1000, prob=0.05))
+        self.round_trip(BloomFilter(num_users=1000, prob=0.05, hash_scheme="seeded"))
+
+    def test_blocked_bloom_filter(self):
+        """Test the blocked Bloom filter payload stays cache-line aligned in every mode."""
+        bf = BlockedBloomFilter(num_users=1000, prob=0.05)
+        self.round_trip(bf)
+        for mode in (None, "r"):
+            loaded = open_filter(self.filename, mmap_mode=mode)
+            self.assertEqual(loaded.filter.buffer_info()[0] % CACHE_LINE, 0)
+
+    def test_cuckoo_filter(self):
+        """Test a cuckoo filter keeps its buckets and stash."""
+        cf = CuckooFilter(capacity=1000, bucket_size=4)
+        cf.stash.append((3, 7))
+        loaded = self.round_trip(cf)
+        self.assertEqual(loaded.stash, cf.stash)
+        self.assertTrue((loaded.buckets == cf.buckets).all())
+
+    def test_cuckoo_filter_ai(self):
+        """Test the AI generated cuckoo filter round trip."""
+        self.round_trip(CuckooFilterAI(capacity=1000))
+
+    def test_mmap_modes(self):
+        """Test read-only maps refuse inserts and copy-on-write maps never touch the file."""
+        save_filter(CuckooFilter(capacity=1000), self.filename)
+        with open(self.filename, "rb") as f:
+            before = f.read()
+            f.seek(0)
+            _, offset = read_header(f)
+        self.assertEqual(offset % PAYLOAD_ALIGN, 0)
+
+        with self.assertRaises(ValueError):
+            open_filter(self.filename, mmap_mode="r").insert("hello")
+        cf = open_filter(self.filename, mmap_mode="c")
+        self.assertTrue(cf.insert("hello"))
+        self.assertTrue(cf.exist("hello"))
+        with open(self.filename, "rb") as f:
+            self.assertEqual(f.read(), before)
+
+    def test_not_a_filter_file(self):
+        """Test pickles are recognised as not being in the new format."""
+        with open(self.filename, "wb") as f:
+            pickle.dump(BloomFilter(num_users=10), f)
+        self.assertFalse(is_filter_file(self.filename))
+        with self.assertRaises(ValueError):
+            open_filter(self.filename)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+#
+#  test_front_coded_store.py
+#  Login Checker Program
+#
+
+import unittest
+import os
+import tempfile
+
+from src.filter_store import save_filter, open_filter
+from src.front_coded_store import FrontCodedStore
+
+
+class TestFrontCodedStore(unittest.TestCase):
+    def setUp(self):
+        """Sorted usernames with shared prefixes, a few long and non-ASCII ones."""
+        names = {f"user_{i}" for i in range(0, 3000, 3)}
+        names |= {"alex_" + "x" * 200, "alexa", "zoë", "a"}
+        self.usernames = sorted(n.encode() for n in names)
+        self.store = FrontCodedStore.from_sorted(self.usernames)
+
+    def test_iteration(self):
+        """Test the names decode back in order, across block boundaries."""
+        self.assertEqual(len(self.store), len(self.usernames))
+        self.assertEqual(list(self.store), self.usernames)
+
+    def test_contains(self):
+        """Test exact answers for stored names, gaps and names outside the range."""
+        for i in range(3000):
+            self.assertEqual(f"user_{i}" in self.store, i % 3 == 0)
+        for name in ("", "0", "alex", "alex_", "zzz", "user_"):
+            self.assertFalse(self.store.exist(name))
+        self.assertTrue(self.store.exist("zoë"))
+        self.assertTrue(self.store.exist("a"))
+        self.assertFalse(FrontCodedStore().exist("a"))
+
+    def test_compression(self):
+        """Test the store is smaller than the plain text of the names."""
+        text_bytes = sum(len(n) + 1 for n in self.usernames)
+        self.assertTrue(self.store.nbytes < text_bytes / 2)
+
+    def test_must_be_sorted(self):
+        """Test out of order and duplicate names are refused."""
+        with self.assertRaises(ValueError):
+            FrontCodedStore.from_sorted(["bob", "alice"])
+        with self.assertRaises(ValueError):
+            FrontCodedStore.from_sorted(["bob", "bob"])
+
+    def test_from_file_save_and_mmap(self):
+        """Test a store built from a file is saved and searched in place."""
+        with tempfile.TemporaryDirectory() as tmp:
+            filename = os.path.join(tmp, "sorted_usernames.txt")
+            with open(filename, "wb") as f:
+                f.write(b"\n".join(self.usernames) + b"\n")
+            store = FrontCodedStore.from_file(filename, block_keys=8)
+            saved = os.path.join(tmp, "store.bin")
+            save_filter(store, saved)
+            for mmap_mode in (None, "r"):
+                loaded = open_filter(saved, mmap_mode=mmap_mode)
+                self.assertEqual(list(loaded), self.usernames)
+                self.assertTrue(all(name in loaded for name in self.usernames))
+                self.assertFalse("user_1" in loaded)
+
+
+if __name__ == "__main__":
+    unittest.main()
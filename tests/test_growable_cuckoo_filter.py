@@ -0,0 +1,89 @@
+#
+#  test_growable_cuckoo_filter.py
+#  Login Checker Program
+#
+
+import unittest
+import logging
+import os
+import tempfile
+
+from src.batch_lookup import BatchLookup
+from src.filter_store import save_filter, open_filter
+from src.growable_cuckoo_filter import GrowableCuckooFilter
+
+
+class TestGrowableCuckooFilter(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.gcf = GrowableCuckooFilter(
+            initial_capacity=1000, bucket_size=4, load_factor=0.9
+        )
+        self.names = [f"user_{i}" for i in range(0, 20000, 2)]
+        for name in self.names:
+            self.assertTrue(self.gcf.insert(name))
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def test_grows_without_losing_names(self):
+        """Test full tables get a larger successor and every name is still found."""
+        self.assertTrue(len(self.gcf.tables) >= 3)
+        bits = [table.finger_bits for table in self.gcf.tables]
+        self.assertEqual(bits, list(range(12, 12 + len(bits))))
+        self.assertTrue(all(self.gcf.exist(name) for name in self.names))
+
+    def test_fpr_bounded(self):
+        """Test the chain's false positive rate stays near the first table's."""
+        others = [f"user_{i}" for i in range(1, 100000, 2)]
+        positives = sum(self.gcf.exist(name) for name in others)
+        # 2 * 4 / 2^12 ~ 0.002 for the first table, less than twice that for the chain
+        self.assertTrue(positives / len(others) < 0.004)
+
+    def test_fpr_bounded_after_growth(self):
+        """Test the measured rate of a chain of short fingerprints stays below its bound."""
+        gcf = GrowableCuckooFilter(
+            initial_capacity=500, bucket_size=4, fingerprint_size=8, load_factor=0.9
+        )
+        for i in range(0, 60000, 2):
+            self.assertTrue(gcf.insert(f"user_{i}"))
+        self.assertTrue(len(gcf.tables) >= 5)
+        others = [f"user_{i}" for i in range(1, 200000, 2)]
+        rate = sum(gcf.exist(name) for name in others) / len(others)
+        # Twice the rate of a full first table, 2 * 4 / 2^8
+        self.assertTrue(gcf.fpr_bound() < 2 * 2 * 4 / 2**8)
+        self.assertTrue(rate < gcf.fpr_bound() * 1.1)
+
+    def test_refuses_past_the_fingerprint_cap(self):
+        """Test a chain that cannot add a longer fingerprint refuses inserts instead."""
+        gcf = GrowableCuckooFilter(initial_capacity=200, fingerprint_size=15)
+        self.assertEqual(gcf.max_tables, 2)
+        results = [gcf.insert(f"user_{i}") for i in range(5000)]
+        self.assertFalse(all(results))
+        self.assertEqual(len(gcf.tables), 2)
+        self.assertEqual([table.finger_bits for table in gcf.tables], [15, 16])
+
+    def test_batch_lookup(self):
+        """Test BatchLookup matches exist(), including tables added after it was made."""
+        engine = BatchLookup(self.gcf)
+        for i in range(20000):
+            self.gcf.insert(f"late_{i}")
+        checks = self.names[::9] + [f"late_{i}" for i in range(0, 20000, 11)]
+        checks += [f"user_{i}" for i in range(1, 2000, 2)]
+        self.assertEqual(
+            engine.exist(checks).tolist(), [self.gcf.exist(n) for n in checks]
+        )
+
+    def test_save_and_open(self):
+        """Test every table round trips through filter_store."""
+        with tempfile.TemporaryDirectory() as tmp:
+            filename = os.path.join(tmp, "growable.bin")
+            save_filter(self.gcf, filename)
+            loaded = open_filter(filename)
+            self.assertEqual(len(loaded.tables), len(self.gcf.tables))
+            self.assertTrue(all(loaded.exist(name) for name in self.names))
+            del loaded
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+#
+#  test_instrumentation.py
+#  Login Checker Program
+#
+
+import unittest
+
+from src.batch_lookup import BatchLookup
+from src.blocked_bloom_filter import BlockedBloomFilter
+from src.bloom_filter import BloomFilter
+from src.cuckoo_filter import CuckooFilter
+from src.instrumentation import Histogram, FilterStats
+
+
+class TestHistogram(unittest.TestCase):
+    def test_quantiles(self):
+        """Test power-of-2 buckets and quantile bounds."""
+        histogram = Histogram()
+        for value in [1] * 90 + [1000] * 10:
+            histogram.record(value)
+        snapshot = histogram.snapshot()
+        self.assertEqual(snapshot["count"], 100)
+        self.assertEqual(snapshot["p50"], 2)
+        self.assertEqual(snapshot["p99"], 1024)
+
+    def test_counted(self):
+        """Test counted() passes items through and counts every event per item."""
+        stats = FilterStats()
+        self.assertEqual(
+            list(stats.counted("abc", "inserts", "hash_calls")), ["a", "b", "c"]
+        )
+        self.assertEqual(stats.snapshot()["counters"], {"inserts": 3, "hash_calls": 3})
+
+
+class TestFilterStats(unittest.TestCase):
+    def setUp(self):
+        self.names = [f"user_{i}" for i in range(0, 2000, 2)]
+        self.checks = [f"user_{i}" for i in range(200)]
+
+    def test_off_by_default(self):
+        """Test filters count nothing unless enable_stats() was called."""
+        bf = BloomFilter(num_users=1000, prob=0.01)
+        bf.insert_many(self.names)
+        self.assertIsNone(bf.instrument)
+        self.assertNotIn("counters", bf.stats())
+
+    def test_bloom_stats(self):
+        """Test Bloom counters and the fill-based false positive estimate."""
+        for filter_cls in (BloomFilter, BlockedBloomFilter):
+            bf = filter_cls(num_users=1000, prob=0.01)
+            bf.enable_stats()
+            bf.insert_many(self.names)
+            positives = sum(bool(bf.exist(name)) for name in self.checks)
+            stats = bf.stats()
+            self.assertEqual(stats["counters"]["inserts"], 1000)
+            self.assertEqual(stats["counters"]["lookups"], 200)
+            self.assertEqual(stats["counters"]["positives"], positives)
+            self.assertTrue(0 < stats["fill_ratio"] < 1)
+            self.assertTrue(stats["estimated_fpr"] < 0.05)
+
+    def test_cuckoo_stats(self):
+        """Test cuckoo occupancy, load and kick chain histogram."""
+        cf = CuckooFilter(capacity=1200, bucket_size=4, fingerprint_size=12)
+        cf.enable_stats()
+        for name in self.names:
+            cf.insert(name)
+        stats = cf.stats()
+        self.assertEqual(stats["counters"]["inserts"], 1000)
+        self.assertEqual(sum(stats["occupancy"].values()), cf.bucket_num)
+        stored = sum(k * v for k, v in stats["occupancy"].items()) + stats["stash"]
+        self.assertTrue(stored <= 1000)
+        self.assertAlmostEqual(
+            stats["load"], (stored - stats["stash"]) / cf.buckets.size
+        )
+        self.assertEqual(stats["histograms"]["kick_chain"]["count"], 1000)
+
+    def test_stats_without_scan(self):
+        """Test scan=False keeps the counters but leaves out everything that reads the table."""
+        bf = BloomFilter(num_users=1000, prob=0.01)
+        cf = CuckooFilter(capacity=1200)
+        for f, scanned in (
+            (bf, ("fill_ratio", "estimated_fpr")),
+            (cf, ("load", "occupancy")),
+        ):
+            f.enable_stats()
+            f.insert(self.names[0])
+            stats = f.stats(scan=False)
+            self.assertEqual(stats["counters"]["inserts"], 1)
+            self.assertFalse(set(scanned) & set(stats))
+            self.assertTrue(set(scanned) <= set(f.stats()))
+
+    def test_batch_lookup_counts(self):
+        """Test bulk lookups are counted like single ones."""
+        bf = BloomFilter(num_users=1000, prob=0.01)
+        bf.insert_many(self.names)
+        bf.enable_stats()
+        found = BatchLookup(bf).exist(self.checks)
+        counters = bf.stats()["counters"]
+        self.assertEqual(counters["lookups"], 200)
+        self.assertEqual(counters["positives"], int(found.sum()))
+
+
+if __name__ == "__main__":
+    unittest.main()
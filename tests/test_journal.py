@@ -0,0 +1,103 @@
+#
+#  test_journal.py
+#  Login Checker Program
+#
+
+import unittest
+import os
+import tempfile
+from unittest import mock
+
+from src.bloom_filter import BloomFilter
+from src.cuckoo_filter import CuckooFilter
+from src.filter_store import save_filter, open_filter
+from src.journal import JournaledFilter, JOURNAL_SUFFIX
+
+
+class TestJournaledFilter(unittest.TestCase):
+    def setUp(self):
+        """Temporary directory holding the snapshot and its journal."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.snapshot = os.path.join(self.tmp.name, "saved_filter.bin")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def check_persists(self, f):
+        f.insert("existing_user")
+        save_filter(f, self.snapshot)
+
+        with JournaledFilter(self.snapshot, compact_every=None) as jf:
+            jf.insert("new_user")
+            self.assertTrue(jf.exist("new_user"))
+        self.assertTrue(os.path.getsize(self.snapshot + JOURNAL_SUFFIX) > 0)
+        # The snapshot itself is untouched until compaction
+        self.assertFalse(open_filter(self.snapshot).exist("new_user"))
+
+        with JournaledFilter(self.snapshot, compact_every=None) as jf:
+            self.assertEqual(jf.pending, 1)
+            self.assertTrue(jf.exist("new_user"))
+            self.assertTrue(jf.exist("existing_user"))
+            jf.compact()
+        self.assertEqual(os.path.getsize(self.snapshot + JOURNAL_SUFFIX), 0)
+        self.assertTrue(open_filter(self.snapshot).exist("new_user"))
+
+    def test_bloom_filter(self):
+        """Test journaled inserts into a Bloom filter survive a reopen and a compaction."""
+        self.check_persists(BloomFilter(num_users=1000, prob=0.05))
+
+    def test_cuckoo_filter(self):
+        """Test journaled inserts into a cuckoo filter survive a reopen and a compaction."""
+        self.check_persists(CuckooFilter(capacity=1000))
+
+    def test_automatic_compaction(self):
+        """Test the journal is folded into the snapshot every compact_every inserts."""
+        save_filter(BloomFilter(num_users=1000, prob=0.05), self.snapshot)
+        with JournaledFilter(self.snapshot, compact_every=10) as jf:
+            for i in range(25):
+                jf.insert(f"user_{i}")
+            self.assertEqual(jf.pending, 5)
+        saved = open_filter(self.snapshot)
+        self.assertTrue(all(saved.exist(f"user_{i}") for i in range(20)))
+
+    def test_compaction_is_durable(self):
+        """Test the snapshot and its directory are fsynced before the journal is emptied."""
+        save_filter(BloomFilter(num_users=1000, prob=0.05), self.snapshot)
+        journal = self.snapshot + JOURNAL_SUFFIX
+        events = []
+        fsync, replace = os.fsync, os.replace
+
+        def record(name, call):
+            def wrapper(*args):
+                events.append((name, os.path.getsize(journal)))
+                return call(*args)
+
+            return wrapper
+
+        with JournaledFilter(self.snapshot, compact_every=None) as jf:
+            jf.insert("new_user")
+            with mock.patch("os.fsync", record("fsync", fsync)), mock.patch(
+                "os.replace", record("replace", replace)
+            ):
+                jf.compact()
+        self.assertEqual([name for name, _ in events], ["fsync", "replace", "fsync"])
+        self.assertTrue(all(size > 0 for _, size in events))
+        self.assertEqual(os.path.getsize(journal), 0)
+
+    def test_torn_record(self):
+        """Test a partial record left by a crash is dropped on replay."""
+        save_filter(BloomFilter(num_users=1000, prob=0.05), self.snapshot)
+        with open(self.snapshot + JOURNAL_SUFFIX, "wb") as f:
+            f.write(b"complete_user\nhalf_writ")
+        with self.assertLogs(level="WARNING"):
+            jf = JournaledFilter(self.snapshot)
+        self.assertEqual(jf.pending, 1)
+        self.assertTrue(jf.exist("complete_user"))
+        jf.insert("next_user")
+        jf.close()
+        with open(self.snapshot + JOURNAL_SUFFIX, "rb") as f:
+            self.assertEqual(f.read(), b"complete_user\nnext_user\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
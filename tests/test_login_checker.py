@@ -0,0 +1,64 @@
+#
+#  test_login_checker.py
+#  Login Checker Program
+#
+
+import unittest
+
+from src.bloom_filter import BloomFilter
+from src.compact_hash_set import CompactHashSet
+from src.cuckoo_filter import CuckooFilter
+from src.front_coded_store import FrontCodedStore
+from src.login_checker import LoginChecker
+
+
+class TestLoginChecker(unittest.TestCase):
+    def setUp(self):
+        """A deliberately loose Bloom filter over the taken names, and the names to check."""
+        self.taken = sorted(f"user_{i}" for i in range(0, 4000, 2))
+        self.checks = [f"user_{i}" for i in range(4000)] + ["nobody"] * 10
+        self.bloom = BloomFilter(num_users=2000, prob=0.3)
+        self.bloom.insert_many(self.taken)
+
+    def test_exact_answers(self):
+        """Test answers are exact whatever the filter's false positives."""
+        verifier = FrontCodedStore.from_sorted(self.taken)
+        checker = LoginChecker(self.bloom, verifier)
+        expected = [name in verifier for name in self.checks]
+        self.assertEqual([checker.exist(name) for name in self.checks], expected)
+        self.assertEqual(checker.exist_many(self.checks), expected)
+
+    def test_counters(self):
+        """Test only filter positives reach the verifier and false ones are counted."""
+        hash_set = CompactHashSet()
+        hash_set.add_many(self.taken)
+        checker = LoginChecker(self.bloom, hash_set)
+        checker.exist_many(self.checks)
+        stats = checker.stats()
+        positives = sum(self.bloom.exist(name) for name in self.checks)
+        self.assertEqual(stats["checked"], len(self.checks))
+        self.assertEqual(stats["verified"], positives)
+        self.assertEqual(stats["filtered"], len(self.checks) - positives)
+        self.assertEqual(stats["false_positives"], positives - len(self.taken))
+        self.assertTrue(stats["false_positives"] > 0)
+
+    def test_other_filters(self):
+        """Test a cuckoo filter and a filter BatchLookup does not know, queried name by name."""
+
+        class SetFilter:
+            def __init__(self, names):
+                self.names = set(names)
+
+            def exist(self, name):
+                return name in self.names
+
+        cuckoo = CuckooFilter(capacity=4000)
+        for name in self.taken:
+            cuckoo.insert(name)
+        for filter in (SetFilter(self.taken), cuckoo):
+            checker = LoginChecker(filter, FrontCodedStore.from_sorted(self.taken))
+            self.assertEqual(sum(checker.exist_many(self.checks)), len(self.taken))
+
+
+if __name__ == "__main__":
+    unittest.main()
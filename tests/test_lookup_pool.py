@@ -0,0 +1,104 @@
+#
+#  test_lookup_pool.py
+#  Login Checker Program
+#
+
+import unittest
+import contextlib
+import io
+import os
+import re
+import tempfile
+
+from src.binary_fuse_filter import BinaryFuseFilter
+from src.bloom_filter import BloomFilter
+from src.cuckoo_filter import CuckooFilter
+from src.dataset_reader import read_line_batches
+from src.filter_store import save_filter, open_filter
+from src.helper import check_usernames
+from src.lookup_pool import LookupPool
+from src.result_cache import CachedFilter
+from src.scalable_bloom_filter import ScalableBloomFilter
+
+
+class TestLookupPool(unittest.TestCase):
+    def setUp(self):
+        """Write a file of names to check, half of them inserted."""
+        self.names = [f"user_{i}" for i in range(0, 6000, 2)]
+        self.checks = [f"user_{i}" for i in range(6000)] + ["ユーザー"]
+        fd, self.filename = tempfile.mkstemp(suffix=".txt")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write("\n".join(self.checks) + "\n")
+
+    def tearDown(self):
+        os.remove(self.filename)
+
+    def filters(self):
+        bf = BloomFilter(num_users=len(self.names), prob=0.01)
+        cf = CuckooFilter(capacity=len(self.names), load_factor=0.9, round_up=True)
+        sbf = ScalableBloomFilter(initial_capacity=1000, prob=0.01)
+        for name in self.names:
+            bf.insert(name)
+            cf.insert(name)
+            sbf.insert(name)
+        return [bf, cf, sbf, BinaryFuseFilter.from_iterable(self.names)]
+
+    def test_matches_serial_lookups(self):
+        """Test exist and exist_file answer as the filter itself, in input order."""
+        for filter in self.filters():
+            expected = [bool(filter.exist(name)) for name in self.checks]
+            with LookupPool(filter, processes=2, chunk_size=1000) as pool:
+                self.assertEqual(pool.exist(self.checks).tolist(), expected)
+                self.assertEqual(pool.exist_file(self.filename).tolist(), expected)
+                self.assertEqual(pool.exist([]).tolist(), [])
+
+    def test_mapped_filter_is_not_copied(self):
+        """Test workers map the file of a filter opened read-only instead of a shared copy."""
+        bf = self.filters()[0]
+        with tempfile.TemporaryDirectory() as tmp:
+            saved = os.path.join(tmp, "bloom.bin")
+            save_filter(bf, saved)
+            mapped = open_filter(saved, mmap_mode="r")
+            with LookupPool(mapped, processes=2) as pool:
+                self.assertIsNone(pool.shm)
+                self.assertEqual(
+                    pool.exist_file(self.filename).tolist(),
+                    [bool(bf.exist(name)) for name in self.checks],
+                )
+            del mapped
+
+    def test_lines_split_like_serial(self):
+        """Test the pool and the serial path read the same names from an untidy file."""
+        bf = self.filters()[0]
+        with open(self.filename, "wb") as f:
+            f.write(b"user_0\r\nuser_2 \n\nuser_4\ruser_6\n user_8\nuser_10")
+        serial = [
+            bool(bf.exist(name))
+            for batch in read_line_batches(self.filename)
+            for name in batch
+        ]
+        with LookupPool(bf, processes=2) as pool:
+            self.assertEqual(pool.exist_file(self.filename).tolist(), serial)
+        self.assertEqual(serial, [True, False, False, True, True, False, True])
+
+    def test_supports(self):
+        """Test only the filter types filter_store.py can save are supported."""
+        bf = BloomFilter(num_users=100, prob=0.01)
+        self.assertTrue(LookupPool.supports(bf))
+        self.assertFalse(LookupPool.supports(CachedFilter(bf, 10)))
+
+    def test_check_usernames(self):
+        """Test check_usernames counts the same with a pool as without."""
+        cf = self.filters()[1]
+        counts = []
+        for processes in (1, 2):
+            out = io.StringIO()
+            with contextlib.redirect_stdout(out):
+                check_usernames(cf, self.filename, processes=processes)
+            counts.append(re.search(r"(\d+)/(\d+) usernames", out.getvalue()).groups())
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(counts[0][1], str(len(self.checks)))
+
+
+if __name__ == "__main__":
+    unittest.main()
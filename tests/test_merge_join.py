@@ -0,0 +1,65 @@
+#
+#  test_merge_join.py
+#  Login Checker Program
+#
+
+import unittest
+import os
+import random
+import tempfile
+
+from src.merge_join import merge_join, sorted_names
+
+
+class TestMergeJoin(unittest.TestCase):
+    def setUp(self):
+        """Temporary sorted dataset and a shuffled check list with duplicates."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.sorted_filename = self.write(
+            "sorted_usernames.txt", sorted(f"user_{i}" for i in range(0, 3000, 3))
+        )
+        rng = random.Random(7)
+        self.checks = [f"user_{rng.randrange(3000)}" for _ in range(2000)]
+        self.check_filename = self.write("usernames_check.txt", self.checks)
+        self.expected = sorted(c for c in self.checks if int(c[5:]) % 3 == 0)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name, lines):
+        filename = os.path.join(self.tmp.name, name)
+        with open(filename, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        return filename
+
+    def test_counts_and_matches(self):
+        """Test hits count every occurrence and match the exact answer."""
+        result = merge_join(self.sorted_filename, self.check_filename, collect=True)
+        self.assertEqual(result["total"], len(self.checks))
+        self.assertEqual(result["hits"], len(self.expected))
+        self.assertEqual(result["matches"], [c.encode() for c in self.expected])
+
+    def test_external_sort(self):
+        """Test the check list sorted in small runs on disk gives the same answer."""
+        self.assertEqual(
+            list(sorted_names(self.check_filename, run_size=64)),
+            sorted(c.encode() for c in self.checks),
+        )
+        result = merge_join(
+            self.sorted_filename,
+            self.check_filename,
+            run_size=64,
+            tmp_dir=self.tmp.name,
+        )
+        self.assertEqual(result["hits"], len(self.expected))
+        self.assertIsNone(result["matches"])
+
+    def test_unsorted_dataset(self):
+        """Test a dataset out of order is reported instead of giving wrong counts."""
+        unsorted = self.write("unsorted.txt", ["user_5", "user_1", "user_9"])
+        with self.assertRaises(ValueError):
+            merge_join(unsorted, self.check_filename)
+
+
+if __name__ == "__main__":
+    unittest.main()
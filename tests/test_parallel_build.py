@@ -0,0 +1,51 @@
+#
+#  test_parallel_build.py
+#  Login Checker Program
+#
+
+import unittest
+import os
+import tempfile
+
+from src.blocked_bloom_filter import BlockedBloomFilter
+from src.bloom_filter import BloomFilter
+from src.parallel_build import split_file, read_range, build_bloom_filter_parallel
+
+
+class TestParallelBuild(unittest.TestCase):
+    def setUp(self):
+        """Write a small sorted username file."""
+        fd, self.filename = tempfile.mkstemp(suffix=".txt")
+        self.usernames = sorted(f"user_{i}_{'x' * (i % 7)}" for i in range(3000))
+        with os.fdopen(fd, "w") as f:
+            f.write("\n".join(self.usernames) + "\n")
+
+    def tearDown(self):
+        os.remove(self.filename)
+
+    def test_split_file(self):
+        """Test the byte ranges cover the file and cut only at line starts."""
+        for parts in (1, 3, 8, 5000):
+            ranges = split_file(self.filename, parts)
+            self.assertEqual(ranges[0][0], 0)
+            self.assertEqual(ranges[-1][1], os.path.getsize(self.filename))
+            lines = []
+            for start, end in ranges:
+                lines.extend(
+                    line.decode() for line in read_range(self.filename, start, end)
+                )
+            self.assertEqual(lines, self.usernames)
+
+    def test_bit_identical_to_serial_build(self):
+        """Test the OR-merged parallel build equals the serial build bit for bit."""
+        for filter_cls in (BloomFilter, BlockedBloomFilter):
+            serial = filter_cls(num_users=3000, prob=0.05)
+            serial.insert_many(self.usernames)
+            parallel = build_bloom_filter_parallel(
+                self.filename, filter_cls, processes=4, num_users=3000, prob=0.05
+            )
+            self.assertEqual(bytes(parallel.payload()), bytes(serial.payload()))
+
+
+if __name__ == "__main__":
+    unittest.main()
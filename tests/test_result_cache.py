@@ -0,0 +1,107 @@
+#
+#  test_result_cache.py
+#  Login Checker Program
+#
+
+import unittest
+
+from src.bloom_filter import BloomFilter
+from src.result_cache import CachedFilter, LRUCache, ClockCache
+
+
+class CountingFilter:
+    """Exact set filter counting its lookups."""
+
+    def __init__(self):
+        self.names = set()
+        self.lookups = 0
+
+    def insert(self, name):
+        self.names.add(name)
+
+    def exist(self, name):
+        self.lookups += 1
+        return name in self.names
+
+
+class TestResultCache(unittest.TestCase):
+    def test_lru_eviction(self):
+        """Test the least recently used entry is evicted first."""
+        cache = LRUCache(2)
+        self.assertFalse(cache.put("a", True))
+        self.assertFalse(cache.put("b", False))
+        cache.get("a")
+        self.assertTrue(cache.put("c", True))
+        self.assertEqual(list(cache.entries), ["a", "c"])
+        cache.discard("a")
+        self.assertEqual(len(cache), 1)
+
+    def test_clock_eviction(self):
+        """Test CLOCK gives referenced entries a second chance and stays bounded."""
+        cache = ClockCache(3)
+        for key in "abc":
+            cache.put(key, True)
+        cache.get("a")
+        cache.get("c")
+        cache.put("d", False)
+        self.assertEqual(len(cache), 3)
+        self.assertFalse(cache.get("d"))
+        self.assertEqual(sum(cache.get(k) is True for k in "abc"), 2)
+        cache.discard("d")
+        self.assertEqual(len(cache), 2)
+        for i in range(100):
+            cache.put(i, True)
+        self.assertEqual(len(cache), 3)
+
+    def test_counters(self):
+        """Test repeated names are served from the cache and counted."""
+        for policy in ("lru", "clock"):
+            inner = CountingFilter()
+            inner.insert("popular")
+            cached = CachedFilter(inner, size=2, policy=policy)
+            trace = ["popular", "rare_1", "popular", "popular", "rare_2", "rare_3"]
+            self.assertEqual(
+                [cached.exist(name) for name in trace],
+                [True, False, True, True, False, False],
+            )
+            stats = cached.stats()
+            self.assertEqual((stats["hits"], stats["misses"]), (2, 4))
+            self.assertEqual(inner.lookups, 4)
+            self.assertTrue(stats["evictions"] >= 1)
+
+    def test_insert_invalidates(self):
+        """Test a cached "no" is dropped when the name is inserted."""
+        cached = CachedFilter(CountingFilter(), size=10)
+        self.assertFalse(cached.exist("new_user"))
+        cached.insert("new_user")
+        self.assertTrue(cached.exist("new_user"))
+
+    def test_str_and_bytes_share_entries(self):
+        """Test a name cached as bytes is dropped by an insert of the str, and the other way."""
+        bf = BloomFilter(num_users=1000, prob=0.01)
+        for policy in ("lru", "clock"):
+            cached = CachedFilter(bf, size=10, policy=policy)
+            self.assertEqual(cached.exist_many([b"alice_" + policy.encode()]), [False])
+            cached.insert("alice_" + policy)
+            self.assertEqual(cached.exist_many([b"alice_" + policy.encode()]), [True])
+            self.assertTrue(cached.exist("alice_" + policy))
+            self.assertFalse(cached.exist("bob_" + policy))
+            cached.insert(b"bob_" + policy.encode())
+            self.assertTrue(cached.exist("bob_" + policy))
+            self.assertEqual(cached.exist_many(["bob_" + policy]), [True])
+
+    def test_exist_many(self):
+        """Test bulk lookups through BatchLookup agree with the filter."""
+        bf = BloomFilter(num_users=1000, prob=0.01)
+        bf.insert_many(f"user_{i}" for i in range(0, 1000, 2))
+        names = [f"user_{i % 50}" for i in range(1000)]
+        cached = CachedFilter(bf, size=20, policy="clock")
+        self.assertEqual(cached.exist_many(names), [bf.exist(n) for n in names])
+        self.assertEqual(
+            cached.exist_many(names[:10]), [bf.exist(n) for n in names[:10]]
+        )
+        self.assertEqual(cached.stats()["misses"] + cached.stats()["hits"], 1010)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+#
+#  test_scalable_bloom_filter.py
+#  Login Checker Program
+#
+
+import unittest
+import os
+import tempfile
+
+from src.batch_lookup import BatchLookup
+from src.filter_store import save_filter, open_filter
+from src.scalable_bloom_filter import ScalableBloomFilter
+
+
+class TestScalableBloomFilter(unittest.TestCase):
+    def setUp(self):
+        self.sbf = ScalableBloomFilter(initial_capacity=500, prob=0.01)
+        self.names = [f"user_{i}" for i in range(0, 8000, 2)]
+        self.sbf.insert_many(self.names[:2000])
+        for name in self.names[2000:]:
+            self.sbf.insert(name)
+
+    def test_grows_online(self):
+        """Test sub-filters are added as items arrive and none is over-filled."""
+        # 500 + 1000 + 2000 < 4000 <= 500 + 1000 + 2000 + 4000
+        self.assertEqual(len(self.sbf.filters), 4)
+        self.assertEqual(len(self.sbf), 4000)
+        for bf, count in zip(self.sbf.filters, self.sbf.counts):
+            self.assertTrue(count <= bf.num_users)
+        self.assertTrue(all(self.sbf.exist(name) for name in self.names))
+
+    def test_fpr_bounded(self):
+        """Test the chain's false positive rate stays below prob."""
+        self.assertTrue(self.sbf.fpr_bound() < 0.01)
+        others = [f"user_{i}" for i in range(1, 40000, 2)]
+        positives = sum(self.sbf.exist_many(others))
+        self.assertTrue(positives / len(others) < 0.015)
+
+    def test_batch_lookup(self):
+        """Test BatchLookup checks every sub-filter, including ones added after it was made."""
+        engine = BatchLookup(self.sbf)
+        self.sbf.insert_many(f"late_{i}" for i in range(5000))
+        checks = self.names[::5] + [f"late_{i}" for i in range(0, 5000, 7)] + ["nobody"]
+        self.assertEqual(
+            engine.exist(checks).tolist(), [self.sbf.exist(n) for n in checks]
+        )
+
+    def test_save_and_open(self):
+        """Test the chain round trips through filter_store and keeps growing."""
+        with tempfile.TemporaryDirectory() as tmp:
+            filename = os.path.join(tmp, "scalable.bin")
+            save_filter(self.sbf, filename)
+            loaded = open_filter(filename, mmap_mode="c")
+            self.assertTrue(all(loaded.exist(name) for name in self.names))
+            self.assertEqual(loaded.counts, self.sbf.counts)
+            loaded.insert_many(f"new_{i}" for i in range(5000))
+            self.assertTrue(loaded.exist("new_4999"))
+            del loaded
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+#
+#  test_semi_sorted_cuckoo_filter.py
+#  Login Checker Program
+#
+
+import unittest
+import os
+import tempfile
+
+import numpy as np
+
+from src.batch_lookup import BatchLookup
+from src.cuckoo_filter import CuckooFilter
+from src.filter_store import save_filter, open_filter
+from src.semi_sorted_cuckoo_filter import SemiSortedCuckooFilter, DECODE, ENCODE
+
+
+class TestSemiSortedCuckooFilter(unittest.TestCase):
+    def setUp(self):
+        self.cf = SemiSortedCuckooFilter(capacity=4000, load_factor=0.9, round_up=True)
+        self.names = [f"user_{i}" for i in range(4000)]
+        for name in self.names:
+            self.assertTrue(self.cf.insert(name))
+
+    def test_code_table(self):
+        """Test the 3876 codes fit 12 bits and round trip."""
+        self.assertEqual(len(DECODE), 3876)
+        self.assertTrue(all(ENCODE[high] == code for code, high in enumerate(DECODE)))
+
+    def test_bucket_round_trip(self):
+        """Test buckets decode sorted, neighbours are left untouched."""
+        cf = SemiSortedCuckooFilter(capacity=64, fingerprint_size=13)
+        cf.write_bucket(5, [0, 8191, 1, 4096])
+        cf.write_bucket(6, [7, 7, 0, 0])
+        self.assertEqual(cf.read_bucket(5), [0, 1, 4096, 8191])
+        self.assertEqual(cf.read_bucket(6), [0, 0, 7, 7])
+        self.assertEqual(cf.read_bucket(4), [0, 0, 0, 0])
+        self.assertEqual(
+            cf.bucket_rows(np.array([5, 6])).tolist()[0], [0, 1, 4096, 8191]
+        )
+
+    def test_matches_plain_filter(self):
+        """Test the same inserts give the same fingerprints as the plain table."""
+        plain = CuckooFilter(capacity=4000, load_factor=0.9, round_up=True)
+        for name in self.names:
+            plain.insert(name)
+        self.assertTrue(all(self.cf.exist(name) for name in self.names))
+        rows = self.cf.bucket_rows(np.arange(self.cf.bucket_num))
+        self.assertEqual(
+            sorted(rows[rows != 0].tolist()),
+            sorted(plain.buckets[plain.buckets != 0].tolist()),
+        )
+        self.assertEqual(self.cf.stats()["load"], plain.stats()["load"])
+        self.assertEqual(self.cf.packed.nbytes * 16 // plain.buckets.nbytes, 11)
+
+    def test_batch_lookup(self):
+        """Test BatchLookup decodes the packed table like exist()."""
+        checks = self.names[::7] + [f"other_{i}" for i in range(2000)]
+        self.assertEqual(
+            BatchLookup(self.cf).exist(checks).tolist(),
+            [self.cf.exist(name) for name in checks],
+        )
+
+    def test_save_and_open(self):
+        """Test the packed table round trips through filter_store."""
+        with tempfile.TemporaryDirectory() as tmp:
+            filename = os.path.join(tmp, "semi_sorted.bin")
+            save_filter(self.cf, filename)
+            loaded = open_filter(filename)
+            self.assertIsInstance(loaded, SemiSortedCuckooFilter)
+            self.assertTrue(all(loaded.exist(name) for name in self.names))
+            del loaded
+
+    def test_reset(self):
+        """Test reset empties the packed table."""
+        self.cf.reset()
+        self.assertEqual(self.cf.stats()["load"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,148 @@
+#
+#  test_server.py
+#  Login Checker Program
+#
+
+import unittest
+import asyncio
+import json
+import os
+import tempfile
+
+from src.bloom_filter import BloomFilter
+from src.binary_fuse_filter import BinaryFuseFilter
+from src.cuckoo_filter import CuckooFilter
+from src.filter_store import save_filter
+from src.journal import JournaledFilter
+from src.server import LoginCheckServer
+
+
+class TestLoginCheckServer(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        """Serve a small Bloom filter on a free local port."""
+        self.taken = [f"user_{i}" for i in range(0, 2000, 2)]
+        self.bf = BloomFilter(num_users=1000, prob=0.001)
+        self.bf.insert_many(self.taken)
+        self.server = await LoginCheckServer(
+            self.bf, max_batch=64, max_delay=0.005
+        ).start()
+
+    async def asyncTearDown(self):
+        await self.server.close()
+
+    async def request(self, *lines):
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.server.port)
+        writer.write("".join(line + "\n" for line in lines).encode())
+        await writer.drain()
+        answers = [(await reader.readline()).decode().strip() for _ in lines]
+        writer.close()
+        await writer.wait_closed()
+        return answers
+
+    async def test_check_and_insert(self):
+        """Test pipelined requests are answered in order and inserts are visible."""
+        answers = await self.request(
+            "CHECK user_0", "CHECK user_1", "INSERT user_1", "CHECK user_1", "HELLO"
+        )
+        self.assertEqual(answers[:4], ["1", "0", "OK", "1"])
+        self.assertTrue(answers[4].startswith("ERR"))
+
+    async def test_concurrent_clients_are_batched(self):
+        """Test concurrent checks are grouped into batches and answered like exist()."""
+        clients = [
+            self.request(*(f"CHECK user_{i}" for i in range(start, 2000, 20)))
+            for start in range(20)
+        ]
+        results = await asyncio.gather(*clients)
+        for start, answers in enumerate(results):
+            expected = [
+                "1" if self.bf.exist(f"user_{i}") else "0"
+                for i in range(start, 2000, 20)
+            ]
+            self.assertEqual(answers, expected)
+
+        stats = json.loads((await self.request("STATS"))[0])
+        self.assertEqual(stats["latency_us"]["CHECK"]["count"], 2000)
+        # Fewer bulk lookups than names means requests shared batches
+        self.assertTrue(stats["batch_sizes"]["count"] < 2000)
+        self.assertTrue(stats["batch_sizes"]["p99"] > 1)
+
+    async def test_full_filter(self):
+        """Test an insert refused by the filter is answered FULL."""
+        cf = CuckooFilter(capacity=8, bucket_size=1, stash_size=0)
+        server = await LoginCheckServer(cf).start()
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            writer.write(b"".join(b"INSERT user_%d\n" % i for i in range(64)))
+            answers = [(await reader.readline()).strip() for _ in range(64)]
+            writer.close()
+            await writer.wait_closed()
+        finally:
+            await server.close()
+        self.assertIn(b"FULL", answers)
+
+    async def test_failed_lookup_answers_err(self):
+        """Test a lookup that raises is answered ERR and later requests are still served."""
+
+        class BrokenFilter:
+            def exist(self, name):
+                if name == "boom":
+                    raise RuntimeError("lookup failed")
+                return False
+
+        server = await LoginCheckServer(BrokenFilter(), max_inflight=2).start()
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            lines = ["CHECK boom"] + [f"CHECK user_{i}" for i in range(20)]
+            writer.write("".join(line + "\n" for line in lines).encode())
+            answers = [(await reader.readline()).decode().strip() for _ in lines]
+            writer.close()
+            await writer.wait_closed()
+        finally:
+            await server.close()
+        self.assertTrue(answers[0].startswith("ERR"))
+        self.assertEqual(answers[-1], "0")
+
+    async def test_static_filter_rejects_inserts(self):
+        """Test a filter without insert() answers INSERT with ERR instead of failing."""
+        fuse = BinaryFuseFilter.from_iterable(self.taken)
+        server = await LoginCheckServer(fuse).start()
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            writer.write(b"INSERT new_user\nCHECK user_0\n")
+            answers = [(await reader.readline()).strip() for _ in range(2)]
+            writer.close()
+            await writer.wait_closed()
+        finally:
+            await server.close()
+        self.assertTrue(answers[0].startswith(b"ERR"))
+        self.assertEqual(answers[1], b"1")
+
+    async def test_journaled_inserts_survive_restart(self):
+        """Test inserts through a JournaledFilter are found by a server started afterwards."""
+        with tempfile.TemporaryDirectory() as tmp:
+            snapshot = os.path.join(tmp, "bloom.bin")
+            save_filter(self.bf, snapshot)
+            for lines, expected in (
+                (["INSERT user_1", "CHECK user_1"], ["OK", "1"]),
+                (["CHECK user_1", "CHECK user_0"], ["1", "1"]),
+            ):
+                with JournaledFilter(snapshot, compact_every=None) as jf:
+                    server = await LoginCheckServer(jf).start()
+                    try:
+                        reader, writer = await asyncio.open_connection(
+                            "127.0.0.1", server.port
+                        )
+                        writer.write("".join(l + "\n" for l in lines).encode())
+                        answers = [
+                            (await reader.readline()).decode().strip() for _ in lines
+                        ]
+                        writer.close()
+                        await writer.wait_closed()
+                    finally:
+                        await server.close()
+                self.assertEqual(answers, expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
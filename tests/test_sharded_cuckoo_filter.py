@@ -0,0 +1,110 @@
+#
+#  test_sharded_cuckoo_filter.py
+#  Login Checker Program
+#
+
+import unittest
+import os
+import tempfile
+
+import numpy as np
+
+from src.batch_lookup import BatchLookup
+from src.sharded_cuckoo_filter import (
+    ShardedCuckooFilter,
+    build_sharded_cuckoo_filter,
+    save_sharded_filter,
+    open_sharded_filter,
+)
+
+
+class TestShardedCuckooFilter(unittest.TestCase):
+    def setUp(self):
+        """Temporary directory with a small sorted username file."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tmp.name, "sorted_usernames.txt")
+        self.usernames = sorted(f"user_{i}" for i in range(4000))
+        with open(self.filename, "w") as f:
+            f.write("\n".join(self.usernames) + "\n")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_insert_and_exist(self):
+        """Test every inserted name is found and names spread over all shards."""
+        sf = ShardedCuckooFilter(capacity=4000, num_shards=8)
+        for name in self.usernames:
+            self.assertTrue(sf.insert(name))
+        for name in self.usernames:
+            self.assertTrue(sf.exist(name))
+        counts = [int((shard.buckets != 0).sum()) for shard in sf.shards]
+        self.assertEqual(sum(counts), len(self.usernames))
+        self.assertTrue(min(counts) > 0)
+
+    def test_num_shards_power_of_two(self):
+        """Test the number of shards must be a power of 2."""
+        with self.assertRaises(ValueError):
+            ShardedCuckooFilter(capacity=1000, num_shards=6)
+
+    def test_save_and_open(self):
+        """Test a saved filter is reopened shard by shard with the same answers."""
+        sf = ShardedCuckooFilter(capacity=4000, num_shards=4)
+        for name in self.usernames:
+            sf.insert(name)
+        directory = os.path.join(self.tmp.name, "filter.shards")
+        save_sharded_filter(sf, directory)
+        loaded = open_sharded_filter(directory)
+        self.assertEqual(loaded.num_shards, 4)
+        for a, b in zip(sf.shards, loaded.shards):
+            np.testing.assert_array_equal(a.buckets, b.buckets)
+        self.assertTrue(all(loaded.exist(name) for name in self.usernames))
+
+    def test_parallel_build_matches_serial(self):
+        """Test the per-process shard build gives the same tables as serial inserts."""
+        serial = ShardedCuckooFilter(capacity=4000, num_shards=4, bucket_size=4)
+        for name in self.usernames:
+            serial.insert(name)
+        directory = os.path.join(self.tmp.name, "built.shards")
+        built = build_sharded_cuckoo_filter(
+            self.filename, directory, 4000, num_shards=4, processes=2, bucket_size=4
+        )
+        for a, b in zip(serial.shards, built.shards):
+            np.testing.assert_array_equal(a.buckets, b.buckets)
+        self.assertEqual(open_sharded_filter(directory).num_shards, 4)
+        # The spill files of the partition pass are removed
+        self.assertEqual(sorted(os.listdir(directory))[-1], "shard_0003.bin")
+
+    def test_single_shard_build(self):
+        """Test a one-shard build routes every name to shard 0."""
+        directory = os.path.join(self.tmp.name, "one.shards")
+        built = build_sharded_cuckoo_filter(
+            self.filename, directory, 4000, num_shards=1, processes=3
+        )
+        self.assertTrue(all(built.exist(name) for name in self.usernames))
+
+    def test_full_shard_is_rebuilt(self):
+        """Test an undersized build recovers by growing the shards that ran full."""
+        directory = os.path.join(self.tmp.name, "small.shards")
+        built = build_sharded_cuckoo_filter(
+            self.filename,
+            directory,
+            1000,
+            num_shards=2,
+            processes=2,
+            bucket_size=4,
+        )
+        # A capacity of 500 per shard gives 256 buckets of 4 slots, too few for ~2000 names
+        self.assertTrue(all(shard.bucket_num > 256 for shard in built.shards))
+        self.assertTrue(all(built.exist(name) for name in self.usernames))
+
+    def test_batch_lookup(self):
+        """Test the batch engine agrees with per-name lookups."""
+        sf = ShardedCuckooFilter(capacity=4000, num_shards=8)
+        for name in self.usernames[::2]:
+            sf.insert(name)
+        expected = [sf.exist(name) for name in self.usernames]
+        self.assertEqual(BatchLookup(sf).exist(self.usernames).tolist(), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+#
+#  test_sorted_index.py
+#  Login Checker Program
+#
+
+import unittest
+import os
+import tempfile
+
+from src.simple_algorithms import binary_search
+from src.sorted_index import SortedFileIndex, INDEX_SUFFIX
+
+
+class TestSortedFileIndex(unittest.TestCase):
+    def setUp(self):
+        """Temporary directory with a small sorted username file."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tmp.name, "sorted_usernames.txt")
+        self.usernames = sorted(f"user_{i}" for i in range(0, 5000, 2))
+        self.write(self.usernames)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, names, end="\n"):
+        with open(self.filename, "w") as f:
+            f.write("\n".join(names) + end)
+
+    def test_exact_membership(self):
+        """Test every stored name is found and no other name is."""
+        with SortedFileIndex(self.filename) as index:
+            self.assertEqual(len(index), len(self.usernames))
+            for i in range(5000):
+                self.assertEqual(f"user_{i}" in index, i % 2 == 0)
+            self.assertFalse(index.exist("a"))
+            self.assertFalse(index.exist("zzz"))
+            self.assertTrue(index.exist(self.usernames[0].encode()))
+
+    def test_index_is_persisted(self):
+        """Test the offsets are saved and rebuilt once the file changes."""
+        SortedFileIndex(self.filename).close()
+        self.assertTrue(os.path.exists(self.filename + INDEX_SUFFIX))
+        with SortedFileIndex(self.filename) as index:
+            self.assertIsNotNone(index.load_offsets())
+            self.assertTrue(index.exist("user_42"))
+
+        self.write(["alice", "bob"])
+        with SortedFileIndex(self.filename) as index:
+            self.assertEqual(len(index), 2)
+            self.assertTrue(index.exist("bob"))
+            self.assertFalse(index.exist("user_42"))
+
+    def test_edge_files(self):
+        """Test an empty file and a missing final newline."""
+        self.write([], end="")
+        with SortedFileIndex(self.filename) as index:
+            self.assertEqual(len(index), 0)
+            self.assertFalse(index.exist("alice"))
+        self.write(["alice", "bob", "carol"], end="")
+        with SortedFileIndex(self.filename) as index:
+            self.assertEqual(
+                [index.line(i) for i in range(3)], [b"alice", b"bob", b"carol"]
+            )
+            self.assertTrue(index.exist("carol"))
+
+
+class TestBinarySearch(unittest.TestCase):
+    def test_binary_search(self):
+        """Test the iterative binary search on hits, misses and tiny lists."""
+        data = [f"user_{i:04d}" for i in range(0, 1000, 3)]
+        for i in range(1000):
+            self.assertEqual(
+                binary_search(f"user_{i:04d}", data, 0, len(data) - 1), i % 3 == 0
+            )
+        self.assertTrue(binary_search("a", ["a"], 0, 0))
+        self.assertFalse(binary_search("b", ["a"], 0, 0))
+        self.assertFalse(binary_search("a", [], 0, -1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+#
+#  test_synthetic_data.py
+#  Login Checker Program
+#
+
+import unittest
+import os
+import re
+import tempfile
+
+from src.synthetic_data import dataset_names, check_names, write_dataset
+
+
+class TestSyntheticData(unittest.TestCase):
+    def test_sorted_unique_and_deterministic(self):
+        """Test datasets are sorted, unique, lowercase/underscore and reproducible."""
+        names = list(dataset_names(20000, seed=3))
+        self.assertEqual(names, sorted(names))
+        self.assertEqual(len(set(names)), len(names))
+        self.assertTrue(all(re.fullmatch(r"[a-z_]+", name) for name in names))
+        self.assertEqual(names, list(dataset_names(20000, seed=3)))
+        self.assertNotEqual(names, list(dataset_names(20000, seed=4)))
+
+    def test_hit_ratio(self):
+        """Test check lists hit the dataset exactly as often as asked."""
+        dataset = set(dataset_names(5000))
+        for ratio in (0.0, 0.25, 1.0):
+            names, hits = check_names(5000, 1000, hit_ratio=ratio)
+            self.assertEqual(hits, round(1000 * ratio))
+            self.assertEqual(sum(name in dataset for name in names), hits)
+
+    def test_write_dataset(self):
+        """Test the streamed file holds the generated names in order."""
+        with tempfile.TemporaryDirectory() as tmp:
+            filename = os.path.join(tmp, "sorted_usernames.txt")
+            write_dataset(filename, 2500, chunk=1000)
+            with open(filename) as f:
+                self.assertEqual(f.read().splitlines(), list(dataset_names(2500)))
+
+
+if __name__ == "__main__":
+    unittest.main()